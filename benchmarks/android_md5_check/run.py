@@ -0,0 +1,98 @@
+# Copyright 2015 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""Times the md5_check staleness checks of a no-op rebuild of javac-like
+actions: each action compiles its own java files, against a classpath of jars
+that all the actions share."""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+_ACTION_COUNT = 20
+_JAVA_FILES_PER_ACTION = 150
+_JAVA_FILE_SIZE = 8 * 1024
+_JAR_COUNT = 20
+_JAR_SIZE = 2 * 1024 * 1024
+
+
+def _SetUpPath(paths):
+  util_dir = os.path.join(paths.src_root, 'build', 'android', 'gyp', 'util')
+  if util_dir not in sys.path:
+    sys.path.append(util_dir)
+
+
+def _WriteFile(path, size, old_time):
+  with open(path, 'wb') as f:
+    f.write(os.urandom(size))
+  os.utime(path, (old_time, old_time))
+
+
+def _CreateInputs(temp_dir):
+  """Returns the list of input paths of each action."""
+  old_time = time.time() - 60
+  jars = []
+  for i in xrange(_JAR_COUNT):
+    jars.append(os.path.join(temp_dir, 'lib%d.jar' % i))
+    _WriteFile(jars[-1], _JAR_SIZE, old_time)
+  actions = []
+  for i in xrange(_ACTION_COUNT):
+    java_dir = os.path.join(temp_dir, 'java%d' % i)
+    os.mkdir(java_dir)
+    java_files = []
+    for j in xrange(_JAVA_FILES_PER_ACTION):
+      java_files.append(os.path.join(java_dir, 'Class%d.java' % j))
+      _WriteFile(java_files[-1], _JAVA_FILE_SIZE, old_time)
+    actions.append(java_files + jars)
+  return actions
+
+
+def _Build(md5_check, temp_dir, actions, digest_cache_path):
+  """Returns the time taken to check all the actions, and the number of actions
+  that were run."""
+  run = []
+  start = time.time()
+  for (i, input_paths) in enumerate(actions):
+    kwargs = {}
+    if digest_cache_path:
+      kwargs['digest_cache_path'] = digest_cache_path
+    md5_check.CallAndRecordIfStale(
+        lambda: run.append(i),
+        record_path=os.path.join(temp_dir, 'action%d.md5.stamp' % i),
+        input_paths=input_paths,
+        input_strings=['javac', str(i)],
+        **kwargs)
+  return (time.time() - start, len(run))
+
+
+def run(args, paths):
+  _SetUpPath(paths)
+  # pylint: disable=F0401
+  import md5_check
+  # (Older versions of md5_check have no digest cache.)
+  shared_cache = hasattr(md5_check, 'DIGEST_CACHE_ENV_VAR')
+
+  temp_dir = tempfile.mkdtemp()
+  try:
+    actions = _CreateInputs(temp_dir)
+    results = []
+    modes = [('no digest cache', None)]
+    if shared_cache:
+      modes.append(('shared digest cache', os.path.join(temp_dir, 'digests')))
+    for (mode, digest_cache_path) in modes:
+      for name in os.listdir(temp_dir):
+        if name.endswith('.stamp') or name == 'digests':
+          os.remove(os.path.join(temp_dir, name))
+      (full_time, full_count) = _Build(md5_check, temp_dir, actions,
+                                       digest_cache_path)
+      (noop_time, noop_count) = _Build(md5_check, temp_dir, actions,
+                                       digest_cache_path)
+      assert (full_count, noop_count) == (len(actions), 0)
+      results.append('%s: full build %.3f s, no-op rebuild %.3f s' %
+                     (mode, full_time, noop_time))
+    return 'Result:\n%s' % '\n'.join(results)
+  finally:
+    shutil.rmtree(temp_dir)
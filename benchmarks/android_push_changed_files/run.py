@@ -0,0 +1,206 @@
+# Copyright 2015 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""Times DeviceUtils.PushChangedFiles() end to end, pushing a tree of 10k files
+to a fake device: a fake adb that runs the device's shell commands on the host
+(in a directory standing for the device), adding the latency of an adb call to
+each command and the transfer time of the bytes to each push."""
+
+import os
+import shutil
+import stat
+import subprocess
+import sys
+import tempfile
+import time
+
+_DIR_COUNT = 100
+_FILES_PER_DIR = 100
+_FILE_SIZE = 4096
+
+# The fake device's latency of an adb call, and transfer rate.
+_ADB_CALL_LATENCY = 0.005  # seconds
+_TRANSFER_RATE = 20 * 1024 * 1024  # bytes / second
+
+# The md5sum_bin of the host and of the device: they list the files of their
+# arguments (walking directories), with their MD5 sums. (The device's is a
+# shell script which, like md5sum_bin, hashes all its arguments in a single
+# process.)
+_MD5SUM_BIN_HOST = r'''#!/usr/bin/env python
+import hashlib, os, sys
+files = set()
+for path in sys.argv[1:]:
+  if os.path.isdir(path):
+    for root, _, names in os.walk(path):
+      files.update(os.path.realpath(os.path.join(root, n)) for n in names)
+  elif os.path.exists(path):
+    files.add(path)
+for path in sorted(files):
+  with open(path, 'rb') as f:
+    print '%s  %s' % (hashlib.md5(f.read()).hexdigest(), path)
+'''
+
+_MD5SUM_BIN_DEVICE = '''#!/bin/sh
+find "$@" -type f -exec md5sum {} +
+'''
+
+# The device's unzip command, that extracts to the root directory.
+_UNZIP = r'''#!/usr/bin/env python
+import sys, zipfile
+zipfile.ZipFile(sys.argv[1]).extractall('/')
+'''
+
+_GETPROP = '''#!/bin/sh
+case "$1" in
+  ro.build.version.sdk) echo 21;;
+  ro.build.type) echo userdebug;;
+esac
+'''
+
+
+def _SetUpPath(paths):
+  android_dir = os.path.join(paths.src_root, 'build', 'android')
+  if android_dir not in sys.path:
+    sys.path.insert(0, android_dir)
+
+
+def _WriteScript(path, contents):
+  if not os.path.exists(os.path.dirname(path)):
+    os.makedirs(os.path.dirname(path))
+  with open(path, 'w') as f:
+    f.write(contents)
+  os.chmod(path, stat.S_IRWXU)
+
+
+def _FakeAdbWrapperClass(adb_wrapper, device_dir, bin_dir):
+  """Returns a fake AdbWrapper class, for a device whose /data/local/tmp and
+  external storage are in |device_dir| (and whose other paths are host
+  paths)."""
+  device_tmp = os.path.join(device_dir, 'data', 'local', 'tmp')
+
+  def DevicePath(path):
+    return path.replace('/data/local/tmp', device_tmp)
+
+  class FakeAdbWrapper(adb_wrapper.AdbWrapper):
+    def __init__(self):
+      adb_wrapper.AdbWrapper.__init__(self, 'fake-device')
+      self.call_count = 0
+      self.pushed_bytes = 0
+
+    def _RunDeviceAdbCmd(self, args, timeout, retries, check_error=True):
+      self.call_count += 1
+      time.sleep(_ADB_CALL_LATENCY)
+      if args[0] == 'shell':
+        env = dict(os.environ,
+                   PATH='%s:%s' % (bin_dir, os.environ['PATH']),
+                   EXTERNAL_STORAGE=os.path.join(device_dir, 'sdcard'))
+        process = subprocess.Popen(
+            ['sh', '-c', DevicePath(args[1])], env=env,
+            stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        return process.communicate()[0]
+      elif args[0] == 'push':
+        local, remote = args[1], DevicePath(args[2])
+        size = self._Copy(local, remote)
+        if remote.startswith(device_tmp) and os.path.isfile(remote):
+          # A script (e.g. md5sum's): its device paths need mapping too.
+          with open(remote) as f:
+            contents = f.read()
+          with open(remote, 'w') as f:
+            f.write(DevicePath(contents))
+        self.pushed_bytes += size
+        time.sleep(float(size) / _TRANSFER_RATE)
+        return ''
+      elif args[0] == 'get-state':
+        return 'device'
+      raise NotImplementedError(args)
+
+    @staticmethod
+    def _Copy(local, remote):
+      """Copies like adb push, returning the number of bytes copied."""
+      if not os.path.isdir(local):
+        if not os.path.isdir(os.path.dirname(remote)):
+          os.makedirs(os.path.dirname(remote))
+        shutil.copy(local, remote)
+        return os.path.getsize(local)
+      size = 0
+      for name in os.listdir(local):
+        size += FakeAdbWrapper._Copy(os.path.join(local, name),
+                                     os.path.join(remote, name))
+      return size
+
+  return FakeAdbWrapper
+
+
+def _CreateTree(host_dir):
+  for i in xrange(_DIR_COUNT):
+    dir_path = os.path.join(host_dir, 'dir%d' % i)
+    os.makedirs(dir_path)
+    for j in xrange(_FILES_PER_DIR):
+      _ChangeFile(os.path.join(dir_path, 'file%d.dat' % j))
+
+
+def _ChangeFile(path):
+  with open(path, 'wb') as f:
+    f.write(os.urandom(_FILE_SIZE))
+  # As if modified before the push (rather than just now).
+  old_time = time.time() - 60
+  os.utime(path, (old_time, old_time))
+
+
+def _Push(device_utils_module, fake_adb_class, host_dir, device_path):
+  adb = fake_adb_class()
+  device = device_utils_module.DeviceUtils(adb)
+  start = time.time()
+  device.PushChangedFiles([(host_dir, device_path)])
+  return (time.time() - start, adb.call_count, adb.pushed_bytes)
+
+
+def run(args, paths):
+  _SetUpPath(paths)
+  temp_dir = os.path.realpath(tempfile.mkdtemp())
+  try:
+    out_dir = os.path.join(temp_dir, 'out')
+    device_dir = os.path.join(temp_dir, 'device')
+    bin_dir = os.path.join(temp_dir, 'bin')
+    _WriteScript(os.path.join(out_dir, 'md5sum_bin_host'), _MD5SUM_BIN_HOST)
+    _WriteScript(os.path.join(out_dir, 'md5sum_dist', 'md5sum_bin'),
+                 _MD5SUM_BIN_DEVICE)
+    _WriteScript(os.path.join(bin_dir, 'getprop'), _GETPROP)
+    _WriteScript(os.path.join(device_dir, 'data', 'local', 'tmp', 'bin',
+                              'unzip'), _UNZIP)
+    _WriteScript(os.path.join(device_dir, 'data', 'local', 'tmp', 'framework',
+                              'chromium_commands.jar'), '')
+    os.makedirs(os.path.join(device_dir, 'sdcard'))
+    os.environ['CHROMIUM_OUTPUT_DIR'] = out_dir
+
+    # pylint: disable=F0401
+    from pylib.device import adb_wrapper
+    from pylib.device import device_utils
+    fake_adb_class = _FakeAdbWrapperClass(adb_wrapper, device_dir, bin_dir)
+
+    host_dir = os.path.join(temp_dir, 'host')
+    _CreateTree(host_dir)
+    device_path = os.path.join(device_dir, 'sdcard', 'test_data')
+    host_files = [os.path.join(root, name)
+                  for root, _, names in os.walk(host_dir) for name in names]
+
+    results = []
+    def Push(name):
+      (seconds, calls, pushed) = _Push(device_utils, fake_adb_class, host_dir,
+                                       device_path)
+      results.append('%s: %.2f s (%d adb calls, %.1f MB pushed)' %
+                     (name, seconds, calls, pushed / (1024.0 * 1024)))
+
+    Push('Initial push of %d files' % len(host_files))
+    Push('No-op push')
+    for path in host_files[::10]:
+      _ChangeFile(path)
+    Push('Push of %d changed files' % len(host_files[::10]))
+    for path in host_files:
+      _ChangeFile(path)
+    Push('Push of %d changed files' % len(host_files))
+    Push('No-op push')
+    return 'Result:\n%s' % '\n'.join(results)
+  finally:
+    shutil.rmtree(temp_dir)
@@ -0,0 +1,96 @@
+# Copyright 2015 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+import httplib
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+# Files served, as an app with a few large binaries and many small resources
+# would need.
+_FILES = [('app%d.mojo' % i, 4 * 1024 * 1024) for i in xrange(8)] + [
+    ('resource%d' % i, 4 * 1024) for i in xrange(64)]
+
+
+def _SetUpPath(paths):
+  devtools_dir = os.path.join(paths.src_root, 'mojo', 'devtools', 'common')
+  if devtools_dir not in sys.path:
+    sys.path.append(devtools_dir)
+
+
+def _Fetch(address, keep_alive, clients, rounds):
+  """Fetches all the files |rounds| times, from |clients| concurrent clients.
+  Returns the number of requests per second and the average time to first byte
+  (the time until the response headers are received), in milliseconds."""
+  first_byte_times = []
+  lock = threading.Lock()
+
+  def Client(index):
+    times = []
+    connection = None
+    for i in xrange(rounds):
+      for (name, _) in _FILES[index::clients]:
+        if not connection:
+          connection = httplib.HTTPConnection(*address)
+        start = time.time()
+        connection.request('GET', '/' + name,
+                           headers={} if keep_alive else
+                                   {'Connection': 'close'})
+        response = connection.getresponse()
+        times.append(time.time() - start)
+        response.read()
+        assert response.status == 200
+        if not keep_alive:
+          connection.close()
+          connection = None
+    if connection:
+      connection.close()
+    with lock:
+      first_byte_times.extend(times)
+
+  threads = [threading.Thread(target=Client, args=(i,))
+             for i in xrange(clients)]
+  start = time.time()
+  for thread in threads:
+    thread.start()
+  for thread in threads:
+    thread.join()
+  duration = time.time() - start
+  return (len(first_byte_times) / duration,
+          sum(first_byte_times) * 1e3 / len(first_byte_times))
+
+
+def run(args, paths):
+  _SetUpPath(paths)
+  # pylint: disable=F0401
+  from pylib.http_server import StartHttpServer
+
+  temp_dir = tempfile.mkdtemp()
+  try:
+    for (name, size) in _FILES:
+      with open(os.path.join(temp_dir, name), 'wb') as f:
+        f.write(os.urandom(size))
+
+    rounds = 5
+    results = []
+    for threaded in (False, True):
+      address = StartHttpServer(temp_dir, threaded=threaded)
+      for keep_alive in (False, True):
+        for clients in (1, 8):
+          (requests_per_second, first_byte_time) = _Fetch(
+              address, keep_alive, clients, rounds)
+          results.append(
+              '%s server, %s, %d clients: %.1f requests/s, time to first '
+              'byte %.2f ms' %
+              ('threaded' if threaded else 'single-threaded',
+               'keep-alive' if keep_alive else 'connection per request',
+               clients, requests_per_second, first_byte_time))
+  finally:
+    shutil.rmtree(temp_dir)
+  return ('Result: %d files (%d MB), rounds tested: %d\n%s' %
+          (len(_FILES), sum(size for (_, size) in _FILES) / (1024 * 1024),
+           rounds, '\n'.join(results)))
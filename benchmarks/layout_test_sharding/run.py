@@ -0,0 +1,115 @@
+# Copyright 2015 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""Replays the test times of a layout test run (times_ms.json) to simulate the
+wall-clock time of the run with the different sharding strategies."""
+
+import heapq
+import json
+import os
+import random
+import sys
+
+_WORKER_COUNTS = (4, 8, 16)
+
+
+def _SetUpPath(paths):
+  sky_tools_dir = os.path.join(paths.src_root, 'sky', 'tools')
+  if sky_tools_dir not in sys.path:
+    sys.path.append(sky_tools_dir)
+
+
+def _ReadTimes(paths):
+  """Returns the times of the tests of the last run, or made-up times for the
+  sky tests (if there is no last run): most tests are fast, a few directories
+  are slow."""
+  # pylint: disable=F0401
+  from webkitpy.layout_tests.print_layout_test_times import (
+      convert_trie_to_flat_paths)
+
+  if paths.build_dir:
+    times_ms_path = os.path.join(paths.build_dir, 'layout-test-results',
+                                 'times_ms.json')
+    if os.path.isfile(times_ms_path):
+      with open(times_ms_path) as f:
+        return times_ms_path, convert_trie_to_flat_paths(json.load(f))
+
+  tests_dir = os.path.join(paths.src_root, 'sky', 'tests')
+  rand = random.Random(0)
+  times = {}
+  for (dirpath, _, filenames) in os.walk(tests_dir):
+    directory = os.path.relpath(dirpath, tests_dir)
+    slowness = 10 if rand.random() < 0.1 else 1
+    for filename in filenames:
+      if filename.endswith(('.sky', '.html', '.dart')):
+        test_name = os.path.join(directory, filename).replace(os.sep, '/')
+        times[test_name] = int(rand.lognormvariate(4.5, 1) * slowness)
+  return 'synthetic times for %s' % tests_dir, times
+
+
+def _Simulate(shards, num_workers, times, steal):
+  """Returns the wall-clock time (in ms) of running the shards on |num_workers|
+  workers: each idle worker takes the next shard, or, if |steal| is set, the
+  next test of its shard (the second half of the remaining tests of the largest
+  shard, once all the shards are taken)."""
+  unassigned = [[test_input.test_name for test_input in shard.test_inputs]
+                for shard in shards]
+  assigned = {}
+  idle_workers = [(0, worker) for worker in xrange(num_workers)]
+  end_time = 0
+  while idle_workers:
+    (now, worker) = heapq.heappop(idle_workers)
+    end_time = max(end_time, now)
+    tests = assigned.get(worker)
+    if not tests:
+      if unassigned:
+        tests = unassigned.pop(0)
+      elif steal and any(assigned.values()):
+        largest = max(assigned.values(), key=len)
+        tests = largest[len(largest) / 2:]
+        del largest[len(largest) / 2:]
+      else:
+        continue
+      assigned[worker] = tests
+    if steal:
+      duration = times[tests.pop(0)]
+    else:
+      duration = sum(times[test] for test in tests)
+      del tests[:]
+    heapq.heappush(idle_workers, (now + duration, worker))
+  return end_time
+
+
+def run(args, paths):
+  _SetUpPath(paths)
+  # pylint: disable=F0401
+  from webkitpy.layout_tests.controllers.layout_test_runner import Sharder
+  from webkitpy.common.system.systemhost_mock import MockSystemHost
+  from webkitpy.layout_tests.models.test_input import TestInput
+  from webkitpy.layout_tests.port.test import TestPort
+
+  (source, times) = _ReadTimes(paths)
+  test_inputs = [TestInput(test_name, requires_lock=False)
+                 for test_name in sorted(times)]
+  split_fn = TestPort(MockSystemHost()).split_test
+
+  results = []
+  for fully_parallel in (False, True):
+    for num_workers in _WORKER_COUNTS:
+      (_, by_name) = Sharder(split_fn, 1).shard_tests(
+          test_inputs, num_workers, fully_parallel, False)
+      (_, by_time) = Sharder(split_fn, 1, times).shard_tests(
+          test_inputs, num_workers, fully_parallel, False)
+      lower_bound = max(sum(times.values()) / num_workers,
+                        max(times.values()))
+      results.append(
+          '%s, %d workers: %d ms in order, %d ms longest first, %d ms longest '
+          'first with stealing (lower bound %d ms)' %
+          ('every file' if fully_parallel else 'by directory', num_workers,
+           _Simulate(by_name, num_workers, times, False),
+           _Simulate(by_time, num_workers, times, False),
+           _Simulate(by_time, num_workers, times, True),
+           lower_bound))
+  return 'Result: %d tests (%s), %d ms in total\n%s' % (
+      len(times), source, sum(times.values()), '\n'.join(results))
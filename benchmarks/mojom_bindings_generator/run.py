@@ -0,0 +1,71 @@
+# Copyright 2015 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def _FindMojomFiles(src_root):
+  result = []
+  for (dirpath, dirnames, filenames) in os.walk(src_root):
+    dirnames[:] = [d for d in dirnames
+                   if d not in ('third_party', 'out') and not d.startswith('.')]
+    result.extend(os.path.relpath(os.path.join(dirpath, f), src_root)
+                  for f in filenames if f.endswith('.mojom'))
+  return sorted(result)
+
+
+def _GenerateAll(paths, mojom_files, output_dir, extra_args):
+  """Runs the generator once per mojom file, as the build does, and returns the
+  wall time and the number of failures."""
+  generator = os.path.join(paths.src_root, 'mojo', 'public', 'tools',
+                           'bindings', 'mojom_bindings_generator.py')
+  failures = 0
+  start = time.time()
+  for mojom_file in mojom_files:
+    command = [sys.executable, generator, mojom_file, '--use_bundled_pylibs',
+               '-d', '.', '-I', '.', '-I', 'mojo', '-o', output_dir]
+    with open(os.devnull, 'w') as devnull:
+      if subprocess.call(command + extra_args, cwd=paths.src_root,
+                         stdout=devnull, stderr=devnull):
+        failures += 1
+  return (time.time() - start, failures)
+
+
+def run(args, paths):
+  mojom_files = _FindMojomFiles(paths.src_root)
+  temp_dir = tempfile.mkdtemp()
+  server = None
+  try:
+    output_dir = os.path.join(temp_dir, 'out')
+    (cold_time, failures) = _GenerateAll(paths, mojom_files, output_dir, [])
+
+    # The server has to be started by each build; this is included in the warm
+    # time, but not the first pass over the files, which fills the caches.
+    socket_path = os.path.join(temp_dir, 'generator.sock')
+    start = time.time()
+    server = subprocess.Popen(
+        [sys.executable,
+         os.path.join(paths.src_root, 'mojo', 'public', 'tools', 'bindings',
+                      'mojom_bindings_generator.py'),
+         '--use_bundled_pylibs', '--serve', socket_path])
+    while not os.path.exists(socket_path):
+      time.sleep(0.01)
+    startup_time = time.time() - start
+    server_args = ['--server', socket_path]
+    _GenerateAll(paths, mojom_files, output_dir, server_args)
+    (warm_time, _) = _GenerateAll(paths, mojom_files, output_dir, server_args)
+  finally:
+    if server:
+      server.terminate()
+      server.wait()
+    shutil.rmtree(temp_dir)
+
+  return ('Result: %d mojom files (%d failing); cold: %.2f s; warm: %.2f s '
+          '(plus %.2f s to start the server)' %
+          (len(mojom_files), failures, cold_time, warm_time, startup_time))
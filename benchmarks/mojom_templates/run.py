@@ -0,0 +1,86 @@
+# Copyright 2015 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+import imp
+import os
+import shutil
+import tempfile
+import timeit
+
+_LANGUAGES = ['c++', 'dart', 'go', 'javascript', 'java', 'python']
+
+
+def _LoadGeneratorScript(paths):
+  return imp.load_source(
+      'mojom_bindings_generator',
+      os.path.join(paths.src_root, 'mojo', 'public', 'tools', 'bindings',
+                   'mojom_bindings_generator.py'))
+
+
+def _Measure(generator_module, module, output_dir, rounds, setup=None):
+  """Returns the time, in milliseconds, of one GenerateFiles call."""
+  def GenerateFiles():
+    if setup:
+      setup()
+    generator_module.Generator(module, output_dir).GenerateFiles([])
+  GenerateFiles()
+  return timeit.timeit(GenerateFiles, number=rounds) * 1e3 / rounds
+
+
+def run(args, paths):
+  script = _LoadGeneratorScript(paths)
+  # pylint: disable=F0401
+  from mojom.generate import template_expander
+
+  mojom_file = os.path.join('mojo', 'public', 'interfaces', 'bindings',
+                            'tests', 'sample_service.mojom')
+  rounds = 10
+  temp_dir = tempfile.mkdtemp()
+  cwd = os.getcwd()
+  original_apply_template = template_expander.ApplyTemplate
+  def ApplyTemplateWithoutCache(*args, **kwargs):
+    template_expander._environments.clear()
+    return original_apply_template(*args, **kwargs)
+  def ClearEnvironments():
+    template_expander._environments.clear()
+
+  results = []
+  try:
+    os.chdir(paths.src_root)
+    (script_args, _) = script._ParseArguments([mojom_file, '-I', '.', '-I',
+                                               'mojo'])
+    module = script.MojomProcessor(lambda filename: False).ProcessFile(
+        script_args, [], [], mojom_file)
+    output_dir = os.path.join(temp_dir, 'out')
+    for language in _LANGUAGES:
+      (generator_module,) = script.LoadGenerators(language)
+      # One environment per template rendering, as before environments were
+      # shared.
+      template_expander.ApplyTemplate = ApplyTemplateWithoutCache
+      try:
+        per_rendering = _Measure(generator_module, module, output_dir, rounds)
+      finally:
+        template_expander.ApplyTemplate = original_apply_template
+      # One environment per process.
+      per_process = _Measure(generator_module, module, output_dir, rounds,
+                             ClearEnvironments)
+      # One environment per process, with the compiled templates on disk.
+      template_expander.SetBytecodeCacheDirectory(
+          os.path.join(temp_dir, 'templates'))
+      try:
+        bytecode_cache = _Measure(generator_module, module, output_dir, rounds,
+                                  ClearEnvironments)
+      finally:
+        template_expander.SetBytecodeCacheDirectory(None)
+      # Shared environment, e.g., in server mode.
+      shared = _Measure(generator_module, module, output_dir, rounds)
+      results.append(
+          '%s: %.1f ms (environment per rendering); %.1f ms (per process); '
+          '%.1f ms (per process, with bytecode cache); %.1f ms (shared)' %
+          (language, per_rendering, per_process, bytecode_cache, shared))
+  finally:
+    os.chdir(cwd)
+    shutil.rmtree(temp_dir)
+  return ('Result: GenerateFiles time for %s, rounds tested: %d\n%s' %
+          (mojom_file, rounds, '\n'.join(results)))
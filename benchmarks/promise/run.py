@@ -0,0 +1,105 @@
+# Copyright 2015 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+import os
+import resource
+import sys
+import time
+
+
+def _SetUpPath(paths):
+  # The promises are pure python, so the sources are used directly.
+  python_dir = os.path.join(paths.src_root, 'mojo', 'public', 'python')
+  if python_dir not in sys.path:
+    sys.path.append(python_dir)
+
+
+def _NewPendingPromise(promise):
+  functions = []
+  p = promise.Promise(lambda resolve, reject: functions.append(resolve))
+  return (p, functions[0])
+
+
+def _Chain(promise, size):
+  """Resolves a chain of |size| promises, each derived from the previous one
+  with Then()."""
+  (p, resolve) = _NewPendingPromise(promise)
+  for _ in xrange(size):
+    p = p.Then(lambda x: x + 1)
+  results = []
+  p.Then(results.append)
+  resolve(0)
+  return results
+
+
+def _FanOut(promise, size):
+  """Resolves |size| promises that Promise.All() waits for."""
+  promises_and_resolves = [_NewPendingPromise(promise) for _ in xrange(size)]
+  results = []
+  promise.Promise.All(*[p for (p, _) in promises_and_resolves]).Then(
+      lambda values: results.append(len(values)))
+  for (i, (_, resolve)) in enumerate(promises_and_resolves):
+    resolve(i)
+  return results
+
+
+class _RunLoop(object):
+  def __init__(self):
+    self._tasks = []
+
+  def PostDelayedTask(self, runnable, delay=0):
+    self._tasks.append(runnable)
+
+  def RunUntilIdle(self):
+    while self._tasks:
+      self._tasks.pop(0)()
+
+
+def _Measure(promise, case, size, use_run_loop):
+  """Returns the number of promises resolved per second, and the peak memory
+  (in MB) used, by |case| (measured in a child process, so that the peak is that
+  of the case alone)."""
+  (read_fd, write_fd) = os.pipe()
+  pid = os.fork()
+  if pid == 0:
+    os.close(read_fd)
+    start_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    run_loop = _RunLoop() if use_run_loop else None
+    promise.SetRunLoop(run_loop)
+    start = time.time()
+    results = case(promise, size)
+    if run_loop:
+      run_loop.RunUntilIdle()
+    elapsed = time.time() - start
+    assert results == [size], results
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - start_rss
+    os.write(write_fd, '%f %d' % (size / elapsed, peak_rss))
+    os._exit(0)
+  os.close(write_fd)
+  output = os.read(read_fd, 100)
+  os.close(read_fd)
+  os.waitpid(pid, 0)
+  if not output:
+    return None
+  (throughput, peak_kb) = output.split()
+  return (float(throughput), int(peak_kb) / 1024.0)
+
+
+def run(args, paths):
+  _SetUpPath(paths)
+  # pylint: disable=F0401
+  from mojo_bindings import promise
+
+  results = []
+  for (name, case) in (('Chain', _Chain), ('Fan-out', _FanOut)):
+    for size in (10 ** 4, 10 ** 5, 10 ** 6):
+      for use_run_loop in (False, True):
+        measure = _Measure(promise, case, size, use_run_loop)
+        mode = 'run loop' if use_run_loop else 'synchronous'
+        if measure:
+          results.append('%s of %d promises (%s): %.0f promises/s, peak %.1f MB'
+                         % (name, size, mode, measure[0], measure[1]))
+        else:
+          results.append('%s of %d promises (%s): failed' % (name, size, mode))
+  return 'Result:\n%s' % '\n'.join(results)
@@ -0,0 +1,94 @@
+# Copyright 2015 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+import os
+import sys
+import timeit
+
+
+def _SetUpPath(paths):
+  python_build_dir = os.path.join(paths.build_dir, 'python')
+  python_gen_dir = os.path.join(
+      paths.build_dir, 'gen', 'mojo', 'public', 'interfaces', 'bindings',
+      'tests')
+  for path in (python_build_dir, python_gen_dir):
+    if path not in sys.path:
+      sys.path.append(path)
+
+
+def _NewFoo(sample_service_mojom):
+  # No handles are used, so that the mojo system does not need to be
+  # initialized.
+  foo = sample_service_mojom.Foo()
+  foo.name = 'Foo.name'
+  foo.x = 23
+  foo.y = -23
+  foo.b = True
+  foo.bar = sample_service_mojom.Bar(alpha=1, beta=2, gamma=3)
+  foo.extra_bars = [sample_service_mojom.Bar() for _ in xrange(8)]
+  foo.data = 'Hello world'
+  foo.array_of_bools = [True, False] * 8
+  return foo
+
+
+def _Measure(serialization, instance, rounds):
+  """Returns the time, in microseconds, to serialize and deserialize instance
+  once."""
+  (data, handles) = instance.Serialize()
+  serialize_time = timeit.timeit(instance.Serialize, number=rounds)
+  deserialize_time = timeit.timeit(
+      lambda: type(instance).Deserialize(
+          serialization.RootDeserializationContext(data, handles)),
+      number=rounds)
+  return (serialize_time * 1e6 / rounds, deserialize_time * 1e6 / rounds)
+
+
+def _MeasureArrays(serialization, sample_service_mojom, size, rounds):
+  """Returns the number of array elements serialized and deserialized per
+  second."""
+  foo = sample_service_mojom.Foo()
+  foo.extra_bars = [
+      sample_service_mojom.Bar(alpha=i % 256) for i in xrange(size)]
+  foo.multi_array_of_strings = [[['s%d' % i for i in xrange(size)]]]
+  (data, handles) = foo.Serialize()
+  serialize_time = timeit.timeit(foo.Serialize, number=rounds)
+  deserialize_time = timeit.timeit(
+      lambda: sample_service_mojom.Foo.Deserialize(
+          serialization.RootDeserializationContext(data, handles)),
+      number=rounds)
+  nb_elements = 2 * size * rounds
+  return (nb_elements / serialize_time, nb_elements / deserialize_time)
+
+
+def run(args, paths):
+  _SetUpPath(paths)
+  # pylint: disable=F0401
+  import mojo_bindings.serialization as serialization
+  import sample_service_mojom
+
+  rounds = 20000
+  instances = [
+      ('Bar', sample_service_mojom.Bar(alpha=1, beta=2, gamma=3)),
+      ('Foo', _NewFoo(sample_service_mojom)),
+  ]
+  results = []
+  for (name, instance) in instances:
+    try:
+      serialization.SetCompiledCodecsEnabled(False)
+      generic = _Measure(serialization, instance, rounds)
+    finally:
+      serialization.SetCompiledCodecsEnabled(True)
+    compiled = _Measure(serialization, instance, rounds)
+    results.append(
+        '%s: serialize %.2f us (generic) vs %.2f us (compiled); '
+        'deserialize %.2f us (generic) vs %.2f us (compiled)' %
+        (name, generic[0], compiled[0], generic[1], compiled[1]))
+  for size in (10, 1000, 10000):
+    array_rounds = max(1, 100000 // size)
+    throughput = _MeasureArrays(
+        serialization, sample_service_mojom, size, array_rounds)
+    results.append(
+        'Arrays of %d structs and strings: serialize %.0f elements/s; '
+        'deserialize %.0f elements/s' % (size, throughput[0], throughput[1]))
+  return ('Result: rounds tested: %d\n%s' % (rounds, '\n'.join(results)))
@@ -0,0 +1,98 @@
+# Copyright 2015 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""Reads multi-megabyte driver outputs (a render tree dump, and an image block)
+the way webkitpy's Driver does, from ServerProcess's receive buffer and from a
+plain string (as ServerProcess used to buffer its output)."""
+
+import os
+import sys
+import time
+
+# The sizes of the reads from the pipe (the last one, as if the process
+# wrote faster than the driver reads, with a large pipe or a file).
+_READ_SIZES = (4096, 65536, 1 << 20)
+
+
+class _StringBuffer(object):
+  def __init__(self):
+    self._data = ''
+
+  def __len__(self):
+    return len(self._data)
+
+  def append(self, data):
+    self._data += data
+
+  def pop_line(self):
+    index_after_newline = self._data.find('\n') + 1
+    if index_after_newline > 0:
+      return self.pop(index_after_newline)
+    return None
+
+  def pop(self, size):
+    data, self._data = self._data[:size], self._data[size:]
+    return data
+
+
+def _SetUpPath(paths):
+  sky_tools_dir = os.path.join(paths.src_root, 'sky', 'tools')
+  if sky_tools_dir not in sys.path:
+    sys.path.append(sky_tools_dir)
+
+
+def _Output(text_size, image_size):
+  """Returns the output of a test with a |text_size| render tree dump and a
+  |image_size| image."""
+  line = 'layer at (0,0) size 800x600 ' + 'x' * 50 + '\n'
+  text = line * (text_size / len(line))
+  return ('#BEGIN\nContent-Type: text/plain\n' + text + '#EOF\n' +
+          'Content-Type: image/png\nContent-Length: %d\n' % image_size +
+          '\x89' * image_size + '#EOF\n')
+
+
+def _ReadOutput(buf, output, read_size):
+  """Reads the lines and the image block of |output|, as it arrives in
+  |read_size| reads; returns the number of lines."""
+  position = 0
+  lines = 0
+  content_length = None
+  while True:
+    if content_length:
+      if len(buf) >= content_length:
+        buf.pop(content_length)
+        content_length = None
+        continue
+    else:
+      line = buf.pop_line()
+      if line is not None:
+        lines += 1
+        if line.startswith('Content-Length: '):
+          content_length = int(line[len('Content-Length: '):])
+        continue
+    if position >= len(output):
+      return lines
+    buf.append(output[position:position + read_size])
+    position += read_size
+
+
+def run(args, paths):
+  _SetUpPath(paths)
+  # pylint: disable=F0401
+  from webkitpy.layout_tests.port.server_process import ReceiveBuffer
+
+  results = []
+  for (text_size, image_size) in ((1 << 20, 1 << 20), (4 << 20, 4 << 20)):
+    output = _Output(text_size, image_size)
+    for read_size in _READ_SIZES:
+      times = []
+      for buffer_class in (_StringBuffer, ReceiveBuffer):
+        start = time.time()
+        lines = _ReadOutput(buffer_class(), output, read_size)
+        times.append(time.time() - start)
+      results.append('%d MB text (%d lines) and %d MB image, %d byte reads: '
+                     '%.3f s with a string, %.3f s with ReceiveBuffer' %
+                     (text_size >> 20, lines, image_size >> 20, read_size,
+                      times[0], times[1]))
+  return 'Result:\n%s' % '\n'.join(results)
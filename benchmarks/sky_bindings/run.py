@@ -0,0 +1,120 @@
+# Copyright 2015 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+import multiprocessing
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def _IdlFiles(src_root, variable):
+  """Returns the absolute paths of the IDL files of |variable| in core.gni."""
+  core_dir = os.path.join(src_root, 'sky', 'engine', 'core')
+  with open(os.path.join(core_dir, 'core.gni')) as f:
+    match = re.search(r'^%s = get_path_info\(\[(.*?)\]' % variable, f.read(),
+                      re.M | re.S)
+  return [os.path.join(core_dir, path)
+          for path in re.findall(r'"([^"]+)"', match.group(1))]
+
+
+def _Call(command, cwd):
+  with open(os.devnull, 'w') as devnull:
+    return subprocess.call(command, cwd=cwd, stdout=devnull, stderr=devnull)
+
+
+def _WriteFileList(path, files):
+  with open(path, 'w') as f:
+    f.write('\n'.join(files))
+
+
+def _ComputeInterfacesInfo(scripts_dir, idl_files, output_dir):
+  """Generates what the compiler depends on (as the build does), returning the
+  paths of the overall interfaces info and of its digests."""
+  file_list = os.path.join(output_dir, 'file_list.txt')
+  _WriteFileList(file_list, idl_files)
+  individual = os.path.join(output_dir, 'InterfacesInfoIndividual.pickle')
+  overall = os.path.join(output_dir, 'InterfacesInfoOverall.pickle')
+  digests = os.path.join(output_dir, 'InterfacesInfoDigests.pickle')
+  for command in (
+      ['compute_interfaces_info_individual.py', '--component-dir', 'ignored',
+       '--idl-files-list', file_list, '--interfaces-info-file', individual,
+       '--write-file-only-if-changed=1'],
+      ['compute_interfaces_info_overall.py', '--write-file-only-if-changed=1',
+       '--interfaces-info-digests-file', digests, '--', individual, overall],
+      ['blink_idl_parser.py', output_dir]):
+    if _Call([sys.executable] + command, scripts_dir):
+      raise Exception('%s failed' % command[0])
+  return (overall, digests)
+
+
+def _CompilePerFile(scripts_dir, idl_files, output_dir, interfaces_info):
+  """Runs the compiler once per IDL file (as an action_foreach does), returning
+  the wall time and the number of failures."""
+  failures = 0
+  start = time.time()
+  for idl_file in idl_files:
+    if _Call([sys.executable, 'compiler.py', '--output-directory', output_dir,
+              '--interfaces-info-file', interfaces_info,
+              '--write-file-only-if-changed=1', idl_file], scripts_dir):
+      failures += 1
+  return (time.time() - start, failures)
+
+
+def _CompileBatch(scripts_dir, idl_files, output_dir, interfaces_info,
+                  extra_args=()):
+  """Runs the compiler once for all the IDL files, returning the wall time and
+  whether it failed."""
+  file_list = os.path.join(output_dir, 'compiler_file_list.txt')
+  _WriteFileList(file_list, idl_files)
+  start = time.time()
+  failed = _Call([sys.executable, 'compiler.py', '--output-directory',
+                  output_dir, '--interfaces-info-file', interfaces_info,
+                  '--write-file-only-if-changed=1', '--idl-files-list',
+                  file_list] + list(extra_args), scripts_dir)
+  return (time.time() - start, failed)
+
+
+def run(args, paths):
+  scripts_dir = os.path.join(paths.src_root, 'sky', 'engine', 'bindings',
+                             'scripts')
+  idl_files = _IdlFiles(paths.src_root, 'core_idl_files')
+  dependency_idl_files = _IdlFiles(paths.src_root, 'core_dependency_idl_files')
+  temp_dir = tempfile.mkdtemp()
+  try:
+    (interfaces_info, digests) = _ComputeInterfacesInfo(
+        scripts_dir, idl_files + dependency_idl_files, temp_dir)
+
+    # With the digests, the IDL files whose dependencies are unchanged are
+    # skipped.
+    def _CompileBatchWithDigests(*args):
+      return _CompileBatch(*args,
+                           extra_args=['--interfaces-info-digests-file',
+                                       digests])
+
+    results = []
+    for (name, compile_all) in (('per file', _CompilePerFile),
+                                ('batch', _CompileBatch),
+                                ('batch with digests',
+                                 _CompileBatchWithDigests)):
+      output_dir = os.path.join(temp_dir, name.replace(' ', '_'))
+      os.mkdir(output_dir)
+      # The first pass writes the outputs, the second one (as a rebuild after a
+      # change to a dependency that affects none of them would) leaves them
+      # unchanged.
+      (clean_time, failures) = compile_all(scripts_dir, idl_files, output_dir,
+                                           interfaces_info)
+      (rebuild_time, _) = compile_all(scripts_dir, idl_files, output_dir,
+                                      interfaces_info)
+      results.append('%s: %.2f s clean, %.2f s unchanged%s' %
+                     (name, clean_time, rebuild_time,
+                      ' (failed)' if failures else ''))
+  finally:
+    shutil.rmtree(temp_dir)
+
+  return ('Result: %d IDL files, %d CPUs\n%s' %
+          (len(idl_files), multiprocessing.cpu_count(), '\n'.join(results)))
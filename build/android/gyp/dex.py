@@ -4,6 +4,8 @@
 # Use of this source code is governed by a BSD-style license that can be
 # found in the LICENSE file.
 
+import hashlib
+import multiprocessing.pool
 import optparse
 import os
 import sys
@@ -12,22 +14,73 @@ from util import build_utils
 from util import md5_check
 
 
-def DoDex(options, paths):
+def _DexCommand(options, output_path, paths):
   dx_binary = os.path.join(options.android_sdk_tools, 'dx')
   # See http://crbug.com/272064 for context on --force-jumbo.
-  dex_cmd = [dx_binary, '--dex', '--force-jumbo', '--output', options.dex_path]
+  dex_cmd = [dx_binary, '--dex', '--force-jumbo', '--output', output_path]
   if options.no_locals != '0':
     dex_cmd.append('--no-locals')
+  return dex_cmd + paths
+
 
-  dex_cmd += paths
+def _Dex(options, output_path, paths):
+  dex_cmd = _DexCommand(options, output_path, paths)
 
-  record_path = '%s.md5.stamp' % options.dex_path
+  record_path = '%s.md5.stamp' % output_path
   md5_check.CallAndRecordIfStale(
       lambda: build_utils.CheckOutput(dex_cmd, print_stderr=False),
       record_path=record_path,
       input_paths=paths,
       input_strings=dex_cmd,
-      force=not os.path.exists(options.dex_path))
+      force=not os.path.exists(output_path))
+
+
+def DoDex(options, paths):
+  _Dex(options, options.dex_path, paths)
+  build_utils.WriteJson(paths, options.dex_path + '.inputs')
+
+
+def _IntermediateDexPath(intermediates_dir, path):
+  """Returns the path of the dexed jar of the input jar (or class directory)
+  |path|, in |intermediates_dir|."""
+  # The hash of the path tells apart inputs that have the same name.
+  path_hash = hashlib.md5(os.path.normpath(path)).hexdigest()[:8]
+  name = os.path.basename(os.path.normpath(path))
+  return os.path.join(intermediates_dir, '%s-%s.dex.jar' % (name, path_hash))
+
+
+def DoIncrementalDex(options, paths):
+  """Dexes each of |paths| into its own dexed jar (if it changed since it was
+  last dexed), then merges the dexed jars into the dex file."""
+  intermediates_dir = options.dex_path + '.intermediates'
+  build_utils.MakeDirectory(intermediates_dir)
+
+  intermediate_paths = [_IntermediateDexPath(intermediates_dir, path)
+                        for path in paths]
+
+  def DexInput((path, intermediate_path)):
+    _Dex(options, intermediate_path, [path])
+
+  # dx is mostly single-threaded, so the inputs are dexed concurrently (by a
+  # few dx processes only: ninja runs other actions alongside this one).
+  pool = multiprocessing.pool.ThreadPool(options.jobs)
+  try:
+    pool.map(DexInput, zip(paths, intermediate_paths))
+  finally:
+    pool.close()
+    pool.join()
+
+  # Remove the dexed jars of the inputs that were removed.
+  kept_names = set()
+  for intermediate_path in intermediate_paths:
+    kept_names.add(os.path.basename(intermediate_path))
+    kept_names.add(os.path.basename(intermediate_path) + '.md5.stamp')
+  for name in os.listdir(intermediates_dir):
+    if name not in kept_names:
+      os.remove(os.path.join(intermediates_dir, name))
+
+  # dx merges the classes.dex of the dexed jars it is given.
+  _Dex(options, options.dex_path, intermediate_paths)
   build_utils.WriteJson(paths, options.dex_path + '.inputs')
 
 
@@ -52,6 +105,13 @@ def main():
   parser.add_option('--inputs', help='A list of additional input paths.')
   parser.add_option('--excluded-paths',
                     help='A list of paths to exclude from the dex file.')
+  parser.add_option('--incremental', action='store_true',
+                    help=('Dex each input into its own dexed jar (only '
+                          're-dexing the inputs that changed), and merge '
+                          'the dexed jars into the dex file.'))
+  parser.add_option('--jobs', type='int', default=2,
+                    help=('The number of inputs dexed concurrently with '
+                          '--incremental.'))
 
   options, paths = parser.parse_args(args)
 
@@ -69,7 +129,10 @@ def main():
     exclude_paths = build_utils.ParseGypList(options.excluded_paths)
     paths = [p for p in paths if not p in exclude_paths]
 
-  DoDex(options, paths)
+  if options.incremental:
+    DoIncrementalDex(options, paths)
+  else:
+    DoDex(options, paths)
 
   if options.depfile:
     build_utils.WriteDepfile(
@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+# Copyright 2015 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""Tests for the incremental mode of dex.py."""
+
+import os
+import shutil
+import stat
+import tempfile
+import unittest
+
+import dex
+from util import md5_check
+
+# A fake dx: it logs the inputs of each call, and "dexes" them by concatenating
+# the contents of their files.
+_FAKE_DX = r'''#!/usr/bin/env python
+import os, sys
+args = sys.argv[1:]
+output = args[args.index('--output') + 1]
+inputs = [arg for arg in args[args.index('--output') + 2:]
+          if not arg.startswith('--')]
+with open(os.path.join(os.path.dirname(sys.argv[0]), 'dx.log'), 'a') as log:
+  log.write(' '.join(os.path.basename(i) for i in inputs) + '\n')
+contents = []
+for path in inputs:
+  if os.path.isdir(path):
+    for root, _, names in os.walk(path):
+      for name in sorted(names):
+        with open(os.path.join(root, name)) as f:
+          contents.append(f.read())
+  else:
+    with open(path) as f:
+      contents.append(f.read())
+with open(output, 'w') as f:
+  f.write(''.join(contents))
+'''
+
+
+class _Options(object):
+  def __init__(self, android_sdk_tools, dex_path):
+    self.android_sdk_tools = android_sdk_tools
+    self.dex_path = dex_path
+    self.no_locals = '0'
+    self.jobs = 2
+
+
+class TestIncrementalDex(unittest.TestCase):
+  def setUp(self):
+    self._temp_dir = tempfile.mkdtemp()
+    self._digest_cache = os.environ.pop(md5_check.DIGEST_CACHE_ENV_VAR, None)
+    sdk_tools = os.path.join(self._temp_dir, 'sdk_tools')
+    os.mkdir(sdk_tools)
+    dx_path = os.path.join(sdk_tools, 'dx')
+    with open(dx_path, 'w') as f:
+      f.write(_FAKE_DX)
+    os.chmod(dx_path, stat.S_IRWXU)
+    self._dx_log = os.path.join(sdk_tools, 'dx.log')
+    self._options = _Options(sdk_tools,
+                             os.path.join(self._temp_dir, 'out', 'classes.dex'))
+    os.mkdir(os.path.dirname(self._options.dex_path))
+
+  def tearDown(self):
+    if self._digest_cache is not None:
+      os.environ[md5_check.DIGEST_CACHE_ENV_VAR] = self._digest_cache
+    shutil.rmtree(self._temp_dir)
+
+  def _WriteClass(self, library, name, contents):
+    library_dir = os.path.join(self._temp_dir, library)
+    if not os.path.isdir(library_dir):
+      os.mkdir(library_dir)
+    with open(os.path.join(library_dir, name), 'w') as f:
+      f.write(contents)
+    return library_dir
+
+  def _Dex(self, paths):
+    """Dexes |paths| incrementally, returning the inputs dx was run on (one
+    string per call, sorted)."""
+    if os.path.exists(self._dx_log):
+      os.remove(self._dx_log)
+    dex.DoIncrementalDex(self._options, paths)
+    if not os.path.exists(self._dx_log):
+      return []
+    with open(self._dx_log) as f:
+      return sorted(f.read().splitlines())
+
+  def _DexedContents(self):
+    with open(self._options.dex_path) as f:
+      return f.read()
+
+  def testIncrementalDex(self):
+    a = self._WriteClass('a', 'A.class', 'A ')
+    b = self._WriteClass('b', 'B.class', 'B ')
+    dx_calls = self._Dex([a, b])
+    intermediates = sorted(
+        name for name in os.listdir(self._options.dex_path + '.intermediates')
+        if name.endswith('.dex.jar'))
+    self.assertEqual(2, len(intermediates))
+    self.assertEqual(sorted(['a', 'b', ' '.join(intermediates)]), dx_calls)
+    self.assertEqual('A B ', self._DexedContents())
+
+    self.assertEqual([], self._Dex([a, b]), 'nothing should be re-dexed')
+
+    self._WriteClass('a', 'A.class', 'A2 ')
+    self.assertEqual(['a', ' '.join(intermediates)], self._Dex([a, b]),
+                     'only the changed input should be re-dexed')
+    self.assertEqual('A2 B ', self._DexedContents())
+
+    self.assertEqual([intermediates[0]], self._Dex([a]),
+                     'a removed input should only be merged out')
+    self.assertEqual('A2 ', self._DexedContents())
+    self.assertEqual(
+        [intermediates[0], intermediates[0] + '.md5.stamp'],
+        sorted(os.listdir(self._options.dex_path + '.intermediates')))
+
+
+if __name__ == '__main__':
+  unittest.main()
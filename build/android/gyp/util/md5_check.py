@@ -3,18 +3,44 @@
 # found in the LICENSE file.
 
 import hashlib
+import json
 import os
+import tempfile
+import time
+
+
+# The environment variable naming the digest cache file shared by the actions
+# of an output directory (if any), e.g.:
+#   MD5_CHECK_DIGEST_CACHE=$PWD/out/Release/md5_check_digests ninja -C ...
+DIGEST_CACHE_ENV_VAR = 'MD5_CHECK_DIGEST_CACHE'
+
+# Files modified less than this many seconds before they are hashed may be
+# modified again without their modification time changing (depending on the
+# resolution of the file system), so their digests are only trusted for the
+# current build.
+_RACY_SECONDS = 2
+
+# The digest cache is rewritten without its outdated entries once it has this
+# many more lines than entries.
+_DIGEST_CACHE_MAX_OUTDATED_LINES = 10000
 
 
 def CallAndRecordIfStale(
     function, record_path=None, input_paths=None, input_strings=None,
-    force=False):
+    force=False, digest_cache_path=None):
   """Calls function if the md5sum of the input paths/strings has changed.
 
   The md5sum of the inputs is compared with the one stored in record_path. If
   this has changed (or the record doesn't exist), function will be called and
   the new md5sum will be recorded.
 
+  The record also holds the size, modification time and md5sum of each input
+  file, so that only the files whose size or modification time changed are
+  read. The md5sums of the files are also looked up in (and added to)
+  digest_cache_path, if given (or the file named by the MD5_CHECK_DIGEST_CACHE
+  environment variable), so that files that are inputs of several actions are
+  only read once.
+
   If force is True, the function will be called regardless of whether the
   md5sum is out of date.
   """
@@ -22,39 +48,140 @@ def CallAndRecordIfStale(
     input_paths = []
   if not input_strings:
     input_strings = []
+  if digest_cache_path is None:
+    digest_cache_path = os.environ.get(DIGEST_CACHE_ENV_VAR)
+  digest_cache = _DigestCache(digest_cache_path) if digest_cache_path else None
   md5_checker = _Md5Checker(
       record_path=record_path,
       input_paths=input_paths,
-      input_strings=input_strings)
+      input_strings=input_strings,
+      digest_cache=digest_cache)
   if force or md5_checker.IsStale():
     function()
     md5_checker.Write()
+  elif md5_checker.HasNewFileStats():
+    # Record the new modification times (e.g. of touched files), so that the
+    # files aren't read again.
+    md5_checker.Write()
+  if digest_cache:
+    digest_cache.Write()
 
 
-def _UpdateMd5ForFile(md5, path, block_size=2**16):
+def _Md5ForFile(path, block_size=2**16):
+  md5 = hashlib.md5()
   with open(path, 'rb') as infile:
     while True:
       data = infile.read(block_size)
       if not data:
         break
       md5.update(data)
+  return md5.hexdigest()
+
+
+def _ListFiles(path):
+  """Returns the files of path (in a deterministic order): path itself if it is
+  a file, or the files under it if it is a directory."""
+  if not os.path.isdir(path):
+    return [path]
+  files = []
+  for root, dirs, filenames in os.walk(path):
+    dirs.sort()
+    files.extend(os.path.join(root, f) for f in sorted(filenames))
+  return files
+
+
+class _FileStats(object):
+  """The (size, modification time, md5sum) records of files."""
+
+  def __init__(self, records=None):
+    self.records = records or {}
+
+  def Lookup(self, path, stat):
+    """Returns the md5sum of path if its record matches its stat, else None."""
+    record = self.records.get(path)
+    if record and record[0] == stat.st_size and record[1] == stat.st_mtime:
+      return record[2]
+    return None
+
+
+class _DigestCache(_FileStats):
+  """A file of file md5sums that can be shared by concurrent actions: each
+  action appends the records it adds with a single write, one line per file
+  (the last line for a file wins). It is only read if a file isn't in the
+  action's own record."""
+
+  def __init__(self, path):
+    _FileStats.__init__(self)
+    self._path = path
+    self._loaded = False
+    self._new_records = {}
+    self._line_count = 0
+
+  def _Load(self):
+    self._loaded = True
+    try:
+      with open(self._path, 'r') as cache_file:
+        for line in cache_file:
+          self._line_count += 1
+          try:
+            size, mtime, digest, file_path = line.rstrip('\n').split(' ', 3)
+            self.records[file_path] = (int(size), float(mtime), digest)
+          except ValueError:
+            # A line cut short by an action that was killed.
+            pass
+    except IOError:
+      pass
+
+  def Lookup(self, path, stat):
+    if not self._loaded:
+      self._Load()
+    return _FileStats.Lookup(self, path, stat)
+
+  def Add(self, path, record):
+    if not self._loaded:
+      self._Load()
+    if self.records.get(path) != record:
+      self.records[path] = record
+      self._new_records[path] = record
 
-
-def _UpdateMd5ForDirectory(md5, dir_path):
-  for root, _, files in os.walk(dir_path):
-    for f in files:
-      _UpdateMd5ForFile(md5, os.path.join(root, f))
-
-
-def _UpdateMd5ForPath(md5, path):
-  if os.path.isdir(path):
-    _UpdateMd5ForDirectory(md5, path)
-  else:
-    _UpdateMd5ForFile(md5, path)
+  def Write(self):
+    if not self._loaded:
+      return
+    if self._line_count > (len(self.records) +
+                           _DIGEST_CACHE_MAX_OUTDATED_LINES):
+      # Compact the cache (a concurrent action's additions may be lost, which
+      # only means its files will be read again). The temporary file is unique
+      # to each writer, as the actions of a process may run on several threads.
+      # Failing to compact isn't an error: the cache just stays as it is.
+      temp_path = None
+      try:
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(self._path),
+                                         suffix='.tmp')
+        with os.fdopen(fd, 'w') as cache_file:
+          os.fchmod(fd, 0644)
+          cache_file.write(self._Format(self.records))
+        os.rename(temp_path, self._path)
+      except (IOError, OSError):
+        if temp_path and os.path.exists(temp_path):
+          os.remove(temp_path)
+    elif self._new_records:
+      fd = os.open(self._path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0644)
+      try:
+        os.write(fd, self._Format(self._new_records))
+      finally:
+        os.close(fd)
+    self._new_records = {}
+
+  @staticmethod
+  def _Format(records):
+    # repr() keeps the full precision of the modification times.
+    return ''.join('%d %r %s %s\n' % (size, mtime, digest, path)
+                   for path, (size, mtime, digest) in sorted(records.items()))
 
 
 class _Md5Checker(object):
-  def __init__(self, record_path=None, input_paths=None, input_strings=None):
+  def __init__(self, record_path=None, input_paths=None, input_strings=None,
+               digest_cache=None):
     if not input_paths:
       input_paths = []
     if not input_strings:
@@ -66,21 +193,63 @@ class _Md5Checker(object):
 
     self.record_path = record_path
 
+    # The record is a JSON dictionary:
+    #   {"digest": md5sum of the inputs,
+    #    "files": {path: [size, modification time, md5sum], ...}}
+    # (records in the older format, just the md5sum, are simply stale).
+    self.old_digest = ''
+    old_file_stats = _FileStats()
+    if os.path.exists(self.record_path):
+      with open(self.record_path, 'r') as old_record:
+        try:
+          record = json.load(old_record)
+          self.old_digest = record['digest']
+          old_file_stats = _FileStats(record['files'])
+        except (ValueError, KeyError, TypeError):
+          pass
+
+    self._new_file_stats = False
+    self.file_records = {}
     md5 = hashlib.md5()
     for i in sorted(input_paths):
-      _UpdateMd5ForPath(md5, i)
+      for path in _ListFiles(i):
+        md5.update(self._GetFileDigest(path, old_file_stats, digest_cache))
     for s in input_strings:
       md5.update(s)
     self.new_digest = md5.hexdigest()
 
-    self.old_digest = ''
-    if os.path.exists(self.record_path):
-      with open(self.record_path, 'r') as old_record:
-        self.old_digest = old_record.read()
+  def _GetFileDigest(self, path, old_file_stats, digest_cache):
+    stat = os.stat(path)
+    digest = old_file_stats.Lookup(path, stat)
+    if digest:
+      self.file_records[path] = old_file_stats.records[path]
+      return digest
+    self._new_file_stats = True
+    # The cache is keyed by absolute paths, as the actions sharing it may run
+    # in different directories.
+    cache_key = os.path.abspath(path)
+    if digest_cache:
+      digest = digest_cache.Lookup(cache_key, stat)
+    if not digest:
+      digest = _Md5ForFile(path)
+    if time.time() - stat.st_mtime < _RACY_SECONDS:
+      # Don't trust the modification time to change with the contents; the
+      # file will be read again next time.
+      return digest
+    record = [stat.st_size, stat.st_mtime, digest]
+    self.file_records[path] = record
+    if digest_cache:
+      digest_cache.Add(cache_key, tuple(record))
+    return digest
 
   def IsStale(self):
     return self.old_digest != self.new_digest
 
+  def HasNewFileStats(self):
+    """Returns whether the record is missing the stats of some files."""
+    return self._new_file_stats
+
   def Write(self):
     with open(self.record_path, 'w') as new_record:
-      new_record.write(self.new_digest)
+      json.dump({'digest': self.new_digest, 'files': self.file_records},
+                new_record, sort_keys=True)
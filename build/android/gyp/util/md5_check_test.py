@@ -2,7 +2,10 @@
 # Use of this source code is governed by a BSD-style license that can be
 # found in the LICENSE file.
 
+import os
+import shutil
 import tempfile
+import time
 import unittest
 
 import md5_check # pylint: disable=W0403
@@ -67,6 +70,102 @@ class TestMd5Check(unittest.TestCase):
     input_strings.append('a brand new string')
     CheckCallAndRecord(True, 'added input string should trigger call')
 
+  def testFileStats(self):
+    temp_dir = tempfile.mkdtemp()
+    try:
+      input_dir = os.path.join(temp_dir, 'inputs')
+      os.mkdir(input_dir)
+      input_files = [os.path.join(input_dir, name) for name in ('a', 'b')]
+      # Files modified long enough ago to trust their modification times.
+      old_time = time.time() - 60
+      for input_file in input_files:
+        with open(input_file, 'w') as f:
+          f.write(input_file)
+        os.utime(input_file, (old_time, old_time))
+      record_path = os.path.join(temp_dir, 'record.stamp')
+      digest_cache_path = os.path.join(temp_dir, 'digests')
+
+      read_paths = []
+      md5_for_file = md5_check._Md5ForFile
+      def Md5ForFile(path):
+        read_paths.append(os.path.basename(path))
+        return md5_for_file(path)
+      md5_check._Md5ForFile = Md5ForFile
+
+      def CheckCallAndRecord(should_call, should_read, message,
+                             record_path=record_path, input_paths=None):
+        self.called = False
+        def MarkCalled():
+          self.called = True
+        del read_paths[:]
+        md5_check.CallAndRecordIfStale(
+            MarkCalled,
+            record_path=record_path,
+            input_paths=input_paths or [input_dir],
+            digest_cache_path=digest_cache_path)
+        self.failUnlessEqual(should_call, self.called, message)
+        self.failUnlessEqual(should_read, sorted(read_paths), message)
+
+      try:
+        CheckCallAndRecord(True, ['a', 'b'],
+                           'should read all files without a record')
+        CheckCallAndRecord(False, [], 'should not read unchanged files')
+
+        os.utime(input_files[0], (old_time + 1, old_time + 1))
+        CheckCallAndRecord(False, ['a'], 'should read touched file')
+        CheckCallAndRecord(False, [], 'should record new modification time')
+
+        with open(input_files[1], 'w') as f:
+          f.write('new contents')
+        os.utime(input_files[1], (old_time, old_time))
+        CheckCallAndRecord(True, ['b'], 'changed file should trigger call')
+
+        CheckCallAndRecord(
+            True, [], 'should look up files in the digest cache',
+            record_path=os.path.join(temp_dir, 'other.stamp'),
+            input_paths=input_files)
+      finally:
+        md5_check._Md5ForFile = md5_for_file
+    finally:
+      shutil.rmtree(temp_dir)
+
+  def testDigestCacheCompaction(self):
+    temp_dir = tempfile.mkdtemp()
+    try:
+      digest_cache_path = os.path.join(temp_dir, 'digests')
+      # Enough outdated lines (given the two records) for Write() to compact.
+      outdated_lines = md5_check._DIGEST_CACHE_MAX_OUTDATED_LINES + 3
+      with open(digest_cache_path, 'w') as f:
+        f.write('1 1.0 0123456789abcdeffedcba9876543210 /a\n' * outdated_lines)
+
+      def Compact():
+        digest_cache = md5_check._DigestCache(digest_cache_path)
+        digest_cache.Add('/b', (2, 2.0, '123456789abcdef00fedcba987654321'))
+        digest_cache.Write()
+
+      # A failed compaction leaves the cache as it is.
+      rename = os.rename
+      def FailingRename(src, dst):
+        raise OSError('rename failed')
+      os.rename = FailingRename
+      try:
+        Compact()
+      finally:
+        os.rename = rename
+      with open(digest_cache_path) as f:
+        self.failUnlessEqual(outdated_lines, len(f.readlines()))
+      self.failUnlessEqual(['digests'], os.listdir(temp_dir))
+
+      Compact()
+      with open(digest_cache_path) as f:
+        self.failUnlessEqual(
+            ['1 1.0 0123456789abcdeffedcba9876543210 /a\n',
+             '2 2.0 123456789abcdef00fedcba987654321 /b\n'], f.readlines())
+      self.failUnlessEqual(['digests'], os.listdir(temp_dir))
+      self.failUnlessEqual(0644, os.stat(digest_cache_path).st_mode & 0777)
+    finally:
+      shutil.rmtree(temp_dir)
+
 
 if __name__ == '__main__':
   unittest.main()
@@ -203,6 +203,7 @@ PYTHON_UNIT_TEST_SUITES = {
   'gyp_py_unittests': {
     'path': os.path.join(DIR_SOURCE_ROOT, 'build', 'android', 'gyp'),
     'test_modules': [
+      'dex_tests',
       'java_cpp_enum_tests',
     ]
   },
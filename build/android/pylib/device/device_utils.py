@@ -37,6 +37,7 @@ from pylib.utils import device_temp_file
 from pylib.utils import host_utils
 from pylib.utils import md5sum
 from pylib.utils import parallelizer
+from pylib.utils import reraiser_thread
 from pylib.utils import timeout_retry
 from pylib.utils import zip_utils
 
@@ -718,6 +719,10 @@ class DeviceUtils(object):
     self.RunShellCommand(['input', 'keyevent', format(keycode, 'd')],
                          check_return=True)
 
+  # The (uncompressed) size of the chunks large change sets are zipped and
+  # pushed in.
+  _PUSH_ZIP_CHUNK_SIZE = 32 * 1024 * 1024
+
   PUSH_CHANGED_FILES_DEFAULT_TIMEOUT = 10 * _DEFAULT_TIMEOUT
   PUSH_CHANGED_FILES_DEFAULT_RETRIES = _DEFAULT_RETRIES
 
@@ -791,13 +796,25 @@ class DeviceUtils(object):
     if not real_device_path:
       return [(host_path, device_path)]
 
-    host_hash_tuples = md5sum.CalculateHostMd5Sums([real_host_path])
-    device_paths_to_md5 = (
-        real_device_path if os.path.isfile(real_host_path)
-        else ('%s/%s' % (real_device_path, os.path.relpath(p, real_host_path))
-              for _, p in host_hash_tuples))
-    device_hash_tuples = md5sum.CalculateDeviceMd5Sums(
-        device_paths_to_md5, self)
+    # The host files are hashed (mostly just looked up in the host md5 cache)
+    # while the device files are.
+    host_files = md5sum.ListHostFiles([real_host_path])
+    host_hashing = reraiser_thread.ReraiserThread(
+        md5sum.GetHostMd5Cache().CalculateMd5Sums, [host_files])
+    host_hashing.start()
+    try:
+      # Only the device files that correspond to host files are hashed (the
+      # device directory may hold many more).
+      if os.path.isfile(host_path):
+        device_paths = [real_device_path]
+      else:
+        device_paths = ['%s/%s' % (real_device_path,
+                                   os.path.relpath(p, real_host_path))
+                        for p in host_files]
+      device_hash_tuples = md5sum.CalculateDeviceMd5Sums(device_paths, self)
+    finally:
+      host_hashing.join()
+    host_hash_tuples = host_hashing.GetReturnValue()
 
     if os.path.isfile(host_path):
       if (not device_hash_tuples
@@ -868,26 +885,58 @@ class DeviceUtils(object):
     if not files:
       return
 
-    with tempfile.NamedTemporaryFile(suffix='.zip') as zip_file:
+    # Large change sets are pushed in chunks: each chunk is zipped (in another
+    # process) while the previous one is pushed and unzipped.
+    chunks = self._SplitIntoZipChunks(files)
+    zips = []
+    zip_on_device = None
+
+    def start_zip(chunk):
+      zip_file = tempfile.NamedTemporaryFile(suffix='.zip')
       zip_proc = multiprocessing.Process(
           target=DeviceUtils._CreateDeviceZip,
-          args=(zip_file.name, files))
+          args=(zip_file.name, chunk))
+      zips.append((zip_file, zip_proc))
       zip_proc.start()
-      zip_proc.join()
 
-      zip_on_device = '%s/tmp.zip' % self.GetExternalStoragePath()
-      try:
+    try:
+      start_zip(chunks[0])
+      for i, (zip_file, zip_proc) in enumerate(zips):
+        zip_proc.join()
+        if i + 1 < len(chunks):
+          start_zip(chunks[i + 1])
+
+        if zip_on_device is None:
+          zip_on_device = '%s/tmp.zip' % self.GetExternalStoragePath()
         self.adb.Push(zip_file.name, zip_on_device)
+        zip_file.close()
         self.RunShellCommand(
             ['unzip', zip_on_device],
             as_root=True,
             env={'PATH': '%s:$PATH' % install_commands.BIN_DIR},
             check_return=True)
-      finally:
+    finally:
+      for zip_file, zip_proc in zips:
         if zip_proc.is_alive():
           zip_proc.terminate()
-        if self.IsOnline():
-          self.RunShellCommand(['rm', zip_on_device], check_return=True)
+        zip_file.close()
+      if zip_on_device and self.IsOnline():
+        self.RunShellCommand(['rm', zip_on_device], check_return=True)
+
+  @classmethod
+  def _SplitIntoZipChunks(cls, files):
+    """Splits |files| into lists of files of about _PUSH_ZIP_CHUNK_SIZE bytes
+    (each file is in a single chunk)."""
+    chunks = [[]]
+    chunk_size = 0
+    for host_path, device_path in files:
+      size = host_utils.GetRecursiveDiskUsage(host_path)
+      if chunks[-1] and chunk_size + size > cls._PUSH_ZIP_CHUNK_SIZE:
+        chunks.append([])
+        chunk_size = 0
+      chunks[-1].append((host_path, device_path))
+      chunk_size += size
+    return chunks
 
   @staticmethod
   def _CreateDeviceZip(zip_path, host_device_tuples):
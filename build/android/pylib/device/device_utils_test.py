@@ -27,6 +27,7 @@ from pylib.device import adb_wrapper
 from pylib.device import device_errors
 from pylib.device import device_utils
 from pylib.device import intent
+from pylib.utils import md5sum
 from pylib.utils import mock_calls
 
 # RunCommand from third_party/android_testrunner/run_command.py is mocked
@@ -946,6 +947,98 @@ class DeviceUtilsSendKeyEventTest(DeviceUtilsTest):
       self.device.SendKeyEvent(66)
 
 
+class DeviceUtilsGetChangedFilesImplTest(DeviceUtilsTest):
+
+  def HostMd5Cache(self, host_hash_tuples):
+    host_md5_cache = mock.Mock()
+    host_md5_cache.CalculateMd5Sums.return_value = host_hash_tuples
+    return mock.Mock(return_value=host_md5_cache)
+
+  def testGetChangedFilesImpl_noDevicePath(self):
+    with self.assertCall(
+        self.call.device.RunShellCommand(
+            ['realpath', '/test/device/path'], single_line=True,
+            check_return=True),
+        self.CommandError()):
+      self.assertEquals(
+          [('/test/host/path', '/test/device/path')],
+          self.device._GetChangedFilesImpl(
+              '/test/host/path', '/test/device/path'))
+
+  def testGetChangedFilesImpl_fileUnchanged(self):
+    with mock.patch('os.path.isfile', return_value=True), self.assertCalls(
+        (self.call.device.RunShellCommand(
+            ['realpath', '/test/device/path'], single_line=True,
+            check_return=True),
+         '/test/device/path'),
+        (mock.call.pylib.utils.md5sum.ListHostFiles(['/test/host/path']),
+         ['/test/host/path']),
+        (mock.call.pylib.utils.md5sum.GetHostMd5Cache(),
+         self.HostMd5Cache([md5sum.HashAndPath(
+             '0123456789abcdeffedcba9876543210', '/test/host/path')])),
+        (mock.call.pylib.utils.md5sum.CalculateDeviceMd5Sums(
+            ['/test/device/path'], self.device),
+         [md5sum.HashAndPath(
+             '0123456789abcdeffedcba9876543210', '/test/device/path')])):
+      self.assertEquals(
+          [],
+          self.device._GetChangedFilesImpl(
+              '/test/host/path', '/test/device/path'))
+
+  def testGetChangedFilesImpl_fileChanged(self):
+    with mock.patch('os.path.isfile', return_value=True), self.assertCalls(
+        (self.call.device.RunShellCommand(
+            ['realpath', '/test/device/path'], single_line=True,
+            check_return=True),
+         '/test/device/path'),
+        (mock.call.pylib.utils.md5sum.ListHostFiles(['/test/host/path']),
+         ['/test/host/path']),
+        (mock.call.pylib.utils.md5sum.GetHostMd5Cache(),
+         self.HostMd5Cache([md5sum.HashAndPath(
+             '0123456789abcdeffedcba9876543210', '/test/host/path')])),
+        (mock.call.pylib.utils.md5sum.CalculateDeviceMd5Sums(
+            ['/test/device/path'], self.device),
+         [md5sum.HashAndPath(
+             '123456789abcdef00fedcba987654321', '/test/device/path')])):
+      self.assertEquals(
+          [('/test/host/path', '/test/device/path')],
+          self.device._GetChangedFilesImpl(
+              '/test/host/path', '/test/device/path'))
+
+  def testGetChangedFilesImpl_directory(self):
+    # Only the device files of the host files are hashed, and those that are
+    # missing or differ are pushed.
+    host_files = ['/test/host/path/file1', '/test/host/path/file2',
+                  '/test/host/path/sub/file3']
+    with mock.patch('os.path.isfile', return_value=False), self.assertCalls(
+        (self.call.device.RunShellCommand(
+            ['realpath', '/test/device/path'], single_line=True,
+            check_return=True),
+         '/test/device/path'),
+        (mock.call.pylib.utils.md5sum.ListHostFiles(['/test/host/path']),
+         host_files),
+        (mock.call.pylib.utils.md5sum.GetHostMd5Cache(),
+         self.HostMd5Cache([
+             md5sum.HashAndPath('0123456789abcdeffedcba9876543210',
+                                '/test/host/path/file1'),
+             md5sum.HashAndPath('123456789abcdef00fedcba987654321',
+                                '/test/host/path/file2'),
+             md5sum.HashAndPath('23456789abcdef0110fedcba98765432',
+                                '/test/host/path/sub/file3')])),
+        (mock.call.pylib.utils.md5sum.CalculateDeviceMd5Sums(
+            ['/test/device/path/file1', '/test/device/path/file2',
+             '/test/device/path/sub/file3'], self.device),
+         [md5sum.HashAndPath('0123456789abcdeffedcba9876543210',
+                             '/test/device/path/file1'),
+          md5sum.HashAndPath('fedcba98765432100123456789abcdef',
+                             '/test/device/path/file2')])):
+      self.assertEquals(
+          [('/test/host/path/file2', '/test/device/path/file2'),
+           ('/test/host/path/sub/file3', '/test/device/path/sub/file3')],
+          self.device._GetChangedFilesImpl(
+              '/test/host/path', '/test/device/path'))
+
+
 class DeviceUtilsPushChangedFilesIndividuallyTest(DeviceUtilsTest):
 
   def testPushChangedFilesIndividually_empty(self):
@@ -979,6 +1072,8 @@ class DeviceUtilsPushChangedFilesZippedTest(DeviceUtilsTest):
     mock_zip_temp = mock.mock_open()
     mock_zip_temp.return_value.name = '/test/temp/file/tmp.zip'
     with self.assertCalls(
+        *([(mock.call.pylib.utils.host_utils.GetRecursiveDiskUsage(h), 1000)
+           for h, _ in test_files] + [
         (mock.call.tempfile.NamedTemporaryFile(suffix='.zip'), mock_zip_temp),
         (mock.call.multiprocessing.Process(
             target=device_utils.DeviceUtils._CreateDeviceZip,
@@ -994,7 +1089,7 @@ class DeviceUtilsPushChangedFilesZippedTest(DeviceUtilsTest):
             check_return=True),
         (self.call.device.IsOnline(), True),
         self.call.device.RunShellCommand(
-            ['rm', '/test/device/external_dir/tmp.zip'], check_return=True)):
+            ['rm', '/test/device/external_dir/tmp.zip'], check_return=True)])):
       self.device._PushChangedFilesZipped(test_files)
 
   def testPushChangedFilesZipped_single(self):
@@ -1006,6 +1101,48 @@ class DeviceUtilsPushChangedFilesZippedTest(DeviceUtilsTest):
         [('/test/host/path/file1', '/test/device/path/file1'),
          ('/test/host/path/file2', '/test/device/path/file2')])
 
+  def testPushChangedFilesZipped_chunks(self):
+    test_files = [
+        ('/test/host/path/file1', '/test/device/path/file1'),
+        ('/test/host/path/file2', '/test/device/path/file2')]
+    chunk_size = device_utils.DeviceUtils._PUSH_ZIP_CHUNK_SIZE
+    mock_zip_temps = [mock.mock_open(), mock.mock_open()]
+    mock_zip_temps[0].return_value.name = '/test/temp/file/tmp0.zip'
+    mock_zip_temps[1].return_value.name = '/test/temp/file/tmp1.zip'
+    unzip = self.call.device.RunShellCommand(
+        ['unzip', '/test/device/external_dir/tmp.zip'],
+        as_root=True,
+        env={'PATH': '/data/local/tmp/bin:$PATH'},
+        check_return=True)
+    with self.assertCalls(
+        (mock.call.pylib.utils.host_utils.GetRecursiveDiskUsage(
+            '/test/host/path/file1'), chunk_size),
+        (mock.call.pylib.utils.host_utils.GetRecursiveDiskUsage(
+            '/test/host/path/file2'), 1000),
+        (mock.call.tempfile.NamedTemporaryFile(suffix='.zip'),
+         mock_zip_temps[0]),
+        (mock.call.multiprocessing.Process(
+            target=device_utils.DeviceUtils._CreateDeviceZip,
+            args=('/test/temp/file/tmp0.zip', test_files[:1])), mock.Mock()),
+        # The second chunk is zipped while the first one is pushed.
+        (mock.call.tempfile.NamedTemporaryFile(suffix='.zip'),
+         mock_zip_temps[1]),
+        (mock.call.multiprocessing.Process(
+            target=device_utils.DeviceUtils._CreateDeviceZip,
+            args=('/test/temp/file/tmp1.zip', test_files[1:])), mock.Mock()),
+        (self.call.device.GetExternalStoragePath(),
+         '/test/device/external_dir'),
+        self.call.adb.Push(
+            '/test/temp/file/tmp0.zip', '/test/device/external_dir/tmp.zip'),
+        unzip,
+        self.call.adb.Push(
+            '/test/temp/file/tmp1.zip', '/test/device/external_dir/tmp.zip'),
+        unzip,
+        (self.call.device.IsOnline(), True),
+        self.call.device.RunShellCommand(
+            ['rm', '/test/device/external_dir/tmp.zip'], check_return=True)):
+      self.device._PushChangedFilesZipped(test_files)
+
 
 class DeviceUtilsFileExistsTest(DeviceUtilsTest):
 
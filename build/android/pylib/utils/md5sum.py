@@ -3,9 +3,13 @@
 # found in the LICENSE file.
 
 import collections
+import hashlib
+import json
 import logging
 import os
 import tempfile
+import threading
+import time
 import types
 
 from pylib import cmd_helper
@@ -17,9 +21,21 @@ HashAndPath = collections.namedtuple('HashAndPath', ['hash', 'path'])
 MD5SUM_DEVICE_LIB_PATH = '/data/local/tmp/md5sum/'
 MD5SUM_DEVICE_BIN_PATH = MD5SUM_DEVICE_LIB_PATH + 'md5sum_bin'
 
+# Files modified less than this many seconds before they are hashed may be
+# modified again without their modification time changing, so their hashes
+# aren't cached.
+_HOST_MD5_CACHE_RACY_SECONDS = 2
+
+# The paths that exist of each batch are hashed by a single md5sum process.
+# (md5sum_bin prints a hash even for a path it fails to read.)
 MD5SUM_DEVICE_SCRIPT_FORMAT = (
-    'test -f {path} -o -d {path} '
-    '&& LD_LIBRARY_PATH={md5sum_lib} {device_pie_wrapper} {md5sum_bin} {path}')
+    'set --; for p in {paths}; do test -f "$p" -o -d "$p" && set -- "$@" "$p"; '
+    'done; test $# -eq 0 || '
+    'LD_LIBRARY_PATH={md5sum_lib} {device_pie_wrapper} {md5sum_bin} "$@"')
+
+# The number of paths hashed by each md5sum process, which keeps its command
+# line well under the device's limit.
+_DEVICE_MD5SUM_BATCH_SIZE = 500
 
 
 def CalculateHostMd5Sums(paths):
@@ -32,6 +48,7 @@ def CalculateHostMd5Sums(paths):
   """
   if isinstance(paths, basestring):
     paths = [paths]
+  paths = list(paths)
 
   out = cmd_helper.GetCmdOutput(
       [os.path.join(constants.GetOutDirectory(), 'md5sum_bin_host')] +
@@ -39,6 +56,120 @@ def CalculateHostMd5Sums(paths):
   return [HashAndPath(*l.split(None, 1)) for l in out.splitlines()]
 
 
+def ListHostFiles(paths):
+  """Lists the files in |paths| the way md5sum_bin_host does.
+
+  Args:
+    paths: A list of host paths of files or directories.
+  Returns:
+    The sorted list of the absolute paths of the files in |paths| (walking
+    directories recursively, and skipping .svn directories).
+  """
+  if isinstance(paths, basestring):
+    paths = [paths]
+  paths = list(paths)
+
+  files = set()
+  for path in paths:
+    if os.path.isdir(path):
+      for root, dirs, filenames in os.walk(path, followlinks=True):
+        if '.svn' in dirs:
+          dirs.remove('.svn')
+        files.update(os.path.realpath(os.path.join(root, f))
+                     for f in filenames)
+    else:
+      files.add(os.path.realpath(path))
+  return sorted(files)
+
+
+class HostMd5Cache(object):
+  """A persistent cache of the MD5 sums of host files, keyed by their path,
+  size and modification time.
+
+  It is saved to a JSON file, so that files that didn't change since they were
+  last hashed (e.g. by a previous test run) aren't read again.
+  """
+
+  def __init__(self, cache_path):
+    self._cache_path = cache_path
+    self._lock = threading.Lock()
+    self._entries = None
+    self._dirty = False
+
+  def _Load(self):
+    self._entries = {}
+    try:
+      with open(self._cache_path) as cache_file:
+        self._entries = json.load(cache_file)
+    except (IOError, ValueError):
+      pass
+
+  def _Save(self):
+    temp_path = '%s.%d.tmp' % (self._cache_path, os.getpid())
+    try:
+      with open(temp_path, 'w') as cache_file:
+        json.dump(self._entries, cache_file)
+      os.rename(temp_path, self._cache_path)
+    except (IOError, OSError) as e:
+      logging.warning('Failed to save the host md5 cache: %s', e)
+
+  def CalculateMd5Sums(self, paths):
+    """Like CalculateHostMd5Sums(), only hashing the files whose size or
+    modification time changed since they were last hashed.
+
+    Args:
+      paths: A list of host paths to md5sum.
+    Returns:
+      A list of named tuples with 'hash' and 'path' attributes.
+    """
+    with self._lock:
+      if self._entries is None:
+        self._Load()
+      now = time.time()
+      results = []
+      for path in ListHostFiles(paths):
+        stat = os.stat(path)
+        entry = self._entries.get(path)
+        if (entry and entry[0] == stat.st_size
+            and entry[1] == stat.st_mtime):
+          md5 = entry[2]
+        else:
+          md5 = _CalculateFileMd5(path)
+          if now - stat.st_mtime >= _HOST_MD5_CACHE_RACY_SECONDS:
+            self._entries[path] = [stat.st_size, stat.st_mtime, md5]
+            self._dirty = True
+        results.append(HashAndPath(md5, path))
+      if self._dirty:
+        self._Save()
+        self._dirty = False
+      return results
+
+
+def _CalculateFileMd5(path, block_size=2**16):
+  md5 = hashlib.md5()
+  with open(path, 'rb') as f:
+    while True:
+      data = f.read(block_size)
+      if not data:
+        break
+      md5.update(data)
+  return md5.hexdigest()
+
+
+_host_md5_cache = None
+_host_md5_cache_lock = threading.Lock()
+
+
+def GetHostMd5Cache():
+  """Returns the HostMd5Cache of the output directory."""
+  global _host_md5_cache
+  with _host_md5_cache_lock:
+    if _host_md5_cache is None:
+      _host_md5_cache = HostMd5Cache(
+          os.path.join(constants.GetOutDirectory(), 'host_md5sum_cache.json'))
+    return _host_md5_cache
+
+
 def CalculateDeviceMd5Sums(paths, device):
   """Calculates the MD5 sum value for all items in |paths|.
 
@@ -49,6 +180,7 @@ def CalculateDeviceMd5Sums(paths, device):
   """
   if isinstance(paths, basestring):
     paths = [paths]
+  paths = list(paths)
 
   if not device.FileExists(MD5SUM_DEVICE_BIN_PATH):
     device.adb.Push(
@@ -63,10 +195,12 @@ def CalculateDeviceMd5Sums(paths, device):
       device_pie_wrapper = device.GetDevicePieWrapper()
       md5sum_script = (
           MD5SUM_DEVICE_SCRIPT_FORMAT.format(
-              path=p, md5sum_lib=MD5SUM_DEVICE_LIB_PATH,
+              paths=' '.join(cmd_helper.SingleQuote(p) for p in
+                             paths[i:i + _DEVICE_MD5SUM_BATCH_SIZE]),
+              md5sum_lib=MD5SUM_DEVICE_LIB_PATH,
               device_pie_wrapper=device_pie_wrapper,
               md5sum_bin=MD5SUM_DEVICE_BIN_PATH)
-          for p in paths)
+          for i in xrange(0, len(paths), _DEVICE_MD5SUM_BATCH_SIZE))
       md5sum_script_file.write('; '.join(md5sum_script))
       md5sum_script_file.flush()
       device.adb.Push(md5sum_script_file.name, md5sum_device_script_file.name)
@@ -4,7 +4,10 @@
 # found in the LICENSE file.
 
 import os
+import shutil
 import sys
+import tempfile
+import time
 import unittest
 
 from pylib import cmd_helper
@@ -178,6 +181,90 @@ class Md5SumTest(unittest.TestCase):
           ['sh', '/data/local/tmp/test/script/file.sh'])
 
 
+  def testCalculateDeviceMd5Sums_batches(self):
+    test_path = ['/storage/emulated/legacy/test/file%d.dat' % n
+                 for n in xrange(0, md5sum._DEVICE_MD5SUM_BATCH_SIZE + 1)]
+
+    device = mock.NonCallableMock()
+    device.adb = mock.NonCallableMock()
+    device.adb.Push = mock.Mock()
+    device.RunShellCommand = mock.Mock(return_value=[])
+
+    mock_temp_file = mock.mock_open()
+    mock_temp_file.return_value.name = '/tmp/test/script/file.sh'
+
+    mock_device_temp_file = mock.mock_open()
+    mock_device_temp_file.return_value.name = (
+        '/data/local/tmp/test/script/file.sh')
+
+    with mock.patch('tempfile.NamedTemporaryFile', new=mock_temp_file), (
+         mock.patch('pylib.utils.device_temp_file.DeviceTempFile',
+                    new=mock_device_temp_file)):
+      md5sum.CalculateDeviceMd5Sums(test_path, device)
+      md5sum_script = mock_temp_file.return_value.write.call_args[0][0]
+      self.assertEquals(
+          2, md5sum_script.count(md5sum.MD5SUM_DEVICE_BIN_PATH))
+      device.RunShellCommand.assert_called_once_with(
+          ['sh', '/data/local/tmp/test/script/file.sh'])
+
+
+class HostMd5CacheTest(unittest.TestCase):
+
+  def setUp(self):
+    self._temp_dir = os.path.realpath(tempfile.mkdtemp())
+    self._cache_path = os.path.join(self._temp_dir, 'cache.json')
+    self._host_dir = os.path.join(self._temp_dir, 'host')
+    os.makedirs(os.path.join(self._host_dir, 'sub', '.svn'))
+    # Files modified long enough ago for their hashes to be cached.
+    self._old_time = time.time() - 60
+    for name, contents in (('file0.dat', 'file 0'),
+                           (os.path.join('sub', 'file1.dat'), 'file 1'),
+                           (os.path.join('sub', '.svn', 'entries'), 'svn')):
+      self._WriteFile(name, contents)
+
+  def tearDown(self):
+    shutil.rmtree(self._temp_dir)
+
+  def _WriteFile(self, name, contents):
+    path = os.path.join(self._host_dir, name)
+    with open(path, 'w') as f:
+      f.write(contents)
+    os.utime(path, (self._old_time, self._old_time))
+
+  def testListHostFiles(self):
+    self.assertEquals(
+        [os.path.join(self._host_dir, 'file0.dat'),
+         os.path.join(self._host_dir, 'sub', 'file1.dat')],
+        md5sum.ListHostFiles(self._host_dir))
+
+  def testCalculateMd5Sums(self):
+    expected = [
+        md5sum.HashAndPath('ad2170c530bf8ff9f9b8635a56ede279',
+                           os.path.join(self._host_dir, 'file0.dat')),
+        md5sum.HashAndPath('ff1e0283123d14cf8bd52ac449770017',
+                           os.path.join(self._host_dir, 'sub', 'file1.dat')),
+    ]
+    cache = md5sum.HostMd5Cache(self._cache_path)
+    self.assertEquals(expected, cache.CalculateMd5Sums([self._host_dir]))
+
+    # A new cache (e.g. of a later run) doesn't read the files again.
+    with mock.patch('pylib.utils.md5sum._CalculateFileMd5') as mock_md5:
+      cache = md5sum.HostMd5Cache(self._cache_path)
+      self.assertEquals(expected, cache.CalculateMd5Sums([self._host_dir]))
+      self.assertFalse(mock_md5.called)
+
+    # Only the files that changed are read.
+    self._WriteFile('file0.dat', 'new file 0')
+    with mock.patch('pylib.utils.md5sum._CalculateFileMd5',
+                    return_value='0123456789abcdeffedcba9876543210'
+                    ) as mock_md5:
+      out = cache.CalculateMd5Sums([self._host_dir])
+      mock_md5.assert_called_once_with(
+          os.path.join(self._host_dir, 'file0.dat'))
+      self.assertEquals('0123456789abcdeffedcba9876543210', out[0].hash)
+      self.assertEquals(expected[1], out[1])
+
+
 if __name__ == '__main__':
   unittest.main(verbosity=2)
 
@@ -8,7 +8,9 @@ import email.utils
 import hashlib
 import logging
 import math
+import mmap
 import os.path
+import shutil
 import threading
 
 import SimpleHTTPServer
@@ -32,6 +34,11 @@ class UTC_TZINFO(datetime.tzinfo):
 
 UTC = UTC_TZINFO()
 
+# Files at least this large are sent from a memory mapping, rather than copied
+# through buffers.
+_ZERO_COPY_MIN_SIZE = 64 * 1024
+_ZERO_COPY_CHUNK_SIZE = 4 * 1024 * 1024
+
 
 class _SilentTCPServer(SocketServer.TCPServer):
   """
@@ -47,42 +54,61 @@ class _SilentTCPServer(SocketServer.TCPServer):
       SocketServer.TCPServer.handle_error(self, request, client_address)
 
 
+class _SilentThreadingTCPServer(SocketServer.ThreadingMixIn, _SilentTCPServer):
+  """
+  A _SilentTCPServer handling each connection in its own thread, so that
+  concurrent (and kept alive) connections don't wait for each other.
+  """
+  daemon_threads = True
+
+
+class _ETagCache(object):
+  """
+  Cache of the ETags (hashes of the contents) of files, which are only
+  recomputed when the size or modification time of the file changes.
+  """
+
+  def __init__(self):
+    self._lock = threading.Lock()
+    # (size, mtime, etag) by path.
+    self._etags = {}
+
+  def GetETag(self, path):
+    stat = os.stat(path)
+    with self._lock:
+      entry = self._etags.get(path)
+    if entry and entry[:2] == (stat.st_size, stat.st_mtime):
+      return entry[2]
+
+    sha256 = hashlib.sha256()
+    BLOCKSIZE = 65536
+    with open(path, 'rb') as hashed:
+      buf = hashed.read(BLOCKSIZE)
+      while len(buf) > 0:
+        sha256.update(buf)
+        buf = hashed.read(BLOCKSIZE)
+    etag = '"%s"' % sha256.hexdigest()
+    with self._lock:
+      self._etags[path] = (stat.st_size, stat.st_mtime, etag)
+    return etag
+
+
 def _GetHandlerClassForPath(base_path):
+  etag_cache = _ETagCache()
+
   class RequestHandler(SimpleHTTPServer.SimpleHTTPRequestHandler):
     """
     Handler for SocketServer.TCPServer that will serve the files from
     |base_path| directory over http.
     """
 
-    def __init__(self, *args, **kwargs):
-      self.etag = None
-      SimpleHTTPServer.SimpleHTTPRequestHandler.__init__(self, *args, **kwargs)
-
     def get_etag(self):
-      if self.etag:
-        return self.etag
-
       path = self.translate_path(self.path)
       if not os.path.isfile(path):
         return None
-
-      sha256 = hashlib.sha256()
-      BLOCKSIZE = 65536
-      with open(path, 'rb') as hashed:
-        buf = hashed.read(BLOCKSIZE)
-        while len(buf) > 0:
-          sha256.update(buf)
-          buf = hashed.read(BLOCKSIZE)
-      self.etag = '"%s"' % sha256.hexdigest()
-      return self.etag
+      return etag_cache.GetETag(path)
 
     def send_head(self):
-      # Always close the connection after each request, as the keep alive
-      # support from SimpleHTTPServer doesn't like when the client requests to
-      # close the connection before downloading the full response content.
-      # pylint: disable=W0201
-      self.close_connection = 1
-
       path = self.translate_path(self.path)
       if os.path.isfile(path):
         # Handle If-None-Match
@@ -90,6 +116,7 @@ def _GetHandlerClassForPath(base_path):
         if ('If-None-Match' in self.headers and
             etag == self.headers['If-None-Match']):
           self.send_response(304)
+          self.end_headers()
           return None
 
         # Handle If-Modified-Since
@@ -102,9 +129,32 @@ def _GetHandlerClassForPath(base_path):
               tzinfo=UTC)
           if last_modified <= ims:
             self.send_response(304)
+            self.end_headers()
             return None
 
-      return SimpleHTTPServer.SimpleHTTPRequestHandler.send_head(self)
+      result = SimpleHTTPServer.SimpleHTTPRequestHandler.send_head(self)
+      if result is None:
+        # Some responses without a body (e.g., redirections) have no
+        # Content-Length, so the client can only tell that they are complete
+        # when the connection is closed.
+        # pylint: disable=W0201
+        self.close_connection = 1
+      return result
+
+    def copyfile(self, source, outputfile):
+      size = os.fstat(source.fileno()).st_size
+      if size < _ZERO_COPY_MIN_SIZE:
+        shutil.copyfileobj(source, outputfile)
+        return
+      # Send the file from the page cache, without reading it in buffers.
+      mapping = mmap.mmap(source.fileno(), size, access=mmap.ACCESS_READ)
+      try:
+        outputfile.flush()
+        for offset in xrange(0, size, _ZERO_COPY_CHUNK_SIZE):
+          self.connection.sendall(
+              buffer(mapping, offset, _ZERO_COPY_CHUNK_SIZE))
+      finally:
+        mapping.close()
 
     def end_headers(self):
       path = self.translate_path(self.path)
@@ -129,14 +179,19 @@ def _GetHandlerClassForPath(base_path):
       pass
 
   RequestHandler.protocol_version = 'HTTP/1.1'
+  # The response headers are sent in many small writes, which (with Nagle's
+  # algorithm and delayed acks) stall kept alive connections.
+  RequestHandler.disable_nagle_algorithm = True
   return RequestHandler
 
 
-def StartHttpServer(path):
+def StartHttpServer(path, threaded=True):
   """Starts an http server serving files from |path| on random
-  (system-allocated) port. Returns the server address."""
+  (system-allocated) port. Returns the server address. Unless |threaded| is
+  False, each connection is handled in its own thread."""
   assert path
-  httpd = _SilentTCPServer(('127.0.0.1', 0), _GetHandlerClassForPath(path))
+  server_class = _SilentThreadingTCPServer if threaded else _SilentTCPServer
+  httpd = server_class(('127.0.0.1', 0), _GetHandlerClassForPath(path))
   atexit.register(httpd.shutdown)
 
   http_thread = threading.Thread(target=httpd.serve_forever)
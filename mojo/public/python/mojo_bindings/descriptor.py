@@ -79,6 +79,29 @@ class SerializableType(Type):
     """
     raise NotImplementedError()
 
+  def CanSerializeInPlace(self): # pylint: disable=R0201
+    """
+    Returns whether not null values of this type can be serialized with
+    GetInPlaceEncoding and SerializeInPlace. This allows arrays of this type to
+    compute the size of all their elements first, and allocate it at once.
+    """
+    return False
+
+  def GetInPlaceEncoding(self, value):
+    """
+    Returns a tuple (size, encoding) where size is the aligned size of the data
+    needed to serialize the given not null value, and encoding is the object to
+    pass to SerializeInPlace. Serializing in place never produces handles.
+    """
+    raise NotImplementedError()
+
+  def SerializeInPlace(self, encoding, data, offset):
+    """
+    Writes the given encoding, as returned by GetInPlaceEncoding, in the
+    existing data bytearray at offset.
+    """
+    raise NotImplementedError()
+
   def Deserialize(self, value, context):
     """
     Deserialize a value of this type.
@@ -221,9 +244,23 @@ class StringType(PointerType):
     return self._array_type.SerializeArray(
         string_array, data_offset, data, handle_offset)
 
+  def CanSerializeInPlace(self):
+    return True
+
+  def GetInPlaceEncoding(self, value):
+    encoded = value.encode('utf8')
+    return (_AlignedNativeArraySize(len(encoded)), (encoded, len(encoded)))
+
+  def SerializeInPlace(self, encoding, data, offset):
+    _WriteNativeArray(encoding[0], encoding[1], data, offset)
+
   def DeserializePointer(self, size, nb_elements, context):
-    string_array = self._array_type.DeserializeArray(size, nb_elements, context)
-    return unicode(string_array.tostring(), 'utf8')
+    string_data = buffer(context.data,
+                         serialization.HEADER_STRUCT.size,
+                         size - serialization.HEADER_STRUCT.size)
+    if context.IsLazy():
+      return serialization.DeferredValue(_DecodeString, string_data)
+    return _DecodeString(string_data)
 
 
 class BaseHandleType(SerializableType):
@@ -417,6 +454,8 @@ class GenericArrayType(BaseArrayType):
     return [self.sub_type.Convert(x) for x in value]
 
   def SerializeArray(self, value, data_offset, data, handle_offset):
+    if self.sub_type.CanSerializeInPlace():
+      return self._SerializeArrayInPlace(value, data_offset, data)
     size = (serialization.HEADER_STRUCT.size +
             self.sub_type.GetByteSize() * len(value))
     data_end = len(data)
@@ -441,6 +480,47 @@ class GenericArrayType(BaseArrayType):
                      *to_pack)
     return (data_offset, returned_handles)
 
+  def _SerializeArrayInPlace(self, value, data_offset, data):
+    """
+    Serialize an array of pointers in two passes: the first one computes the
+    size of all the elements, which are then written in a single allocation.
+    """
+    size = (serialization.HEADER_STRUCT.size +
+            self.sub_type.GetByteSize() * len(value))
+    inline_size = size + serialization.NeededPaddingForAlignment(size)
+    total_size = inline_size
+    encodings = []
+    for item in value:
+      if item is None:
+        if not self.sub_type.nullable:
+          raise serialization.SerializationException(
+              'Trying to serialize null for non nullable type.')
+        encodings.append(None)
+      else:
+        encoding = self.sub_type.GetInPlaceEncoding(item)
+        total_size += encoding[0]
+        encodings.append(encoding)
+
+    data_end = len(data)
+    data.extend(bytearray(total_size))
+    position = data_end + serialization.HEADER_STRUCT.size
+    element_position = data_end + inline_size
+    pointers = []
+    for encoding in encodings:
+      if encoding is None:
+        pointers.append(0)
+      else:
+        pointers.append(element_position - position)
+        self.sub_type.SerializeInPlace(encoding[1], data, element_position)
+        element_position += encoding[0]
+      position += self.sub_type.GetByteSize()
+    serialization.HEADER_STRUCT.pack_into(data, data_end, size, len(value))
+    struct.pack_into('<%dQ' % len(pointers),
+                     data,
+                     data_end + serialization.HEADER_STRUCT.size,
+                     *pointers)
+    return (data_offset, [])
+
   def DeserializeArray(self, size, nb_elements, context):
     values = struct.unpack_from(
         '%d%s' % (nb_elements, self.sub_type.GetTypeCode()),
@@ -448,6 +528,36 @@ class GenericArrayType(BaseArrayType):
     values_per_element = len(self.sub_type.GetTypeCode())
     assert nb_elements * values_per_element == len(values)
 
+    if isinstance(self.sub_type, (PointerType, MapType)):
+      result = self._DeserializePointers(values, context)
+    elif isinstance(self.sub_type, BaseHandleType) and values_per_element == 1:
+      # Handles only need to be claimed from the context.
+      result = [self.sub_type.Deserialize(x, context) for x in values]
+    else:
+      result = self._DeserializeElements(values, nb_elements, context)
+    if context.IsLazy():
+      # Only struct fields can defer their decoding.
+      result = [x.Get() if type(x) is serialization.DeferredValue else x
+                for x in result]
+    return result
+
+  def _DeserializePointers(self, values, context):
+    # Pointers are relative to their own position. Making them relative to the
+    # array allows deserializing all the elements from the array context,
+    # instead of building a context per element.
+    result = []
+    position = serialization.HEADER_STRUCT.size
+    pointer_size = self.sub_type.GetByteSize()
+    deserialize = self.sub_type.Deserialize
+    for value in values:
+      if value:
+        value += position
+      result.append(deserialize(value, context))
+      position += pointer_size
+    return result
+
+  def _DeserializeElements(self, values, nb_elements, context):
+    values_per_element = len(self.sub_type.GetTypeCode())
     result = []
     sub_context = context.GetSubContext(serialization.HEADER_STRUCT.size)
     for index in xrange(nb_elements):
@@ -477,15 +587,37 @@ class NativeArrayType(BaseArrayType):
   def Convert(self, value):
     if value is None:
       return value
-    if (isinstance(value, array.array) and
-        value.array_typecode == self.array_typecode):
+    if (isinstance(value, (array.array, NativeArrayView)) and
+        value.typecode == self.array_typecode):
       return value
     return array.array(self.array_typecode, value)
 
   def SerializeArray(self, value, data_offset, data, handle_offset):
+    if isinstance(value, NativeArrayView):
+      return _SerializeNativeArray(value.buffer, data_offset, data, len(value))
     return _SerializeNativeArray(value, data_offset, data, len(value))
 
+  def CanSerializeInPlace(self):
+    return True
+
+  def GetInPlaceEncoding(self, value):
+    if self.length != 0 and len(value) != self.length:
+      raise serialization.SerializationException('Incorrect array size')
+    if isinstance(value, NativeArrayView):
+      encoded = value.buffer
+    else:
+      encoded = buffer(value)
+    return (_AlignedNativeArraySize(len(encoded)), (encoded, len(value)))
+
+  def SerializeInPlace(self, encoding, data, offset):
+    _WriteNativeArray(encoding[0], encoding[1], data, offset)
+
   def DeserializeArray(self, size, nb_elements, context):
+    if context.IsLazy():
+      return NativeArrayView(self.array_typecode,
+                             buffer(context.data,
+                                    serialization.HEADER_STRUCT.size,
+                                    size - serialization.HEADER_STRUCT.size))
     result = array.array(self.array_typecode)
     result.fromstring(buffer(context.data,
                              serialization.HEADER_STRUCT.size,
@@ -496,6 +628,71 @@ class NativeArrayType(BaseArrayType):
     return nb_elements * self.element_size
 
 
+class NativeArrayView(object):
+  """
+  A read-only array of native values, viewing the data of a deserialized
+  message without copying it. The view keeps the message data alive.
+  """
+
+  def __init__(self, typecode, data):
+    self.typecode = typecode
+    self.itemsize = struct.calcsize('<%s' % typecode)
+    self._data = data
+    self._length = len(data) // self.itemsize
+
+  @property
+  def buffer(self):
+    """The read-only buffer containing the encoded values."""
+    return self._data
+
+  def ToArray(self):
+    """Returns a copy of this view as an array.array."""
+    result = array.array(self.typecode)
+    result.fromstring(self._data)
+    return result
+
+  def tolist(self):
+    return list(self._Unpack())
+
+  def tostring(self):
+    return str(self._data)
+
+  def _Unpack(self):
+    return struct.unpack_from('<%d%s' % (self._length, self.typecode),
+                              self._data)
+
+  def __len__(self):
+    return self._length
+
+  def __iter__(self):
+    return iter(self._Unpack())
+
+  def __getitem__(self, index):
+    if isinstance(index, slice):
+      return self.tolist()[index]
+    if index < 0:
+      index += self._length
+    if index < 0 or index >= self._length:
+      raise IndexError('array index out of range')
+    return struct.unpack_from('<%s' % self.typecode, self._data,
+                              index * self.itemsize)[0]
+
+  def __eq__(self, other):
+    if isinstance(other, NativeArrayView):
+      return (self.typecode == other.typecode and
+              self._data[:] == other.buffer[:])
+    try:
+      return len(self) == len(other) and self.tolist() == list(other)
+    except TypeError:
+      return False
+
+  def __ne__(self, other):
+    return not self.__eq__(other)
+
+  def __repr__(self):
+    return 'NativeArrayView(%r, %r)' % (self.typecode, self.tolist())
+
+
 class StructType(PointerType):
   """Type object for structs."""
 
@@ -522,10 +719,21 @@ class StructType(PointerType):
     return None
 
   def SerializePointer(self, value, data_offset, data, handle_offset):
-    (new_data, new_handles) = value.Serialize(handle_offset)
-    data.extend(new_data)
+    new_handles = value.SerializeInto(data, handle_offset)
     return (data_offset, new_handles)
 
+  # pylint: disable=W0212
+  def CanSerializeInPlace(self):
+    return self.struct_type._serialization.CanPackInPlace()
+
+  # pylint: disable=W0212
+  def GetInPlaceEncoding(self, value):
+    return (self.struct_type._serialization.size, value)
+
+  # pylint: disable=W0212
+  def SerializeInPlace(self, encoding, data, offset):
+    self.struct_type._serialization.PackInPlace(encoding, data, offset)
+
   def DeserializePointer(self, size, nb_elements, context):
     return self.struct_type.Deserialize(context)
 
@@ -743,6 +951,22 @@ def _SerializeNativeArray(value, data_offset, data, length):
   return (data_offset, [])
 
 
+def _AlignedNativeArraySize(nb_bytes):
+  size = serialization.HEADER_STRUCT.size + nb_bytes
+  return size + serialization.NeededPaddingForAlignment(size)
+
+
+def _WriteNativeArray(encoded, length, data, offset):
+  data_start = offset + serialization.HEADER_STRUCT.size
+  serialization.HEADER_STRUCT.pack_into(
+      data, offset, serialization.HEADER_STRUCT.size + len(encoded), length)
+  data[data_start:data_start + len(encoded)] = encoded
+
+
+def _DecodeString(data):
+  return unicode(data, 'utf8')
+
+
 def _ConvertBooleansToByte(booleans):
   """Pack a list of booleans into an integer."""
   return reduce(lambda x, y: x * 2 + y, reversed(booleans), 0)
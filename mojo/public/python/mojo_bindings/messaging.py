@@ -20,6 +20,13 @@ NO_FLAG = 0
 MESSAGE_EXPECTS_RESPONSE_FLAG = 1 << 0
 MESSAGE_IS_RESPONSE_FLAG = 1 << 1
 
+# The default maximum number of messages a Connector reads from its message
+# pipe before yielding back to the run loop.
+DEFAULT_MAX_MESSAGES_PER_READ = 32
+
+# The initial size of the buffer a Connector reads messages into.
+_INITIAL_RECEIVE_BUFFER_SIZE = 4096
+
 
 class MessagingException(Exception):
   def __init__(self, *args, **kwargs):
@@ -198,6 +205,15 @@ class ConnectionErrorHandler(object):
     raise NotImplementedError()
 
 
+class ConnectorStats(object):
+  """Counters about the messages read by a Connector."""
+
+  def __init__(self):
+    self.messages_read = 0
+    self.bytes_read = 0
+    self.buffer_resizes = 0
+
+
 class Connector(MessageReceiver):
   """
   A Connector owns a message pipe and will send any received messages to the
@@ -214,6 +230,12 @@ class Connector(MessageReceiver):
     self._cancellable = None
     self._incoming_message_receiver = None
     self._error_handler = None
+    self._max_messages_per_read = DEFAULT_MAX_MESSAGES_PER_READ
+    # Messages are read into this buffer, which grows to fit the biggest
+    # message received so far, so that a message can be read in a single call.
+    self._receive_buffer = bytearray(_INITIAL_RECEIVE_BUFFER_SIZE)
+    self._receive_handles_size = 0
+    self._stats = ConnectorStats()
 
   def __del__(self):
     if self._cancellable:
@@ -233,6 +255,20 @@ class Connector(MessageReceiver):
     """
     self._error_handler = error_handler
 
+  def SetMaxMessagesPerRead(self, max_messages):
+    """
+    Set the maximum number of messages read each time the message pipe becomes
+    readable. Remaining messages are read on the next iteration of the run
+    loop, so that a busy message pipe does not starve other handles. 0 means no
+    limit.
+    """
+    self._max_messages_per_read = max_messages
+
+  @property
+  def stats(self):
+    """The ConnectorStats of the messages read by this Connector."""
+    return self._stats
+
   def Start(self):
     assert not self._cancellable
     self._RegisterAsyncWaiterForRead()
@@ -278,14 +314,45 @@ class Connector(MessageReceiver):
   def _ReadOutstandingMessages(self):
     result = None
     dispatched = True
+    nb_messages = 0
     while dispatched:
-      result, dispatched = _ReadAndDispatchMessage(
-          self._handle, self._incoming_message_receiver)
+      if (self._max_messages_per_read and
+          nb_messages >= self._max_messages_per_read):
+        # Let the run loop service other handles before reading more.
+        self._RegisterAsyncWaiterForRead()
+        return
+      result, dispatched = self._ReadAndDispatchMessage()
+      nb_messages += 1
     if result == system.RESULT_SHOULD_WAIT:
       self._RegisterAsyncWaiterForRead()
       return
     self._OnError(result)
 
+  def _ReadAndDispatchMessage(self):
+    dispatched = False
+    (result, data, sizes) = self._handle.ReadMessage(
+        self._receive_buffer, self._receive_handles_size)
+    if result == system.RESULT_RESOURCE_EXHAUSTED:
+      self._GrowReceiveBuffer(sizes[0], sizes[1])
+      (result, data, _) = self._handle.ReadMessage(
+          self._receive_buffer, self._receive_handles_size)
+    if result == system.RESULT_OK:
+      # |data| contains a copy of the read part of the receive buffer, so the
+      # buffer can be reused for the next message.
+      self._stats.messages_read += 1
+      self._stats.bytes_read += len(data[0])
+      if self._incoming_message_receiver:
+        dispatched = self._incoming_message_receiver.Accept(
+            Message(data[0], data[1]))
+    return (result, dispatched)
+
+  def _GrowReceiveBuffer(self, buffer_size, handles_size):
+    if buffer_size > len(self._receive_buffer):
+      self._receive_buffer = bytearray(
+          max(buffer_size, 2 * len(self._receive_buffer)))
+      self._stats.buffer_resizes += 1
+    self._receive_handles_size = max(self._receive_handles_size, handles_size)
+
 
 class Router(MessageReceiverWithResponder):
   """
@@ -320,6 +387,15 @@ class Router(MessageReceiverWithResponder):
     """
     self._connector.SetErrorHandler(error_handler)
 
+  def SetMaxMessagesPerRead(self, max_messages):
+    """See Connector.SetMaxMessagesPerRead."""
+    self._connector.SetMaxMessagesPerRead(max_messages)
+
+  @property
+  def stats(self):
+    """The ConnectorStats of the owned Connector."""
+    return self._connector.stats
+
   def Accept(self, message):
     # A message without responder is directly forwarded to the connector.
     return self._connector.Accept(message)
@@ -393,17 +469,5 @@ def _WeakCallback(callback):
   return Callback
 
 
-def _ReadAndDispatchMessage(handle, message_receiver):
-  dispatched = False
-  (result, _, sizes) = handle.ReadMessage()
-  if result == system.RESULT_OK and message_receiver:
-    dispatched = message_receiver.Accept(Message(bytearray(), []))
-  if result != system.RESULT_RESOURCE_EXHAUSTED:
-    return (result, dispatched)
-  (result, data, _) = handle.ReadMessage(bytearray(sizes[0]), sizes[1])
-  if result == system.RESULT_OK and message_receiver:
-    dispatched = message_receiver.Accept(Message(data[0], data[1]))
-  return (result, dispatched)
-
 def _HasRequestId(flags):
   return flags & (MESSAGE_EXPECTS_RESPONSE_FLAG|MESSAGE_IS_RESPONSE_FLAG) != 0
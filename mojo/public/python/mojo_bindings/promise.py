@@ -6,14 +6,30 @@
 Promise used by the python bindings.
 
 The API is following the ECMAScript 6 API for promises.
+
+The callbacks of the promises are run iteratively, from a queue of callbacks
+(see _CallbackQueue), so that long chains of promises don't build deep stacks.
+By default, the queue is run synchronously: the callbacks have all run when the
+outermost call settling a promise (or adding callbacks to a settled one)
+returns. The callbacks added while the queue runs (e.g. by Then() on a settled
+promise from inside a callback) are queued too, so they run after the running
+callback returns, not during it. After SetRunLoop(), the queue is run in a task
+posted to the run loop, as ECMAScript 6 promises do.
 """
 
+import collections
 import sys
+import threading
+import weakref
 
 
 class Promise(object):
   """The promise object."""
 
+  # There can be many promises alive (e.g., in long chains), so they are kept
+  # small.
+  __slots__ = ('_reactions', '_state', '_result')
+
   STATE_PENDING = 0
   STATE_FULLFILLED = 1
   STATE_REJECTED = 2
@@ -30,9 +46,9 @@ class Promise(object):
       A promise can only be resolved or rejected once, all following calls will
       have no effect.
     """
-    self._onCatched = []
-    self._onFulfilled = []
-    self._onRejected = []
+    # The (promise, onFullfilled, onRejected) tuples to run when this promise
+    # settles (see _RunReaction), if any.
+    self._reactions = None
     self._state = Promise.STATE_PENDING
     self._result = None
     try:
@@ -89,7 +105,7 @@ class Promise(object):
         reject(reason)
 
       for (i, promise) in enumerate(promises):
-        promise.Then(OnFullfilled(i), OnRejected)
+        promise._AddReaction((None, OnFullfilled(i), OnRejected))
     return Promise(GeneratorFunction)
 
   @staticmethod
@@ -110,14 +126,15 @@ class Promise(object):
           callback(res)
         return OnEvent
       for promise in [Promise.Resolve(x) for x in iterable]:
-        promise.Then(OnEvent(resolve), OnEvent(reject))
+        promise._AddReaction((None, OnEvent(resolve), OnEvent(reject)))
     return Promise(GeneratorFunction)
 
   @property
   def state(self):
-    if isinstance(self._result, Promise):
-      return self._result.state
-    return self._state
+    promise = self
+    while promise._state == Promise.STATE_BOUND:
+      promise = promise._result
+    return promise._state
 
   def Then(self, onFullfilled=None, onRejected=None):
     """
@@ -130,20 +147,9 @@ class Promise(object):
     error is thrown in the callback, the returned promise rejects with that
     error.
     """
-    if isinstance(self._result, Promise):
-      return self._result.Then(onFullfilled, onRejected)
-    def GeneratorFunction(resolve, reject):
-      recover = reject
-      if onRejected:
-        recover = resolve
-      if self._state == Promise.STATE_PENDING:
-        self._onFulfilled.append(_Delegate(resolve, reject, onFullfilled))
-        self._onRejected.append(_Delegate(recover, reject, onRejected))
-      if self._state == self.STATE_FULLFILLED:
-        _Delegate(resolve, reject, onFullfilled)(self._result)
-      if self._state == self.STATE_REJECTED:
-        _Delegate(recover, reject, onRejected)(self._result)
-    return Promise(GeneratorFunction)
+    promise = Promise(_NoOp)
+    self._AddReaction((promise, onFullfilled, onRejected))
+    return promise
 
   def Catch(self, onCatched):
     """Equivalent to |Then(None, onCatched)|"""
@@ -165,29 +171,41 @@ class Promise(object):
 
 
   def _Resolve(self, value):
-    if self.state != Promise.STATE_PENDING:
+    if self._state != Promise.STATE_PENDING:
       return
-    self._result = value
     if isinstance(value, Promise):
+      # This promise settles like |value| does.
       self._state = Promise.STATE_BOUND
-      self._result.Then(_IterateAction(self._onFulfilled),
-                        _IterateAction(self._onRejected))
+      self._result = value
+      value._AddReaction((self, None, None))
       return
-    self._state = Promise.STATE_FULLFILLED
-    for f in self._onFulfilled:
-      f(value)
-    self._onFulfilled = None
-    self._onRejected = None
+    self._Settle(Promise.STATE_FULLFILLED, value)
 
   def _Reject(self, reason):
-    if self.state != Promise.STATE_PENDING:
+    if self._state != Promise.STATE_PENDING:
       return
-    self._result = reason
-    self._state = Promise.STATE_REJECTED
-    for f in self._onRejected:
-      f(reason)
-    self._onFulfilled = None
-    self._onRejected = None
+    self._Settle(Promise.STATE_REJECTED, reason)
+
+  def _Settle(self, state, result):
+    if self._state not in (Promise.STATE_PENDING, Promise.STATE_BOUND):
+      return
+    self._state = state
+    self._result = result
+    reactions = self._reactions
+    if reactions:
+      self._reactions = None
+      queue = _GetCallbackQueue()
+      for reaction in reactions:
+        queue.Add(reaction, state, result)
+
+  def _AddReaction(self, reaction):
+    if self._state in (Promise.STATE_PENDING, Promise.STATE_BOUND):
+      if self._reactions is None:
+        self._reactions = [reaction]
+      else:
+        self._reactions.append(reaction)
+    else:
+      _GetCallbackQueue().Add(reaction, self._state, self._result)
 
 
 def async(f):
@@ -200,22 +218,94 @@ def async(f):
   return _ResolvePromises
 
 
-def _IterateAction(iterable):
-  def _Run(x):
-    for f in iterable:
-      f(x)
-  return _Run
+def SetRunLoop(run_loop):
+  """
+  Makes the promises of the current thread run their callbacks in tasks posted
+  to |run_loop|, or synchronously if |run_loop| is None (the default).
+  """
+  queue = _GetCallbackQueue()
+  queue.run_loop = weakref.ref(run_loop) if run_loop else None
+  queue.Reset()
+
+
+def _NoOp(resolve, reject):
+  pass
+
+
+def _RunReaction(reaction, state, result):
+  """Runs the callback of |reaction| for a promise that settled to |state| with
+  |result|, and settles the promise of |reaction| with its result."""
+  (promise, onFullfilled, onRejected) = reaction
+  action = onFullfilled if state == Promise.STATE_FULLFILLED else onRejected
+  if promise is None:
+    # Internal callbacks, that don't need a promise of their result.
+    if action:
+      action(result)
+    return
+  if not action:
+    promise._Settle(state, result)
+    return
+  try:
+    value = action(result)
+  except Exception as e:
+    # Adding traceback similarly to python 3.0 (pep-3134)
+    e.__traceback__ = sys.exc_info()[2]
+    promise._Reject(e)
+    return
+  promise._Resolve(value)
+
 
+class _CallbackQueue(object):
+  """The callbacks of the promises (of a thread) to run."""
 
-def _Delegate(resolve, reject, action):
-  def _Run(x):
+  def __init__(self):
+    # A weak reference to the run loop to run the callbacks on (the callbacks
+    # are run synchronously if it is None or the run loop is gone).
+    self.run_loop = None
+    self._reactions = collections.deque()
+    # Whether Run() is running.
+    self._running = False
+    # A weak reference to the run loop a Run() task is posted to, if any (if
+    # the run loop is gone before running it, or another run loop is set, the
+    # callbacks are run by the next Add()).
+    self._posted_to = None
+
+  def Add(self, reaction, state, result):
+    self._reactions.append((reaction, state, result))
+    if self._running:
+      # The callback will be run by the running Run().
+      return
+    run_loop = self.run_loop() if self.run_loop else None
+    if self._posted_to and run_loop and self._posted_to() is run_loop:
+      # The callback will be run by the posted Run().
+      return
+    if run_loop:
+      self._posted_to = self.run_loop
+      run_loop.PostDelayedTask(self.Run)
+    else:
+      self.Run()
+
+  def Reset(self):
+    """Forgets the posted Run() task (if any), so that the callbacks added next
+    don't wait for it."""
+    self._posted_to = None
+
+  def Run(self):
+    self._posted_to = None
+    self._running = True
     try:
-      if action:
-        resolve(action(x))
-      else:
-        resolve(x)
-    except Exception as e:
-      # Adding traceback similarly to python 3.0 (pep-3134)
-      e.__traceback__ = sys.exc_info()[2]
-      reject(e)
-  return _Run
+      reactions = self._reactions
+      while reactions:
+        _RunReaction(*reactions.popleft())
+    finally:
+      self._running = False
+
+
+_CALLBACK_QUEUES = threading.local()
+
+
+def _GetCallbackQueue():
+  queue = getattr(_CALLBACK_QUEUES, 'queue', None)
+  if queue is None:
+    queue = _CALLBACK_QUEUES.queue = _CallbackQueue()
+  return queue
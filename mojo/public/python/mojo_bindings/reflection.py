@@ -102,14 +102,23 @@ class MojoStructType(type):
     # Add init
     dictionary['__init__'] = _StructInit(fields)
 
-    # Add serialization method
+    # Add serialization method. The codecs specialized for this struct are
+    # compiled here, once per class.
     serialization_object = serialization.Serialization(groups)
     def Serialize(self, handle_offset=0):
       return serialization_object.Serialize(self, handle_offset)
     dictionary['Serialize'] = Serialize
 
+    def SerializeInto(self, data, handle_offset=0):
+      return serialization_object.SerializeInto(self, data, handle_offset)
+    dictionary['SerializeInto'] = SerializeInto
+    dictionary['_serialization'] = serialization_object
+
     # pylint: disable=W0212
     def AsDict(self):
+      for (name, value) in self._fields.iteritems():
+        if type(value) is serialization.DeferredValue:
+          self._fields[name] = value.Get()
       return self._fields
     dictionary['AsDict'] = AsDict
 
@@ -190,7 +199,11 @@ def _BuildProperty(field):
   def Get(self):
     if field.name not in self._fields:
       self._fields[field.name] = field.GetDefaultValue()
-    return self._fields[field.name]
+    value = self._fields[field.name]
+    if type(value) is serialization.DeferredValue:
+      value = value.Get()
+      self._fields[field.name] = value
+    return value
 
   # pylint: disable=W0212
   def Set(self, value):
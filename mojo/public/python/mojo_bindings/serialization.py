@@ -10,6 +10,18 @@ import struct
 # Format of a header for a struct or an array.
 HEADER_STRUCT = struct.Struct("<II")
 
+# Whether structs are serialized/deserialized with their compiled codecs. See
+# SetCompiledCodecsEnabled.
+_compiled_codecs_enabled = True
+
+
+def SetCompiledCodecsEnabled(enabled):
+  """Enables or disables the use of the compiled per-struct codecs. When
+     disabled, all structs use the generic serialization path.
+  """
+  global _compiled_codecs_enabled
+  _compiled_codecs_enabled = bool(enabled)
+
 
 def Flatten(value):
   """Flattens nested lists/tuples into an one-level list. If value is not a
@@ -35,6 +47,21 @@ class DeserializationException(Exception):
   pass
 
 
+class DeferredValue(object):
+  """
+  A deserialized value whose decoding is deferred until it is first accessed
+  through the struct containing it.
+  """
+
+  def __init__(self, decode, data):
+    self._decode = decode
+    self._data = data
+
+  def Get(self):
+    """Decodes and returns the value."""
+    return self._decode(self._data)
+
+
 class DeserializationContext(object):
 
   def ClaimHandle(self, handle):
@@ -49,14 +76,26 @@ class DeserializationContext(object):
   def IsInitialContext(self):
     raise NotImplementedError()
 
+  def IsLazy(self):
+    """
+    Returns whether native arrays are deserialized as views over the data, and
+    strings decoded on first access, instead of being copied.
+    """
+    raise NotImplementedError()
+
 
 class RootDeserializationContext(DeserializationContext):
-  def __init__(self, data, handles):
+  def __init__(self, data, handles, lazy=False):
+    """
+    If lazy is True, the deserialized values may keep references to data, which
+    must then not be modified while they are in use.
+    """
     if isinstance(data, buffer):
       self.data = data
     else:
       self.data = buffer(data)
     self._handles = handles
+    self._lazy = lazy
     self._next_handle = 0;
     self._next_memory = 0;
 
@@ -77,6 +116,9 @@ class RootDeserializationContext(DeserializationContext):
   def IsInitialContext(self):
     return True
 
+  def IsLazy(self):
+    return self._lazy
+
 
 class _ChildDeserializationContext(DeserializationContext):
   def __init__(self, parent, offset):
@@ -96,6 +138,9 @@ class _ChildDeserializationContext(DeserializationContext):
   def IsInitialContext(self):
     return False
 
+  def IsLazy(self):
+    return self._parent.IsLazy()
+
 
 class Serialization(object):
   """
@@ -112,6 +157,13 @@ class Serialization(object):
     self._groups_per_version = {
         self.version: groups,
     }
+    # Specialized codecs, built once per struct. A value of None means the
+    # groups could not be compiled, and the generic path must be used.
+    (self._serializer, self._packer) = _CompileSerializer(
+        groups, self.version, self.size)
+    self._deserializer_per_version = {}
+    for version in set(_GetFieldVersions(groups)):
+      self._GetDeserializer(version)
 
   def _GetMainStruct(self):
     return self._GetStruct(self.version)
@@ -130,11 +182,55 @@ class Serialization(object):
       self._struct_per_version[version] = _GetStruct(self._GetGroups(version))
     return self._struct_per_version[version]
 
+  def _GetDeserializer(self, version):
+    # If asking for a version greater than the last known.
+    version = min(version, self.version)
+    if version not in self._deserializer_per_version:
+      self._deserializer_per_version[version] = _CompileDeserializer(
+          self._GetGroups(version), self._GetStruct(version))
+    return self._deserializer_per_version[version]
+
   def Serialize(self, obj, handle_offset):
     """
     Serialize the given obj. handle_offset is the the first value to use when
     encoding handles.
     """
+    if self._serializer and _compiled_codecs_enabled:
+      data = bytearray()
+      handles = self._serializer(obj, data, handle_offset)
+      return (data, handles)
+    return self.SerializeGeneric(obj, handle_offset)
+
+  def SerializeInto(self, obj, data, handle_offset):
+    """
+    Serialize the given obj at the end of the data bytearray, and returns the
+    handles to add to the message.
+    """
+    if self._serializer and _compiled_codecs_enabled:
+      return self._serializer(obj, data, handle_offset)
+    (new_data, handles) = self.SerializeGeneric(obj, handle_offset)
+    data.extend(new_data)
+    return handles
+
+  def CanPackInPlace(self):
+    """
+    Returns whether objects can be written with PackInPlace, which is the case
+    when their encoding has a fixed size, and no handles.
+    """
+    return self._packer is not None and _compiled_codecs_enabled
+
+  def PackInPlace(self, obj, data, offset):
+    """
+    Write the given obj in data at offset. data must already contain self.size
+    bytes at offset.
+    """
+    self._packer(obj, data, offset)
+
+  def SerializeGeneric(self, obj, handle_offset):
+    """
+    Serialize the given obj by walking the field groups, without using the
+    compiled codec.
+    """
     handles = []
     data = bytearray(self.size)
     HEADER_STRUCT.pack_into(data, 0, self.size, self.version)
@@ -155,6 +251,16 @@ class Serialization(object):
     return (data, handles)
 
   def Deserialize(self, fields, context):
+    self._Deserialize(fields, context, _compiled_codecs_enabled)
+
+  def DeserializeGeneric(self, fields, context):
+    """
+    Deserialize into fields by walking the field groups, without using the
+    compiled codec.
+    """
+    self._Deserialize(fields, context, False)
+
+  def _Deserialize(self, fields, context, use_compiled_codec):
     if len(context.data) < HEADER_STRUCT.size:
       raise DeserializationException(
           'Available data too short to contain header.')
@@ -170,6 +276,11 @@ class Serialization(object):
          size != version_struct.size + HEADER_STRUCT.size) or
         size < version_struct.size + HEADER_STRUCT.size):
       raise DeserializationException('Struct size in incorrect.')
+    if use_compiled_codec:
+      deserializer = self._GetDeserializer(version)
+      if deserializer:
+        deserializer(fields, context)
+        return
     position = HEADER_STRUCT.size
     enties_index = 0
     for group in filtered_groups:
@@ -218,3 +329,173 @@ def _GetStruct(groups):
   if alignment_needed:
     codes.append('x' * alignment_needed)
   return struct.Struct(''.join(codes))
+
+
+def _GetFieldVersions(groups):
+  """Returns the versions at which fields are added to the struct."""
+  return [descriptor.version
+          for group in groups for descriptor in group.GetDescriptors()]
+
+
+def _CompileSerializer(groups, version, size):
+  """
+  Returns a pair of functions (serialize_into, pack_into) for objects with the
+  layout given by groups, or (None, None) if the groups cannot be compiled.
+  serialize_into has the same contract as Serialization.SerializeInto.
+  pack_into(obj, data, offset) writes obj in the existing data at offset, and is
+  only available (not None) if the struct has no pointers nor handles.
+  """
+  compiler = _CodecCompiler()
+  full_struct = struct.Struct(
+      HEADER_STRUCT.format + _GetStruct(groups).format[1:])
+  lines = [
+      'def SerializeInto(obj, data, handle_offset):',
+      '  start = len(data)',
+      '  data += _zeros',
+      '  handles = []',
+  ]
+  values = []
+  position = HEADER_STRUCT.size
+  for group in groups:
+    position += NeededPaddingForAlignment(position, group.GetAlignment())
+    group_lines, group_values = compiler.SerializeGroup(group, position)
+    if group_lines is None:
+      return (None, None)
+    lines.extend(group_lines)
+    values.extend(group_values)
+    position += group.GetByteSize()
+  pack_arguments = '%d, %d%s' % (size, version,
+                                 ''.join(', ' + x for x in values))
+  lines.append('  _pack_into(data, start, %s)' % pack_arguments)
+  lines.append('  return handles')
+  compiler.namespace['_pack_into'] = full_struct.pack_into
+  compiler.namespace['_zeros'] = '\0' * size
+  serialize_into = compiler.Build(lines, 'SerializeInto')
+  pack_into = None
+  if compiler.has_only_simple_values:
+    pack_into = compiler.Build([
+        'def PackInto(obj, data, offset):',
+        '  _pack_into(data, offset, %s)' % pack_arguments,
+    ], 'PackInto')
+  return (serialize_into, pack_into)
+
+
+def _CompileDeserializer(groups, version_struct):
+  """
+  Returns a function deserializing the fields of a struct with the layout given
+  by groups into a dictionary, or None if the groups cannot be compiled. The
+  returned function expects the header to have already been validated.
+  """
+  compiler = _CodecCompiler()
+  lines = [ 'def Deserialize(fields, context):' ]
+  values = ['v%d' % i for i in xrange(
+      sum(len(group.GetTypeCode()) for group in groups))]
+  if values:
+    lines.append('  (%s,) = _unpack_from(context.data, %d)' % (
+        ', '.join(values), HEADER_STRUCT.size))
+  position = HEADER_STRUCT.size
+  index = 0
+  for group in groups:
+    position += NeededPaddingForAlignment(position, group.GetAlignment())
+    count = len(group.GetTypeCode())
+    group_lines = compiler.DeserializeGroup(
+        group, position, values[index:index + count])
+    if group_lines is None:
+      return None
+    lines.extend(group_lines)
+    position += group.GetByteSize()
+    index += count
+  if len(lines) == 1:
+    lines.append('  pass')
+  compiler.namespace['_unpack_from'] = version_struct.unpack_from
+  return compiler.Build(lines, 'Deserialize')
+
+
+class _CodecCompiler(object):
+  """
+  Generates the source of the specialized codec functions. Field types and
+  groups that are not simple values are referenced from the generated code
+  through the namespace the code is executed in.
+  """
+
+  def __init__(self):
+    # Imported here, as descriptor depends on this module.
+    # pylint: disable=F0401
+    import mojo_bindings.descriptor as descriptor
+    self._descriptor = descriptor
+    self.namespace = {}
+    # Whether all the compiled groups are encoded inline in the struct.
+    self.has_only_simple_values = True
+
+  def _Reference(self, value):
+    name = '_r%d' % len(self.namespace)
+    self.namespace[name] = value
+    return name
+
+  def _IsSimpleValue(self, field_type):
+    return isinstance(field_type, self._descriptor.NumericType)
+
+  def SerializeGroup(self, group, position):
+    """
+    Returns the lines of code serializing group, and the expressions of the
+    values to pack in the struct. Returns (None, None) if group cannot be
+    compiled.
+    """
+    if type(group) is self._descriptor.BooleanGroup:
+      bits = ['(%d if getattr(obj, %r) else 0)' % (1 << i, field.name)
+              for (i, field) in enumerate(group.GetDescriptors())]
+      return ([], ['(%s)' % ' | '.join(bits or ['0'])])
+    if type(group) is not self._descriptor.SingleFieldGroup:
+      return (None, None)
+    field_type = group.field_type
+    if self._IsSimpleValue(field_type):
+      return ([], ['getattr(obj, %r)' % group.name])
+    self.has_only_simple_values = False
+    # Values are named after the field position, so that they are not
+    # overwritten by the following fields.
+    values = ['p%d_%d' % (position, i)
+              for i in xrange(len(group.GetTypeCode()))]
+    if len(values) == 1:
+      target = values[0]
+    else:
+      target = '(%s)' % ', '.join(values)
+    lines = [
+        '  (%s, new_handles) = %s.Serialize(' % (
+            target, self._Reference(field_type)),
+        '      getattr(obj, %r), len(data) - start - %d, data,' % (
+            group.name, position),
+        '      handle_offset + len(handles))',
+        '  handles.extend(new_handles)',
+    ]
+    return (lines, values)
+
+  def DeserializeGroup(self, group, position, values):
+    """
+    Returns the lines of code deserializing group from the given unpacked
+    values, or None if group cannot be compiled.
+    """
+    if type(group) is self._descriptor.BooleanGroup:
+      return ['  fields[%r] = bool(%s & %d)' % (field.name, values[0], 1 << i)
+              for (i, field) in enumerate(group.GetDescriptors())]
+    if type(group) is not self._descriptor.SingleFieldGroup:
+      return None
+    field_type = group.field_type
+    if self._IsSimpleValue(field_type):
+      return ['  fields[%r] = %s' % (group.name, values[0])]
+    if len(values) == 1:
+      value = values[0]
+    else:
+      value = '(%s)' % ', '.join(values)
+    if isinstance(field_type, self._descriptor.BaseHandleType):
+      # Handles are only claimed from the context, and do not need a sub
+      # context at the field position.
+      context = 'context'
+    else:
+      context = 'context.GetSubContext(%d)' % position
+    return ['  fields[%r] = %s.Deserialize(%s, %s)' % (
+        group.name, self._Reference(field_type), value, context)]
+
+  def Build(self, lines, name):
+    code = compile('\n'.join(lines) + '\n', '<mojo codec>', 'exec')
+    exec code in self.namespace
+    return self.namespace[name]
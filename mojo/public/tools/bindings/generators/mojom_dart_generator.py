@@ -405,6 +405,14 @@ class Generator(generator.Generator):
     path = os.path.join("dart-gen", "mojom", *elements)
     self.Write(self.GenerateLibModule(args), path)
     link = self.MatchMojomFilePath("%s.dart" % self.module.name)
+    # The link has the same contents as the library.
+    self.outputs[link.replace("\\", "/")] = self.outputs[
+        path.replace("\\", "/")]
+    if (os.path.islink(os.path.join(self.output_dir, link)) and
+        os.readlink(os.path.join(self.output_dir, link)) ==
+            os.path.join(self.output_dir, path)):
+      # Leave the existing link (and its timestamp) alone.
+      return
     if os.path.exists(os.path.join(self.output_dir, link)):
       os.unlink(os.path.join(self.output_dir, link))
     try:
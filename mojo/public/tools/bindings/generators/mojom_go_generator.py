@@ -283,6 +283,9 @@ class Generator(generator.Generator):
   # imports to '_imports' dict. Returns a list of imports that should include
   # the generated go file.
   def GetImports(self):
+    # The imports of previously generated modules (when generating several in
+    # the same process) do not apply to this one.
+    _imports.clear()
     # Imports can only be used in structs, constants, enums, interfaces.
     all_structs = list(self.module.structs)
     for i in self.module.interfaces:
@@ -10,6 +10,7 @@ import contextlib
 import os
 import re
 import shutil
+import StringIO
 import tempfile
 import zipfile
 
@@ -377,13 +378,21 @@ def TempDir():
   finally:
     shutil.rmtree(dirname)
 
-def ZipContentInto(root, zip_filename):
-  with zipfile.ZipFile(zip_filename, 'w') as zip_file:
-    for dirname, _, files in os.walk(root):
-      for filename in files:
+def ZipContent(root):
+  """Returns a zip of the files under |root|. The zip only depends on the names
+  and contents of the files (not on their timestamps), so that it is not
+  rewritten when they do not change."""
+  output = StringIO.StringIO()
+  with zipfile.ZipFile(output, 'w') as zip_file:
+    for dirname, dirnames, files in os.walk(root):
+      dirnames.sort()
+      for filename in sorted(files):
         path = os.path.join(dirname, filename)
-        path_in_archive = os.path.relpath(path, root)
-        zip_file.write(path, path_in_archive)
+        zip_info = zipfile.ZipInfo(os.path.relpath(path, root))
+        zip_info.external_attr = 0644 << 16L
+        with open(path, 'rb') as f:
+          zip_file.writestr(zip_info, f.read())
+  return output.getvalue()
 
 class Generator(generator.Generator):
 
@@ -481,11 +490,12 @@ class Generator(generator.Generator):
     # Generate the java files in a temporary directory and place a single
     # srcjar in the output directory.
     basename = self.MatchMojomFilePath("%s.srcjar" % self.module.name)
-    zip_filename = os.path.join(self.output_dir, basename)
+    output_dir = self.output_dir
     with TempDir() as temp_java_root:
       self.output_dir = os.path.join(temp_java_root, package_path)
       self.DoGenerateFiles();
-      ZipContentInto(temp_java_root, zip_filename)
+      self.output_dir = output_dir
+      self.Write(ZipContent(temp_java_root), basename)
 
     if args.java_output_directory:
       # If requested, generate the java files directly into indicated directory.
@@ -8,9 +8,14 @@
 
 import argparse
 import imp
+import json
 import os
 import pprint
+import signal
+import socket
+import StringIO
 import sys
+import traceback
 
 # Disable lint check for finding modules:
 # pylint: disable=F0401
@@ -36,7 +41,10 @@ sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
 from mojom.error import Error
 import mojom.fileutil as fileutil
 from mojom.generate.data import OrderedModuleFromData
-from mojom.parse.parser import Parse
+from mojom.generate.generator import GetManifestPath, WriteManifest
+from mojom.generate.template_expander import SetBytecodeCacheDirectory
+from mojom.parse.cache import KIND_AST, KIND_TRANSLATION, ParseCache
+from mojom.parse.parser import Parse, SetTableCacheDirectory
 from mojom.parse.translate import Translate
 
 
@@ -94,10 +102,13 @@ def FindImportFile(dir_name, file_name, search_dirs):
   return os.path.join(dir_name, file_name)
 
 class MojomProcessor(object):
-  def __init__(self, should_generate):
+  def __init__(self, should_generate, parse_cache=None):
     self._should_generate = should_generate
     self._processed_files = {}
     self._parsed_files = {}
+    # The ParseCache, if any, and the cache key of each parsed file.
+    self._parse_cache = parse_cache
+    self._parse_cache_keys = {}
 
   def ProcessFile(self, args, remaining_args, generator_modules, filename):
     self._ParseFileAndImports(filename, args.import_directories, [])
@@ -112,7 +123,14 @@ class MojomProcessor(object):
     tree = self._parsed_files[filename]
 
     dirname, name = os.path.split(filename)
-    mojom = Translate(tree, name)
+    mojom = None
+    cache_key = self._parse_cache_keys.get(filename)
+    if cache_key:
+      mojom = self._parse_cache.Get(cache_key, KIND_TRANSLATION)
+    if mojom is None:
+      mojom = Translate(tree, name)
+      if cache_key:
+        self._parse_cache.Put(cache_key, KIND_TRANSLATION, mojom)
     if args.debug_print_intermediate:
       pprint.PrettyPrinter().pprint(mojom)
 
@@ -135,6 +153,7 @@ class MojomProcessor(object):
     module.path = module.path.replace('\\', '/')
 
     if self._should_generate(filename):
+      outputs = {}
       for generator_module in generator_modules:
         generator = generator_module.Generator(module, args.output_dir)
         filtered_args = []
@@ -143,6 +162,9 @@ class MojomProcessor(object):
           filtered_args = [arg for arg in remaining_args
                            if arg.startswith(prefix)]
         generator.GenerateFiles(filtered_args)
+        outputs.update(generator.outputs)
+      if args.write_manifest:
+        WriteManifest(outputs, GetManifestPath(args.output_dir, module.path))
 
     # Save result.
     self._processed_files[filename] = module
@@ -167,12 +189,21 @@ class MojomProcessor(object):
           MakeImportStackMessage(imported_filename_stack + [filename])
       sys.exit(1)
 
-    try:
-      tree = Parse(source, filename)
-    except Error as e:
-      full_stack = imported_filename_stack + [filename]
-      print str(e) + MakeImportStackMessage(full_stack)
-      sys.exit(1)
+    tree = None
+    if self._parse_cache:
+      cache_key = self._parse_cache.GetKey(filename, source, import_directories)
+      self._parse_cache_keys[filename] = cache_key
+      tree = self._parse_cache.Get(cache_key, KIND_AST)
+
+    if tree is None:
+      try:
+        tree = Parse(source, filename)
+      except Error as e:
+        full_stack = imported_filename_stack + [filename]
+        print str(e) + MakeImportStackMessage(full_stack)
+        sys.exit(1)
+      if self._parse_cache:
+        self._parse_cache.Put(cache_key, KIND_AST, tree)
 
     dirname = os.path.split(filename)[0]
     for imp_entry in tree.import_list:
@@ -184,10 +215,10 @@ class MojomProcessor(object):
     self._parsed_files[filename] = tree
 
 
-def main():
+def _ParseArguments(argv):
   parser = argparse.ArgumentParser(
       description="Generate bindings from mojom files.")
-  parser.add_argument("filename", nargs="+",
+  parser.add_argument("filename", nargs="*",
                       help="mojom input file")
   parser.add_argument("-d", "--depth", dest="depth", default=".",
                       help="depth from source root")
@@ -204,18 +235,236 @@ def main():
                       help="add a directory to be searched for import files")
   parser.add_argument("--use_bundled_pylibs", action="store_true",
                       help="use Python modules bundled in the SDK")
-  (args, remaining_args) = parser.parse_known_args()
-
-  generator_modules = LoadGenerators(args.generators_string)
-
+  parser.add_argument("--cache_dir", dest="cache_dir",
+                      help="directory where data reused across invocations "
+                      "(e.g., the parser tables, the parsed mojom files "
+                      "and the compiled templates) is cached")
+  parser.add_argument("--cache_stats", action="store_true",
+                      help="print the number of hits and misses of the cache "
+                      "of parsed mojom files")
+  parser.add_argument("--write_manifest", action="store_true",
+                      help="write, next to the generated files, a manifest "
+                      "listing them (with a hash of their contents) for each "
+                      "mojom input file")
+  parser.add_argument("--serve", dest="serve_address", metavar="SOCKET",
+                      help="run as a server, processing the requests sent to "
+                      "the given unix socket (or read from stdin if '-') "
+                      "until killed")
+  parser.add_argument("--server", dest="server_address", metavar="SOCKET",
+                      help="have the server listening on the given unix "
+                      "socket do the work, if there is one")
+  (args, remaining_args) = parser.parse_known_args(argv)
+  if not args.filename and not args.serve_address:
+    parser.error("no mojom input file")
+  return (args, remaining_args)
+
+
+def _Generate(args, remaining_args, generator_modules, parse_cache):
   fileutil.EnsureDirectoryExists(args.output_dir)
 
-  processor = MojomProcessor(lambda filename: filename in args.filename)
+  processor = MojomProcessor(lambda filename: filename in args.filename,
+                             parse_cache)
   for filename in args.filename:
     processor.ProcessFile(args, remaining_args, generator_modules, filename)
 
+  if args.cache_stats:
+    if parse_cache:
+      print "Parse cache: %d hits, %d misses" % (parse_cache.hits,
+                                                 parse_cache.misses)
+    else:
+      print "Parse cache: disabled (no --cache_dir)"
+
   return 0
 
 
+class _ServerShutdown(BaseException):
+  """Raised to stop the server, through whatever request it is handling (which
+  then gets no response). Unlike SystemExit, it isn't caught by the request
+  handling."""
+
+
+def _GetModificationTime(path):
+  try:
+    return os.path.getmtime(path)
+  except OSError:
+    return None
+
+
+class _Server(object):
+  """Runs the generator for the command lines sent by clients, in this process.
+
+  The loaded generators and the parsed mojom files (kept in memory, on top of
+  the cache in --cache_dir, if any) are reused across requests, which saves
+  starting the interpreter and loading the generators and templates each time.
+  (The templates are reloaded by jinja when they change. The server exits when
+  the source of any loaded module changes, as modules can't reliably be
+  reloaded.)
+
+  A request is a JSON dictionary with the command line ("argv") and working
+  directory ("cwd") of the client. The response is a JSON dictionary with the
+  "returncode" and the "output" the generator would have printed. A client that
+  gets no response (because the server exited) runs the generator itself."""
+
+  def __init__(self):
+    self._generator_modules = {}
+    self._parse_caches = {}
+    # The modification times of the source files of the loaded modules.
+    self._source_times = {}
+
+  def Serve(self, address):
+    self._RecordSources()
+    try:
+      if address == "-":
+        self._ServeStdin()
+      else:
+        self._ServeSocket(address)
+    except _ServerShutdown:
+      pass
+    return 0
+
+  def _ServeStdin(self):
+    # One request per line, one response per line.
+    stdout = sys.stdout
+    for line in iter(sys.stdin.readline, ""):
+      stdout.write(json.dumps(self._HandleRequest(json.loads(line))) + "\n")
+      stdout.flush()
+
+  def _ServeSocket(self, address):
+    if os.path.exists(address):
+      os.remove(address)
+    server_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server_socket.bind(address)
+    server_socket.listen(16)
+    # Clean up when killed.
+    def Shutdown(signum, frame):
+      raise _ServerShutdown()
+    signal.signal(signal.SIGTERM, Shutdown)
+    try:
+      while True:
+        (connection, _) = server_socket.accept()
+        try:
+          request = json.loads(_ReceiveAll(connection))
+          connection.sendall(json.dumps(self._HandleRequest(request)))
+        except (IOError, ValueError):
+          # A broken or malformed request only affects its client.
+          pass
+        finally:
+          connection.close()
+    finally:
+      server_socket.close()
+      os.remove(address)
+
+  def _HandleRequest(self, request):
+    if self._SourcesChanged():
+      raise _ServerShutdown()
+    stdout = sys.stdout
+    cwd = os.getcwd()
+    sys.stdout = output = StringIO.StringIO()
+    try:
+      os.chdir(request["cwd"])
+      returncode = self._Generate(request["argv"])
+    except SystemExit as e:
+      if e.code is None or isinstance(e.code, int):
+        returncode = e.code or 0
+      else:
+        print e.code
+        returncode = 1
+    except Exception:
+      traceback.print_exc(file=output)
+      returncode = 1
+    finally:
+      sys.stdout = stdout
+      os.chdir(cwd)
+    self._RecordSources()
+    return {"returncode": returncode, "output": output.getvalue()}
+
+  def _RecordSources(self):
+    """Records the modification times of the source files of the modules loaded
+    (e.g. by a request) since the last call."""
+    for module in sys.modules.values():
+      path = getattr(module, "__file__", None)
+      if not path:
+        continue
+      if path.endswith((".pyc", ".pyo")):
+        path = path[:-1]
+      if path not in self._source_times:
+        self._source_times[path] = _GetModificationTime(path)
+
+  def _SourcesChanged(self):
+    return any(_GetModificationTime(path) != mtime
+               for (path, mtime) in self._source_times.iteritems())
+
+  def _Generate(self, argv):
+    (args, remaining_args) = _ParseArguments(argv)
+    if args.cache_dir:
+      SetTableCacheDirectory(args.cache_dir)
+      SetBytecodeCacheDirectory(os.path.join(args.cache_dir, "templates"))
+    if args.cache_dir not in self._parse_caches:
+      self._parse_caches[args.cache_dir] = ParseCache(args.cache_dir,
+                                                      keep_in_memory=True)
+    parse_cache = self._parse_caches[args.cache_dir]
+    # The statistics are those of the request.
+    (parse_cache.hits, parse_cache.misses) = (0, 0)
+
+    if args.generators_string not in self._generator_modules:
+      self._generator_modules[args.generators_string] = LoadGenerators(
+          args.generators_string)
+    return _Generate(args, remaining_args,
+                     self._generator_modules[args.generators_string],
+                     parse_cache)
+
+
+def _ReceiveAll(connection):
+  chunks = []
+  while True:
+    chunk = connection.recv(65536)
+    if not chunk:
+      return "".join(chunks)
+    chunks.append(chunk)
+
+
+def _RunInServer(address, argv):
+  """Sends the command line to the server listening on |address|, and prints
+  its output. Returns the return code, or None if there is no server or it
+  exited without responding."""
+  client_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+  try:
+    client_socket.connect(address)
+    client_socket.sendall(json.dumps({"argv": argv, "cwd": os.getcwd()}))
+    client_socket.shutdown(socket.SHUT_WR)
+    response = json.loads(_ReceiveAll(client_socket))
+    (returncode, output) = (response["returncode"], response["output"])
+  except (socket.error, ValueError, KeyError, TypeError):
+    # No (complete) response: the server was killed or exited mid-request, and
+    # any outputs it partially wrote are rewritten by running in-process.
+    return None
+  finally:
+    client_socket.close()
+  sys.stdout.write(output)
+  return returncode
+
+
+def main():
+  (args, remaining_args) = _ParseArguments(sys.argv[1:])
+
+  if args.serve_address:
+    return _Server().Serve(args.serve_address)
+
+  if args.server_address:
+    returncode = _RunInServer(args.server_address, sys.argv[1:])
+    if returncode is not None:
+      return returncode
+
+  parse_cache = None
+  if args.cache_dir:
+    SetTableCacheDirectory(args.cache_dir)
+    SetBytecodeCacheDirectory(os.path.join(args.cache_dir, "templates"))
+    parse_cache = ParseCache(args.cache_dir)
+
+  generator_modules = LoadGenerators(args.generators_string)
+
+  return _Generate(args, remaining_args, generator_modules, parse_cache)
+
+
 if __name__ == "__main__":
   sys.exit(main())
@@ -2,8 +2,16 @@
 # Use of this source code is governed by a BSD-style license that can be
 # found in the LICENSE file.
 
+import os
+import shutil
+import socket
+import sys
+import tempfile
+import threading
+import types
 import unittest
 
+import mojom_bindings_generator
 from mojom_bindings_generator import MakeImportStackMessage
 
 
@@ -19,5 +27,81 @@ class MojoBindingsGeneratorTest(unittest.TestCase):
         "\n  z was imported by y\n  y was imported by x")
 
 
+class ServerTest(unittest.TestCase):
+  """Tests the server mode of mojo_bindings_generator."""
+
+  def setUp(self):
+    self._temp_dir = tempfile.mkdtemp()
+    self._request = {"argv": ["x.mojom"], "cwd": self._temp_dir}
+
+  def tearDown(self):
+    shutil.rmtree(self._temp_dir)
+
+  def testHandleRequest(self):
+    """Tests that the return code of a request is that of the generator, but
+    that shutting down the server isn't handled as the end of the request."""
+    server = mojom_bindings_generator._Server()
+    def Generate(argv):
+      print "generated %s" % argv[0]
+      sys.exit(2)
+    server._Generate = Generate
+    self.assertEquals({"returncode": 2, "output": "generated x.mojom\n"},
+                      server._HandleRequest(self._request))
+
+    def Shutdown(argv):
+      raise mojom_bindings_generator._ServerShutdown()
+    server._Generate = Shutdown
+    self.assertRaises(mojom_bindings_generator._ServerShutdown,
+                      server._HandleRequest, self._request)
+
+  def testSourcesChanged(self):
+    """Tests that the server shuts down when the source of a loaded module
+    changes."""
+    path = os.path.join(self._temp_dir, "generator.py")
+    with open(path, "w") as f:
+      f.write("")
+    os.utime(path, (1000, 1000))
+    module = types.ModuleType("fake_generator")
+    module.__file__ = path + "c"
+    sys.modules[module.__name__] = module
+    try:
+      server = mojom_bindings_generator._Server()
+      server._RecordSources()
+      server._Generate = lambda argv: 0
+      self.assertEquals(0, server._HandleRequest(self._request)["returncode"])
+      os.utime(path, (2000, 2000))
+      self.assertRaises(mojom_bindings_generator._ServerShutdown,
+                        server._HandleRequest, self._request)
+    finally:
+      del sys.modules[module.__name__]
+
+  def testRunInServerWithoutResponse(self):
+    """Tests that a client falls back to generating in-process when there is no
+    server, or it doesn't send a complete response."""
+    address = os.path.join(self._temp_dir, "server.sock")
+    self.assertEquals(None, mojom_bindings_generator._RunInServer(
+        address, ["x.mojom"]))
+
+    server_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server_socket.bind(address)
+    server_socket.listen(1)
+    def Respond(response):
+      (connection, _) = server_socket.accept()
+      mojom_bindings_generator._ReceiveAll(connection)
+      connection.sendall(response)
+      connection.close()
+    try:
+      for response in ("", '{"returncode": 0, "outp', '{}'):
+        thread = threading.Thread(target=Respond, args=(response,))
+        thread.start()
+        try:
+          self.assertEquals(None, mojom_bindings_generator._RunInServer(
+              address, ["x.mojom"]))
+        finally:
+          thread.join()
+    finally:
+      server_socket.close()
+
+
 if __name__ == "__main__":
   unittest.main()
@@ -7,15 +7,32 @@ import argparse
 import os.path
 import sys
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                "pylib"))
+
+from mojom.generate.generator import GetManifestPath, ReadManifest
+
+
 def main():
   parser = argparse.ArgumentParser(
       description="GYP helper script for mapping mojoms => generated outputs.")
   parser.add_argument("--basedir", required=True)
+  parser.add_argument("--manifest_dir",
+                      help="directory where the bindings generator wrote its "
+                      "manifests; the outputs they list are used instead of "
+                      "the default ones, when available")
   parser.add_argument("mojom", nargs="*")
 
   args = parser.parse_args()
 
   for mojom in args.mojom:
+    if args.manifest_dir:
+      outputs = ReadManifest(GetManifestPath(
+          args.manifest_dir, os.path.join(args.basedir, mojom)))
+      if outputs is not None:
+        for output in sorted(outputs):
+          print "<(SHARED_INTERMEDIATE_DIR)/" + output
+        continue
     full = os.path.join("<(SHARED_INTERMEDIATE_DIR)", args.basedir, mojom)
     base, ext = os.path.splitext(full)
     assert ext == ".mojom", mojom
@@ -5,6 +5,8 @@
 """Code shared by the various language-specific code generators."""
 
 from functools import partial
+import hashlib
+import json
 import os.path
 import re
 
@@ -29,13 +31,48 @@ def UnderToCamel(under):
   return ''.join(word.capitalize() for word in under.split('_'))
 
 def WriteFile(contents, full_path):
+  """Writes |contents| to |full_path|, unless the file already has exactly these
+  contents: leaving it untouched lets the build skip whatever depends on it.
+  Returns whether the file was written."""
+  # Files are written in binary mode, so that their contents (and the SHA-1 in
+  # the manifests) are the same on all platforms.
+  contents = str(contents)
+  try:
+    if os.path.getsize(full_path) == len(contents):
+      with open(full_path, "rb") as f:
+        if f.read() == contents:
+          return False
+  except (IOError, OSError):
+    pass
+
   # Make sure the containing directory exists.
   full_dir = os.path.dirname(full_path)
   fileutil.EnsureDirectoryExists(full_dir)
 
   # Dump the data to disk.
-  with open(full_path, "w+") as f:
+  with open(full_path, "wb") as f:
     f.write(contents)
+  return True
+
+def GetManifestPath(output_dir, mojom_path):
+  """Returns the path of the manifest of the files generated for the mojom file
+  at |mojom_path| (relative to the source root)."""
+  return os.path.join(output_dir, mojom_path + ".manifest")
+
+def WriteManifest(outputs, manifest_path):
+  """Writes a manifest mapping the path of each generated file (relative to the
+  output directory) to the SHA-1 of its contents."""
+  WriteFile(json.dumps({"outputs": outputs}, indent=2, sort_keys=True) + "\n",
+            manifest_path)
+
+def ReadManifest(manifest_path):
+  """Returns the outputs listed by the given manifest, or None if there is
+  none."""
+  try:
+    with open(manifest_path) as f:
+      return json.load(f)["outputs"]
+  except (IOError, ValueError, KeyError):
+    return None
 
 class Generator(object):
   # Pass |output_dir| to emit files to disk. Omit |output_dir| to echo all
@@ -43,6 +80,10 @@ class Generator(object):
   def __init__(self, module, output_dir=None):
     self.module = module
     self.output_dir = output_dir
+    # The files written under |output_dir| (relative to it), with the SHA-1 of
+    # their contents.
+    self.outputs = {}
+    self._root_output_dir = output_dir
 
   def GetStructsFromMethods(self):
     result = []
@@ -73,6 +114,11 @@ class Generator(object):
       return
     full_path = os.path.join(self.output_dir, filename)
     WriteFile(contents, full_path)
+    # Files written elsewhere (e.g., in a temporary directory) are not outputs.
+    output_path = os.path.relpath(full_path, self._root_output_dir)
+    if not output_path.startswith(os.pardir):
+      self.outputs[output_path.replace("\\", "/")] = hashlib.sha1(
+          str(contents)).hexdigest()
 
   def GenerateFiles(self, args):
     raise NotImplementedError("Subclasses must override/implement this method")
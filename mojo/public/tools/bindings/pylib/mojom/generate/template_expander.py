@@ -5,8 +5,10 @@
 # Based on:
 # http://src.chromium.org/viewvc/blink/trunk/Source/build/scripts/template_expander.py
 
+import hashlib
 import imp
 import inspect
+import os
 import os.path
 import sys
 
@@ -28,20 +30,89 @@ try:
 except ImportError:
   sys.path.append(os.path.join(_GetDirAbove("public"), "public/third_party"))
 import jinja2
+from jinja2.defaults import DEFAULT_NAMESPACE
+
+import mojom.fileutil as fileutil
+
+
+# The jinja environments, by generator class, template directory and
+# parameters. Compiling the templates takes most of the time of the generation,
+# so it is done once per environment rather than once per rendering.
+_environments = {}
+_bytecode_cache_directory = None
+
+
+def SetBytecodeCacheDirectory(directory):
+  """Sets the directory where the compiled templates are cached, so that they
+  can be reused across processes (None, the default, disables this cache)."""
+  global _bytecode_cache_directory
+  if directory != _bytecode_cache_directory:
+    _bytecode_cache_directory = directory
+    _environments.clear()
+
+
+class _BytecodeCache(jinja2.FileSystemBytecodeCache):
+  """A FileSystemBytecodeCache that can be shared by concurrent processes."""
+
+  def load_bytecode(self, bucket):
+    try:
+      super(_BytecodeCache, self).load_bytecode(bucket)
+    except Exception:
+      # A truncated or otherwise unreadable entry is just recompiled.
+      bucket.reset()
+
+  def dump_bytecode(self, bucket):
+    fileutil.EnsureDirectoryExists(self.directory)
+    path = self._get_cache_filename(bucket)
+    # Write to a temporary file first, so that other processes never read a
+    # partially written entry.
+    temp_path = "%s.%d.tmp" % (path, os.getpid())
+    with open(temp_path, "wb") as f:
+      bucket.write_bytecode(f)
+    try:
+      os.rename(temp_path, path)
+    except OSError:
+      os.remove(temp_path)
+
+
+def _GetEnvironment(mojo_generator, path_to_templates, filters, kwargs):
+  key = (type(mojo_generator), path_to_templates,
+         frozenset((filters or {}).items()), frozenset(kwargs.items()))
+  jinja_env = _environments.get(key)
+  if jinja_env is None:
+    bytecode_cache = None
+    if _bytecode_cache_directory:
+      # The cache keys only depend on the templates, while the compiled code
+      # also depends on the parameters of the environment.
+      pattern = "%s_%%s.cache" % hashlib.sha1(
+          repr(sorted(kwargs.items()))).hexdigest()
+      bytecode_cache = _BytecodeCache(_bytecode_cache_directory, pattern)
+    loader = jinja2.FileSystemLoader([path_to_templates])
+    jinja_env = jinja2.Environment(loader=loader, keep_trailing_newline=True,
+                                   bytecode_cache=bytecode_cache, **kwargs)
+    if filters:
+      jinja_env.filters.update(filters)
+    _environments[key] = jinja_env
+  return jinja_env
 
 
 def ApplyTemplate(mojo_generator, base_dir, path_to_template, params,
                   filters=None, **kwargs):
   template_directory, template_name = os.path.split(path_to_template)
   path_to_templates = os.path.join(base_dir, template_directory)
-  loader = jinja2.FileSystemLoader([path_to_templates])
   final_kwargs = dict(mojo_generator.GetJinjaParameters())
   final_kwargs.update(kwargs)
-  jinja_env = jinja2.Environment(loader=loader, keep_trailing_newline=True,
-                                 **final_kwargs)
+  jinja_env = _GetEnvironment(mojo_generator, path_to_templates, filters,
+                              final_kwargs)
+  # The globals depend on the generated module. They are shared by all the
+  # (cached) templates of the environment, so they are reset for each rendering.
+  jinja_env.globals.clear()
+  jinja_env.globals.update(DEFAULT_NAMESPACE)
   jinja_env.globals.update(mojo_generator.GetGlobals())
-  if filters:
-    jinja_env.filters.update(filters)
+  # Imported templates are also cached as modules, which copy the globals they
+  # are created with: drop them, the compiled code is what is worth keeping.
+  for cached_template in jinja_env.cache.values():
+    cached_template._module = None
   template = jinja_env.get_template(template_name)
   return template.render(params)
 
@@ -0,0 +1,104 @@
+# Copyright 2015 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""Caches the results of parsing and translating .mojom files on disk, so that
+they can be reused across invocations of the bindings generator."""
+
+import cPickle
+import hashlib
+import os
+import os.path
+
+from ..fileutil import EnsureDirectoryExists
+from . import ast
+from . import lexer
+from . import parser
+from . import translate
+
+
+# The kinds of data stored for each .mojom file.
+KIND_AST = "ast"
+KIND_TRANSLATION = "translation"
+
+
+def _GetCodeHash():
+  """Returns a hash of the source of the modules producing the cached data, so
+  that entries written by a different version are not reused."""
+  code_hash = hashlib.sha1()
+  for module in (ast, lexer, parser, translate):
+    with open(os.path.splitext(module.__file__)[0] + ".py", "rb") as f:
+      code_hash.update(f.read())
+  return code_hash.hexdigest()
+
+
+class ParseCache(object):
+  """An on-disk cache of the AST and translated data of .mojom files.
+
+  If |keep_in_memory| is true, the (pickled) entries are also kept in memory,
+  which is useful for long-lived processes. If |cache_dir| is None, entries are
+  only kept in memory."""
+
+  def __init__(self, cache_dir, keep_in_memory=False):
+    self._cache_dir = cache_dir and os.path.join(cache_dir, "parsed")
+    # Pickled data of the entries kept in memory, by path (or key and kind).
+    self._memory = {} if keep_in_memory or not cache_dir else None
+    self._code_hash = _GetCodeHash()
+    self.hits = 0
+    self.misses = 0
+
+  def GetKey(self, filename, source, import_directories):
+    """Returns the key identifying the data for the given file with the given
+    contents, when imports are searched in |import_directories|."""
+    key = hashlib.sha1()
+    key.update(self._code_hash)
+    key.update(filename)
+    key.update("\0".join(import_directories))
+    key.update(hashlib.sha1(source).digest())
+    return key.hexdigest()
+
+  def Get(self, key, kind):
+    """Returns the cached data of the given kind for |key|, or None if it is not
+    in the cache."""
+    path = self._GetPath(key, kind)
+    try:
+      # The data is always unpickled, so that callers get a fresh copy they
+      # are free to modify.
+      if self._memory is not None and path in self._memory:
+        result = cPickle.loads(self._memory[path])
+      elif self._cache_dir:
+        with open(path, "rb") as f:
+          data = f.read()
+        result = cPickle.loads(data)
+        if self._memory is not None:
+          self._memory[path] = data
+      else:
+        raise KeyError(path)
+    except Exception:
+      # Missing, truncated or otherwise unreadable entries are all misses.
+      self.misses += 1
+      return None
+    self.hits += 1
+    return result
+
+  def Put(self, key, kind, value):
+    """Stores |value| as the data of the given kind for |key|."""
+    path = self._GetPath(key, kind)
+    data = cPickle.dumps(value, cPickle.HIGHEST_PROTOCOL)
+    if self._memory is not None:
+      self._memory[path] = data
+    if not self._cache_dir:
+      return
+    EnsureDirectoryExists(self._cache_dir)
+    # Other processes may be reading or writing the same entry: write it to a
+    # temporary file first, and only then move it in place.
+    temp_path = "%s.%d.tmp" % (path, os.getpid())
+    with open(temp_path, "wb") as f:
+      f.write(data)
+    try:
+      os.rename(temp_path, path)
+    except OSError:
+      os.remove(temp_path)
+
+  def _GetPath(self, key, kind):
+    return os.path.join(self._cache_dir or "", "%s.%s" % (key, kind))
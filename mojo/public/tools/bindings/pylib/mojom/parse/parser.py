@@ -4,7 +4,9 @@
 
 """Generates a syntax tree from a Mojo IDL file."""
 
+import hashlib
 import imp
+import os
 import os.path
 import sys
 
@@ -26,6 +28,7 @@ from ply import lex
 from ply import yacc
 
 from ..error import Error
+from ..fileutil import EnsureDirectoryExists
 from . import ast
 from .lexer import Lexer
 
@@ -33,6 +36,14 @@ from .lexer import Lexer
 _MAX_ORDINAL_VALUE = 0xffffffff
 _MAX_ARRAY_SIZE = 0xffffffff
 
+# The directory where the parser tables are cached across processes, if any.
+# See |SetTableCacheDirectory()|.
+_table_cache_directory = None
+
+# The (lexer, parser, ply_lexer, ply_parser) shared by all the calls to
+# |Parse()| in this process. See |_GetParser()|.
+_shared_parser = None
+
 
 class ParseError(Error):
   """Class for errors from the parser."""
@@ -405,12 +416,65 @@ class Parser(object):
     return self.source.split('\n')[lineno - 1]
 
 
-def Parse(source, filename):
-  lexer = Lexer(filename)
-  parser = Parser(lexer, source, filename)
+def SetTableCacheDirectory(directory):
+  """Sets the directory where the parser tables are cached, so that they are
+  only built once for all the processes using the same grammar. None disables
+  the cache."""
+  global _table_cache_directory
+  _table_cache_directory = directory
+
+
+def _GetGrammarHash():
+  """Returns a hash of the grammar, identifying its parser tables."""
+  grammar_hash = hashlib.sha1()
+  grammar_hash.update(yacc.__tabversion__)
+  grammar_hash.update(" ".join(Lexer.tokens))
+  for name in sorted(dir(Parser)):
+    if name.startswith("p_"):
+      grammar_hash.update(name)
+      grammar_hash.update(getattr(Parser, name).__doc__ or "")
+  return grammar_hash.hexdigest()
+
+
+def _BuildParserTables(parser):
+  if not _table_cache_directory:
+    return yacc.yacc(module=parser, debug=0, write_tables=0)
+
+  table_file = os.path.join(_table_cache_directory,
+                            "mojom_parser_%s.pickle" % _GetGrammarHash())
+  if os.path.isfile(table_file):
+    return yacc.yacc(module=parser, debug=0, picklefile=table_file)
+  # Other processes may be building the same tables concurrently: write them to
+  # a temporary file first, and only then move them in place.
+  EnsureDirectoryExists(_table_cache_directory)
+  temp_file = "%s.%d.tmp" % (table_file, os.getpid())
+  result = yacc.yacc(module=parser, debug=0, picklefile=temp_file)
+  try:
+    os.rename(temp_file, table_file)
+  except OSError:
+    os.remove(temp_file)
+  return result
+
+
+def _GetParser():
+  """Returns the (lexer, parser, ply_lexer, ply_parser), which are built once
+  per process as building the parser tables is expensive."""
+  global _shared_parser
+  if not _shared_parser:
+    lexer = Lexer(None)
+    parser = Parser(lexer, None, None)
+    ply_lexer = lex.lex(object=lexer)
+    ply_parser = _BuildParserTables(parser)
+    _shared_parser = (lexer, parser, ply_lexer, ply_parser)
+  return _shared_parser
 
-  lex.lex(object=lexer)
-  yacc.yacc(module=parser, debug=0, write_tables=0)
 
-  tree = yacc.parse(source)
+def Parse(source, filename):
+  lexer, parser, ply_lexer, ply_parser = _GetParser()
+  lexer.filename = filename
+  parser.source = source
+  parser.filename = filename
+  ply_lexer.lineno = 1
+
+  tree = ply_parser.parse(source, lexer=ply_lexer)
   return tree
@@ -3,8 +3,11 @@
 # found in the LICENSE file.
 
 import imp
+import os
 import os.path
+import shutil
 import sys
+import tempfile
 import unittest
 
 def _GetDirAbove(dirname):
@@ -32,6 +35,45 @@ class StringManipulationTest(unittest.TestCase):
     self.assertEquals("CamelCase", generator.UnderToCamel("camel_case"))
     self.assertEquals("CamelCase", generator.UnderToCamel("CAMEL_CASE"))
 
+
+class WriteFileTest(unittest.TestCase):
+  """Tests that outputs are only written when they change, and listed in
+  manifests."""
+
+  def setUp(self):
+    self._temp_dir = tempfile.mkdtemp()
+
+  def tearDown(self):
+    shutil.rmtree(self._temp_dir)
+
+  def testWriteFile(self):
+    path = os.path.join(self._temp_dir, "foo", "bar.h")
+    self.assertTrue(generator.WriteFile("contents", path))
+    os.utime(path, (1, 1))
+    self.assertFalse(generator.WriteFile(u"contents", path))
+    self.assertEquals(os.path.getmtime(path), 1)
+    self.assertTrue(generator.WriteFile("contents\n", path))
+    with open(path, "rb") as f:
+      self.assertEquals(f.read(), "contents\n")
+
+  def testManifest(self):
+    class FakeModule(object):
+      path = "foo/bar.mojom"
+    output_dir = os.path.join(self._temp_dir, "out")
+    gen = generator.Generator(FakeModule(), output_dir)
+    gen.Write("contents", gen.MatchMojomFilePath("bar.mojom.h"))
+    # Files written outside of the output directory are not outputs.
+    gen.output_dir = os.path.join(self._temp_dir, "tmp")
+    gen.Write("other", "bar.java")
+    self.assertEquals(gen.outputs.keys(), ["foo/bar.mojom.h"])
+
+    manifest_path = generator.GetManifestPath(output_dir, FakeModule.path)
+    self.assertIsNone(generator.ReadManifest(manifest_path))
+    generator.WriteManifest(gen.outputs, manifest_path)
+    self.assertEquals(generator.ReadManifest(manifest_path),
+                      {"foo/bar.mojom.h":
+                           "4a756ca07e9487f482465a99e8286abc86ba4dc7"})
+
 if __name__ == "__main__":
   unittest.main()
 
@@ -0,0 +1,95 @@
+# Copyright 2015 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+import imp
+import os
+import os.path
+import shutil
+import sys
+import tempfile
+import unittest
+
+def _GetDirAbove(dirname):
+  """Returns the directory "above" this file containing |dirname| (which must
+  also be "above" this file)."""
+  path = os.path.abspath(__file__)
+  while True:
+    path, tail = os.path.split(path)
+    assert tail
+    if tail == dirname:
+      return path
+
+try:
+  imp.find_module("mojom")
+except ImportError:
+  sys.path.append(os.path.join(_GetDirAbove("pylib"), "pylib"))
+from mojom.generate import template_expander
+
+
+_filters = {"twice": lambda s: s * 2}
+
+
+class _FakeGenerator(object):
+  def __init__(self, name):
+    self.name = name
+
+  def GetJinjaParameters(self):
+    return {"trim_blocks": True}
+
+  def GetGlobals(self):
+    return {"name": self.name}
+
+
+class TemplateExpanderTest(unittest.TestCase):
+
+  def setUp(self):
+    self._temp_dir = tempfile.mkdtemp()
+    os.mkdir(os.path.join(self._temp_dir, "templates"))
+    with open(os.path.join(self._temp_dir, "templates", "macros.tmpl"),
+              "w") as f:
+      f.write("{% macro hello() %}Hello {{name}}{% endmacro %}")
+    with open(os.path.join(self._temp_dir, "templates", "main.tmpl"),
+              "w") as f:
+      f.write("{% import 'macros.tmpl' as macros %}"
+              "{{macros.hello()}}{{punctuation|twice}}")
+
+  def tearDown(self):
+    template_expander.SetBytecodeCacheDirectory(None)
+    template_expander._environments.clear()
+    shutil.rmtree(self._temp_dir)
+
+  def _Apply(self, generator):
+    return template_expander.ApplyTemplate(
+        generator, self._temp_dir, "templates/main.tmpl",
+        {"punctuation": "!"}, filters=_filters)
+
+  def testSharedEnvironment(self):
+    """Tests that environments are shared, with the globals of the generator
+    being rendered."""
+    self.assertEquals(self._Apply(_FakeGenerator("foo")), "Hello foo!!")
+    self.assertEquals(len(template_expander._environments), 1)
+    self.assertEquals(self._Apply(_FakeGenerator("bar")), "Hello bar!!")
+    self.assertEquals(len(template_expander._environments), 1)
+
+  def testBytecodeCache(self):
+    """Tests that compiled templates are cached on disk, and reused."""
+    cache_dir = os.path.join(self._temp_dir, "cache")
+    template_expander.SetBytecodeCacheDirectory(cache_dir)
+    self.assertEquals(self._Apply(_FakeGenerator("foo")), "Hello foo!!")
+    self.assertEquals(len(os.listdir(cache_dir)), 2)
+
+    # Fresh environments load the templates from the cache.
+    template_expander._environments.clear()
+    self.assertEquals(self._Apply(_FakeGenerator("bar")), "Hello bar!!")
+    self.assertEquals(len(os.listdir(cache_dir)), 2)
+
+    # Corrupt entries are recompiled.
+    for filename in os.listdir(cache_dir):
+      with open(os.path.join(cache_dir, filename), "r+b") as f:
+        f.truncate(20)
+    template_expander._environments.clear()
+    self.assertEquals(self._Apply(_FakeGenerator("baz")), "Hello baz!!")
+
+if __name__ == "__main__":
+  unittest.main()
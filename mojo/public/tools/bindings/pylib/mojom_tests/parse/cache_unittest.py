@@ -0,0 +1,109 @@
+# Copyright 2015 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+import imp
+import os.path
+import shutil
+import sys
+import tempfile
+import unittest
+
+def _GetDirAbove(dirname):
+  """Returns the directory "above" this file containing |dirname| (which must
+  also be "above" this file)."""
+  path = os.path.abspath(__file__)
+  while True:
+    path, tail = os.path.split(path)
+    assert tail
+    if tail == dirname:
+      return path
+
+try:
+  imp.find_module("mojom")
+except ImportError:
+  sys.path.append(os.path.join(_GetDirAbove("pylib"), "pylib"))
+from mojom.parse import cache
+from mojom.parse import parser
+
+
+class ParseCacheTest(unittest.TestCase):
+
+  def setUp(self):
+    self._temp_dir = tempfile.mkdtemp()
+
+  def tearDown(self):
+    shutil.rmtree(self._temp_dir)
+
+  def testRoundTrip(self):
+    """Tests that data put in the cache is read back, also by another
+    instance."""
+    source = "module my_module; struct MyStruct { int32 a; };"
+    tree = parser.Parse(source, "my_file.mojom")
+
+    parse_cache = cache.ParseCache(self._temp_dir)
+    key = parse_cache.GetKey("my_file.mojom", source, [])
+    self.assertIsNone(parse_cache.Get(key, cache.KIND_AST))
+    parse_cache.Put(key, cache.KIND_AST, tree)
+    self.assertEquals(parse_cache.Get(key, cache.KIND_AST), tree)
+    # The kinds are stored separately.
+    self.assertIsNone(parse_cache.Get(key, cache.KIND_TRANSLATION))
+    self.assertEquals(parse_cache.hits, 1)
+    self.assertEquals(parse_cache.misses, 2)
+
+    other_cache = cache.ParseCache(self._temp_dir)
+    self.assertEquals(
+        other_cache.Get(other_cache.GetKey("my_file.mojom", source, []),
+                        cache.KIND_AST),
+        tree)
+
+  def testInMemory(self):
+    """Tests that entries are kept in memory, and that the returned data can be
+    modified without affecting the cache."""
+    parse_cache = cache.ParseCache(None)
+    key = parse_cache.GetKey("a.mojom", "module a;", [])
+    parse_cache.Put(key, cache.KIND_TRANSLATION, {"imports": []})
+    data = parse_cache.Get(key, cache.KIND_TRANSLATION)
+    self.assertEquals(data, {"imports": []})
+    data["imports"].append("b.mojom")
+    self.assertEquals(parse_cache.Get(key, cache.KIND_TRANSLATION),
+                      {"imports": []})
+    self.assertEquals(os.listdir(self._temp_dir), [])
+
+    # Entries read from disk are also kept in memory.
+    parse_cache = cache.ParseCache(self._temp_dir)
+    parse_cache.Put(key, cache.KIND_AST, "data")
+    memory_cache = cache.ParseCache(self._temp_dir, keep_in_memory=True)
+    self.assertEquals(memory_cache.Get(key, cache.KIND_AST), "data")
+    shutil.rmtree(os.path.join(self._temp_dir, "parsed"))
+    self.assertEquals(memory_cache.Get(key, cache.KIND_AST), "data")
+    self.assertIsNone(parse_cache.Get(key, cache.KIND_AST))
+
+  def testKeys(self):
+    """Tests that keys depend on the file name, contents and import
+    directories."""
+    parse_cache = cache.ParseCache(self._temp_dir)
+    key = parse_cache.GetKey("a.mojom", "module a;", ["x"])
+    self.assertEquals(key, parse_cache.GetKey("a.mojom", "module a;", ["x"]))
+    self.assertNotEquals(key,
+                         parse_cache.GetKey("b.mojom", "module a;", ["x"]))
+    self.assertNotEquals(key,
+                         parse_cache.GetKey("a.mojom", "module b;", ["x"]))
+    self.assertNotEquals(key,
+                         parse_cache.GetKey("a.mojom", "module a;", ["y"]))
+    self.assertNotEquals(key,
+                         parse_cache.GetKey("a.mojom", "module a;", []))
+
+  def testCorruptEntry(self):
+    """Tests that a corrupt entry is treated as a miss."""
+    parse_cache = cache.ParseCache(self._temp_dir)
+    key = parse_cache.GetKey("a.mojom", "module a;", [])
+    parse_cache.Put(key, cache.KIND_AST, "data")
+    with open(parse_cache._GetPath(key, cache.KIND_AST), "wb") as f:
+      f.write("garbage")
+    self.assertIsNone(parse_cache.Get(key, cache.KIND_AST))
+    self.assertEquals(parse_cache.misses, 1)
+
+
+if __name__ == "__main__":
+  unittest.main()
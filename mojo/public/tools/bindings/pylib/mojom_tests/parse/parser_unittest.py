@@ -4,7 +4,9 @@
 
 import imp
 import os.path
+import shutil
 import sys
+import tempfile
 import unittest
 
 def _GetDirAbove(dirname):
@@ -1412,5 +1414,49 @@ class ParserTest(unittest.TestCase):
       parser.Parse(source, "my_file.mojom")
 
 
+class ParserReuseTest(unittest.TestCase):
+  """Tests that the parser shared by |parser.Parse()| calls is reset between
+  calls, and that its tables can be cached."""
+
+  def testLineNumbersAfterError(self):
+    """Tests that an error does not affect the following parses."""
+    with self.assertRaises(parser.ParseError):
+      parser.Parse("\n\nmodule {", "my_bad_file.mojom")
+    source = """\
+        module my_module;
+
+        struct MyStruct {
+          int32 a;
+          int32 b
+        };
+        """
+    with self.assertRaisesRegexp(
+        parser.ParseError,
+        r"^my_file\.mojom:6: Error: Unexpected '}':\n *};$"):
+      parser.Parse(source, "my_file.mojom")
+
+  def testTableCache(self):
+    """Tests that the parser tables are written to, and read from, the cache
+    directory."""
+    source = "module my_module;\n"
+    expected = parser.Parse(source, "my_file.mojom")
+    cache_dir = tempfile.mkdtemp()
+    try:
+      parser.SetTableCacheDirectory(cache_dir)
+      parser._shared_parser = None
+      self.assertEquals(parser.Parse(source, "my_file.mojom"), expected)
+      cached_files = os.listdir(cache_dir)
+      self.assertEquals(len(cached_files), 1)
+      self.assertTrue(cached_files[0].endswith(".pickle"))
+
+      parser._shared_parser = None
+      self.assertEquals(parser.Parse(source, "my_file.mojom"), expected)
+      self.assertEquals(os.listdir(cache_dir), cached_files)
+    finally:
+      parser.SetTableCacheDirectory(None)
+      parser._shared_parser = None
+      shutil.rmtree(cache_dir)
+
+
 if __name__ == "__main__":
   unittest.main()
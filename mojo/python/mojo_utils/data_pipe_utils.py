@@ -2,7 +2,7 @@
 # Use of this source code is governed by a BSD-style license that can be
 # found in the LICENSE file.
 
-import itertools
+import collections
 import sys
 
 import mojo_system
@@ -14,24 +14,30 @@ class DataPipeCopyException(Exception):
     self.__traceback__ = sys.exc_info()[2]
 
 
-def CopyFromDataPipe(data_pipe, deadline):
+def StreamFromDataPipe(data_pipe, deadline, on_data):
   """
+  Reads |data_pipe| until it is closed, calling |on_data| with each chunk of
+  data as it arrives. Each chunk is a read-only memoryview directly on the
+  memory of the data pipe (using two-phase reads), that is only valid until
+  |on_data| returns; if |on_data| returns a Promise, the chunk stays valid (and
+  no more data is read) until the promise resolves.
+
   Returns a Promise that operates as follows:
-  - If |data_pipe| is successfully read from, the promise resolves with the
-    bytes that were read.
+  - If |data_pipe| is successfully read from until it is closed, the promise
+    resolves with the number of bytes that were read.
   - Otherwise, the promise rejects with an exception whose message contains the
-    status from the attempted read.
+    status from the attempted read (or with the exception |on_data| raised, or
+    the rejection reason of the promise it returned).
   """
-  class DataPipeCopyHelper():
-    def __init__(self, data_pipe, deadline, resolve, reject):
+  class DataPipeStreamHelper():
+    def __init__(self, data_pipe, deadline, on_data, resolve, reject):
       self.data_pipe = data_pipe
       self.original_deadline = deadline
       self.start_time = mojo_system.GetTimeTicksNow()
+      self.on_data = on_data
       self.resolve = resolve
       self.reject = reject
-      self.buffer_size = 1024
-      self.data = bytearray(self.buffer_size)
-      self.index = 0
+      self.num_bytes = 0
 
     def _ComputeCurrentDeadline(self):
       if self.original_deadline == mojo_system.DEADLINE_INDEFINITE:
@@ -39,38 +45,162 @@ def CopyFromDataPipe(data_pipe, deadline):
       elapsed_time = mojo_system.GetTimeTicksNow() - self.start_time
       return max(0, self.original_deadline - elapsed_time)
 
-    def CopyFromDataPipeAsync(self, result):
+    def StreamFromDataPipeAsync(self, result):
       while result == mojo_system.RESULT_OK:
-        assert self.index <= len(self.data)
-        if self.index == len(self.data):
-          self.buffer_size *= 2
-          self.data.extend(itertools.repeat(0, self.buffer_size))
-
-        # Careful! Have to construct a memoryview object here as otherwise the
-        # slice operation will create a copy of |data| and hence not write into
-        # |data| as desired.
-        result, read_bytes = self.data_pipe.ReadData(
-            memoryview(self.data)[self.index:])
-        if read_bytes:
-          self.index += len(read_bytes)
-        del read_bytes
+        result, two_phase_buffer = self.data_pipe.BeginReadData()
+        if result != mojo_system.RESULT_OK:
+          break
+        chunk = two_phase_buffer.buffer
+        num_bytes = len(chunk)
+        try:
+          consumed = self.on_data(chunk)
+        except Exception as e:
+          two_phase_buffer.End(0)
+          self.reject(e)
+          return
+        del chunk
+        if isinstance(consumed, promise.Promise):
+          self._EndReadWhenConsumed(consumed, two_phase_buffer, num_bytes)
+          return
+        result = self._EndReadData(two_phase_buffer, num_bytes)
 
       if result == mojo_system.RESULT_SHOULD_WAIT:
-        data_pipe.AsyncWait(mojo_system.HANDLE_SIGNAL_READABLE,
-                            self._ComputeCurrentDeadline(),
-                            self.CopyFromDataPipeAsync)
+        self.data_pipe.AsyncWait(mojo_system.HANDLE_SIGNAL_READABLE,
+                                 self._ComputeCurrentDeadline(),
+                                 self.StreamFromDataPipeAsync)
         return
 
       # Treat a failed precondition as EOF.
       if result == mojo_system.RESULT_FAILED_PRECONDITION:
-        self.resolve(self.data[:self.index])
+        self.resolve(self.num_bytes)
         return
 
       self.reject(DataPipeCopyException("Result: %d" % result))
 
+    def _EndReadData(self, two_phase_buffer, num_bytes):
+      self.num_bytes += num_bytes
+      return two_phase_buffer.End(num_bytes)
+
+    def _EndReadWhenConsumed(self, consumed, two_phase_buffer, num_bytes):
+      """Resumes reading once |consumed| resolves."""
+      def OnConsumed(_):
+        self.StreamFromDataPipeAsync(
+            self._EndReadData(two_phase_buffer, num_bytes))
+      def OnFailed(reason):
+        two_phase_buffer.End(0)
+        self.reject(reason)
+      consumed.Then(OnConsumed, OnFailed)
 
   def GenerationMethod(resolve, reject):
-    helper = DataPipeCopyHelper(data_pipe, deadline, resolve, reject)
-    helper.CopyFromDataPipeAsync(mojo_system.RESULT_OK)
+    helper = DataPipeStreamHelper(data_pipe, deadline, on_data, resolve, reject)
+    helper.StreamFromDataPipeAsync(mojo_system.RESULT_OK)
 
   return promise.Promise(GenerationMethod)
+
+
+def CopyFromDataPipe(data_pipe, deadline):
+  """
+  Returns a Promise that operates as follows:
+  - If |data_pipe| is successfully read from, the promise resolves with the
+    bytes that were read.
+  - Otherwise, the promise rejects with an exception whose message contains the
+    status from the attempted read.
+  """
+  data = bytearray()
+  return StreamFromDataPipe(data_pipe, deadline, data.extend).Then(
+      lambda _: data)
+
+
+class DataPipeWriter(object):
+  """
+  Writes data to a data pipe producer, as the data pipe has room for it (using
+  two-phase writes).
+
+  The data passed to Write() is referenced (not copied) until it is written, so
+  a producer that waits for the promise returned by Write() before writing more
+  uses a bounded amount of memory, whatever the amount of data it writes.
+  """
+
+  def __init__(self, data_pipe, deadline=mojo_system.DEADLINE_INDEFINITE):
+    """
+    Args:
+      data_pipe: The producer handle of the data pipe.
+      deadline: The deadline of each wait for the data pipe to have room.
+    """
+    self._data_pipe = data_pipe
+    self._deadline = deadline
+    # The [remaining data, number of bytes, resolve, reject] lists of the
+    # pending writes, in order.
+    self._pending_writes = collections.deque()
+    # Whether the pending writes are being written (or waiting for room).
+    self._writing = False
+
+  def Write(self, data):
+    """
+    Writes |data| (any object supporting the buffer protocol) after the data of
+    the previous writes. Returns a Promise that resolves with the number of
+    bytes of |data| once it is all written, or rejects with a
+    DataPipeCopyException if the data pipe can't be written to.
+    """
+    def GenerationMethod(resolve, reject):
+      view = memoryview(data)
+      self._pending_writes.append([view, len(view), resolve, reject])
+      if not self._writing:
+        self._WriteAsync(mojo_system.RESULT_OK)
+    return promise.Promise(GenerationMethod)
+
+  def Close(self):
+    """
+    Closes the data pipe once the data of the previous writes is written.
+    Returns a Promise that resolves once it is closed.
+    """
+    def CloseDataPipe(_):
+      self._data_pipe.Close()
+    return self.Write('').Then(CloseDataPipe)
+
+  def _WriteAsync(self, result):
+    self._writing = True
+    pending_writes = self._pending_writes
+    while result == mojo_system.RESULT_OK and pending_writes:
+      pending_write = pending_writes[0]
+      view = pending_write[0]
+      if not len(view):
+        pending_writes.popleft()
+        pending_write[2](pending_write[1])
+        continue
+      result, two_phase_buffer = self._data_pipe.BeginWriteData()
+      if result != mojo_system.RESULT_OK:
+        break
+      num_bytes = min(len(two_phase_buffer.buffer), len(view))
+      two_phase_buffer.buffer[:num_bytes] = view[:num_bytes]
+      result = two_phase_buffer.End(num_bytes)
+      pending_write[0] = view[num_bytes:]
+
+    if not pending_writes:
+      self._writing = False
+      return
+
+    if result == mojo_system.RESULT_SHOULD_WAIT:
+      self._data_pipe.AsyncWait(mojo_system.HANDLE_SIGNAL_WRITABLE,
+                                self._deadline, self._WriteAsync)
+      return
+
+    self._writing = False
+    error = DataPipeCopyException("Result: %d" % result)
+    while pending_writes:
+      pending_writes.popleft()[3](error)
+
+
+def CopyToDataPipe(data, data_pipe, deadline):
+  """
+  Writes |data| to |data_pipe| (as it has room for it), and closes it.
+
+  Returns a Promise that operates as follows:
+  - If |data| is successfully written, the promise resolves with the number of
+    bytes written.
+  - Otherwise, the promise rejects with an exception whose message contains the
+    status from the attempted write.
+  """
+  writer = DataPipeWriter(data_pipe, deadline)
+  written = writer.Write(data)
+  return written.Then(lambda num_bytes: writer.Close().Then(lambda _: num_bytes))
@@ -100,3 +100,68 @@ class SerializationDeserializationTest(mojo_unittest.MojoTestCase):
   def testFooDeserializationError(self):
     with self.assertRaises(Exception):
       sample_service_mojom.Foo.Deserialize("", [])
+
+  def testGenericSerializationMatchesCompiledCodec(self):
+    foo = _NewFoo()
+    try:
+      serialization.SetCompiledCodecsEnabled(False)
+      (generic_data, _) = foo.Serialize()
+    finally:
+      serialization.SetCompiledCodecsEnabled(True)
+    foo = _NewFoo()
+    (compiled_data, _) = foo.Serialize()
+    self.assertEquals(generic_data, compiled_data)
+
+  def testGenericDeserializationMatchesCompiledCodec(self):
+    foo1 = _NewFoo()
+    (data, handles) = foo1.Serialize()
+    context = serialization.RootDeserializationContext(data, handles)
+    foo2 = sample_service_mojom.Foo.Deserialize(context)
+    try:
+      serialization.SetCompiledCodecsEnabled(False)
+      context = serialization.RootDeserializationContext(data, handles)
+      foo3 = sample_service_mojom.Foo.Deserialize(context)
+    finally:
+      serialization.SetCompiledCodecsEnabled(True)
+    self.assertEquals(foo1, foo2)
+    self.assertEquals(foo2, foo3)
+
+  def testFooLazyDeserialization(self):
+    foo1 = _NewFoo()
+    (data, handles) = foo1.Serialize()
+    context = serialization.RootDeserializationContext(data, handles, True)
+    foo2 = sample_service_mojom.Foo.Deserialize(context)
+    self.assertEquals(foo1, foo2)
+    self.assertEquals(foo2.data.tostring(), 'Hello world')
+    self.assertEquals(foo2.name, u'Foo.name')
+    self.assertEquals(foo2.multi_array_of_strings, foo1.multi_array_of_strings)
+
+  def testFooLazyDeserializationKeepsData(self):
+    (data, handles) = _NewFoo().Serialize()
+    context = serialization.RootDeserializationContext(data, handles, True)
+    foo = sample_service_mojom.Foo.Deserialize(context)
+    del data
+    del context
+    self.assertEquals(list(foo.data), [ord(x) for x in 'Hello world'])
+
+  def testFooLazyDeserializationSerialization(self):
+    (data, handles) = _NewFoo().Serialize()
+    context = serialization.RootDeserializationContext(data, handles, True)
+    foo = sample_service_mojom.Foo.Deserialize(context)
+    (other_data, _) = foo.Serialize()
+    self.assertEquals(data, other_data)
+
+  def testLargeArraysSerializationDeserialization(self):
+    foo1 = _NewFoo()
+    foo1.extra_bars = [_NewBar() for _ in xrange(1000)]
+    foo1.multi_array_of_strings = [[[str(i)] * (i % 5) for i in xrange(100)]]
+    (data, handles) = foo1.Serialize()
+    context = serialization.RootDeserializationContext(data, handles)
+    foo2 = sample_service_mojom.Foo.Deserialize(context)
+    self.assertEquals(foo1, foo2)
+    try:
+      serialization.SetCompiledCodecsEnabled(False)
+      (generic_data, _) = foo1.Serialize()
+    finally:
+      serialization.SetCompiledCodecsEnabled(True)
+    self.assertEquals(data, generic_data)
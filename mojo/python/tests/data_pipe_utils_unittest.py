@@ -94,3 +94,54 @@ class DataPipeCopyTest(mojo_unittest.MojoTestCase):
 
   def testDelayedWriteOfLargeBuffer(self):
     self._testDelayedWrite(_GetRandomBuffer(32 * 1024))
+
+  def testStreamFromDataPipe(self):
+    data = _GetRandomBuffer(32 * 1024)
+    chunks = []
+    def OnData(chunk):
+      chunks.append(chunk.tobytes())
+    def OnDone(num_bytes):
+      self.assertEquals(len(data), num_bytes)
+      self.assertEquals(data, bytearray().join(chunks))
+      self.loop.Quit()
+    data_pipe_utils.StreamFromDataPipe(
+        self.handles.consumer_handle, system.DEADLINE_INDEFINITE,
+        OnData).Then(OnDone).Catch(self._CatchError)
+    self._writeDataAndClose(self.handles.producer_handle, data)
+    self._runAndCheckError()
+
+  def testCopyToDataPipe(self):
+    # Much more data than the data pipe can hold at once.
+    options = system.CreateDataPipeOptions()
+    options.capacity_num_bytes = 1024
+    handles = system.DataPipe(options)
+    data = _GetRandomBuffer(64 * 1024)
+    self._copyDataFromPipe(handles.consumer_handle, data)
+    data_pipe_utils.CopyToDataPipe(
+        data, handles.producer_handle,
+        system.DEADLINE_INDEFINITE).Catch(self._CatchError)
+    self._runAndCheckError()
+
+  def testStreamBetweenDataPipes(self):
+    # Each chunk read from the first data pipe is only released once it is
+    # written to the second one.
+    options = system.CreateDataPipeOptions()
+    options.capacity_num_bytes = 1024
+    output_handles = system.DataPipe(options)
+    writer = data_pipe_utils.DataPipeWriter(output_handles.producer_handle)
+    data = _GetRandomBuffer(64 * 1024)
+    data_pipe_utils.StreamFromDataPipe(
+        self.handles.consumer_handle, system.DEADLINE_INDEFINITE,
+        writer.Write).Then(lambda _: writer.Close()).Catch(self._CatchError)
+    self._copyDataFromPipe(output_handles.consumer_handle, data)
+    data_pipe_utils.CopyToDataPipe(
+        data, self.handles.producer_handle,
+        system.DEADLINE_INDEFINITE).Catch(self._CatchError)
+    self._runAndCheckError()
+
+  def testCopyToClosedDataPipe(self):
+    self.handles.consumer_handle.Close()
+    data_pipe_utils.CopyToDataPipe(
+        _GetRandomBuffer(1024), self.handles.producer_handle,
+        system.DEADLINE_INDEFINITE).Catch(self._CatchError)
+    self.assertIsInstance(self.error, data_pipe_utils.DataPipeCopyException)
@@ -82,6 +82,34 @@ class ConnectorTest(mojo_unittest.MojoTestCase):
     self.assertTrue(self.received_messages[0].handles)
     self.assertFalse(self.received_errors)
 
+  def testConnectorReadWithMessageLimit(self):
+    self.connector.SetMaxMessagesPerRead(2)
+    for i in xrange(5):
+      self.handle.WriteMessage(bytearray([i]))
+    self.loop.RunUntilIdle()
+    self.assertEquals([m.data for m in self.received_messages],
+                      [bytearray([i]) for i in xrange(5)])
+    self.assertFalse(self.received_errors)
+
+  def testConnectorStats(self):
+    self.handle.WriteMessage(bytearray(10))
+    self.handle.WriteMessage(bytearray(6))
+    self.loop.RunUntilIdle()
+    self.assertEquals(self.connector.stats.messages_read, 2)
+    self.assertEquals(self.connector.stats.bytes_read, 16)
+    self.assertEquals(self.connector.stats.buffer_resizes, 0)
+
+  def testConnectorReadLargeMessages(self):
+    data = bytearray(xrange(256)) * 1024
+    self.handle.WriteMessage(data)
+    self.handle.WriteMessage(data[:100])
+    self.handle.WriteMessage(data)
+    self.loop.RunUntilIdle()
+    self.assertEquals([m.data for m in self.received_messages],
+                      [data, data[:100], data])
+    self.assertEquals(self.connector.stats.buffer_resizes, 1)
+    self.assertFalse(self.received_errors)
+
 
 class HeaderTest(unittest.TestCase):
 
@@ -224,6 +224,98 @@ class PromiseTest(unittest.TestCase):
     p.GetTwo().Catch(AddToRes)
     self.assertEquals(len(res), 1)
 
+  def testLongChain(self):
+    (p, resolve, _) = _GetPromiseAndFunctions()
+    q = p
+    for _ in xrange(10000):
+      q = q.Then(lambda x: x + 1)
+    q.Then(self._AddToAccumulated)
+    resolve(0)
+    self.assertEquals(self.accumulated, [10000])
+
+    # Rejections are propagated without recursing either.
+    (p, _, reject) = _GetPromiseAndFunctions()
+    q = p
+    for _ in xrange(10000):
+      q = q.Then(lambda x: x + 1)
+    q.Catch(self._AddToAccumulated)
+    reject('error')
+    self.assertEquals(self.accumulated, [10000, 'error'])
+
+  def testLongChainOfBoundPromises(self):
+    (p, resolve, _) = _GetPromiseAndFunctions()
+    q = p
+    for _ in xrange(10000):
+      q = promise.Promise(lambda x, y, q=q: x(q))
+    q.Then(self._AddToAccumulated)
+    self.assertEquals(q.state, promise.Promise.STATE_PENDING)
+    resolve(0)
+    self.assertEquals(q.state, promise.Promise.STATE_FULLFILLED)
+    self.assertEquals(self.accumulated, [0])
+
+  def testThenInCallback(self):
+    # A callback added from inside a callback runs after it (even on a settled
+    # promise), when the outer callback has returned.
+    inner = promise.Promise.Resolve(2)
+    def Outer(_):
+      inner.Then(self._AddToAccumulated)
+      self.accumulated.append('outer returns')
+    promise.Promise.Resolve(1).Then(Outer)
+    self.assertEquals(self.accumulated, ['outer returns', 2])
+
+  def testRunLoop(self):
+    run_loop = _FakeRunLoop()
+    promise.SetRunLoop(run_loop)
+    try:
+      (p, resolve, _) = _GetPromiseAndFunctions()
+      p.Then(lambda x: x + 1).Then(self._AddToAccumulated)
+      resolve(0)
+      promise.Promise.Resolve(1).Then(self._AddToAccumulated)
+      # The callbacks are run by a single task.
+      self.assertEquals(self.accumulated, [])
+      self.assertEquals(len(run_loop.tasks), 1)
+      run_loop.RunUntilIdle()
+      self.assertEquals(self.accumulated, [1, 1])
+    finally:
+      promise.SetRunLoop(None)
+
+  def testRunLoopGone(self):
+    run_loop = _FakeRunLoop()
+    promise.SetRunLoop(run_loop)
+    try:
+      promise.Promise.Resolve(1).Then(self._AddToAccumulated)
+      self.assertEquals(len(run_loop.tasks), 1)
+      # The run loop is destroyed without running the posted task.
+      del run_loop
+      promise.Promise.Resolve(2).Then(self._AddToAccumulated)
+      self.assertEquals(self.accumulated, [1, 2])
+    finally:
+      promise.SetRunLoop(None)
+
+  def testRunLoopReset(self):
+    run_loop = _FakeRunLoop()
+    promise.SetRunLoop(run_loop)
+    try:
+      promise.Promise.Resolve(1).Then(self._AddToAccumulated)
+    finally:
+      promise.SetRunLoop(None)
+    # The posted task is never run.
+    promise.Promise.Resolve(2).Then(self._AddToAccumulated)
+    self.assertEquals(self.accumulated, [1, 2])
+    self.assertEquals(len(run_loop.tasks), 1)
+
+
+class _FakeRunLoop(object):
+  def __init__(self):
+    self.tasks = []
+
+  def PostDelayedTask(self, runnable, delay=0):
+    self.tasks.append(runnable)
+
+  def RunUntilIdle(self):
+    while self.tasks:
+      self.tasks.pop(0)()
+
 
 def _GetPromiseAndFunctions():
   functions = {}
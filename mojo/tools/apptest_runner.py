@@ -6,8 +6,12 @@
 """A test runner for gtest application tests."""
 
 import argparse
+import cStringIO
+import json
 import logging
+import multiprocessing
 import sys
+import time
 
 import devtools
 devtools.add_pylib_to_path()
@@ -23,6 +27,196 @@ from mopy.paths import Paths
 
 _logger = logging.getLogger()
 
+# The state of the processes running apptests (see _init_worker()).
+_worker_state = {}
+
+
+def _init_worker(config, shell, test_list, extra_args, timeout, capture):
+  """Initializes the state needed by _list_fixtures() and _run_work_item() (in
+  each process of the pool)."""
+  _worker_state["config"] = config
+  _worker_state["shell"] = shell
+  _worker_state["test_list"] = test_list
+  _worker_state["extra_args"] = extra_args
+  _worker_state["timeout"] = timeout
+  # Whether to capture what's printed (so that the output of the concurrently
+  # running apptests isn't interleaved).
+  _worker_state["capture"] = capture
+
+
+def _call_capturing_output(function, *args):
+  """Calls |function|, returning a tuple (its result, what it printed (if it is
+  being captured))."""
+  if not _worker_state["capture"]:
+    return (function(*args), "")
+  stdout = sys.stdout
+  sys.stdout = cStringIO.StringIO()
+  try:
+    result = function(*args)
+    return (result, sys.stdout.getvalue())
+  finally:
+    sys.stdout = stdout
+
+
+def _shell_args(test_dict):
+  return test_dict.get("shell-args", []) + _worker_state["extra_args"]
+
+
+def _list_fixtures(index):
+  """Returns a tuple (index, fixtures, output) for the gtest_isolated apptest
+  at |index| in the test list."""
+  test_dict = _worker_state["test_list"][index]
+  (fixtures, output) = _call_capturing_output(
+      gtest.get_fixtures, _worker_state["config"], _worker_state["shell"],
+      _shell_args(test_dict), test_dict["test"])
+  return (index, fixtures, output)
+
+
+def _run_work_item(work_item):
+  """Runs the fixture |work_item| = (index, fixture) of the apptest at index in
+  the test list (or the whole apptest if fixture is None). Returns a tuple
+  (index, fixture, result, run time, output)."""
+  (index, fixture) = work_item
+  config = _worker_state["config"]
+  shell = _worker_state["shell"]
+  timeout = _worker_state["timeout"]
+  test_dict = _worker_state["test_list"][index]
+  test = test_dict["test"]
+  test_args = test_dict.get("test-args", [])
+  shell_args = _shell_args(test_dict)
+
+  _logger.info("Will start: %s" % (fixture or test))
+  start_time = time.time()
+  if test_dict.get("type", "gtest") == "dart":
+    (result, output) = _call_capturing_output(
+        dart_apptest.run_test, config, shell, shell_args, {test: test_args},
+        timeout)
+  else:
+    (result, output) = _call_capturing_output(
+        gtest.run_fixture, config, shell, test, fixture, test_args, shell_args,
+        timeout)
+  _logger.info("Completed: %s" % (fixture or test))
+  return (index, fixture, result, time.time() - start_time, output)
+
+
+def _imap(function, items, jobs, worker_args):
+  """Calls |function| on the items, |jobs| at a time, yielding the results as
+  they are available."""
+  if jobs == 1:
+    _init_worker(*(worker_args + (False,)))
+    for item in items:
+      yield function(item)
+    return
+
+  pool = multiprocessing.Pool(jobs, _init_worker, worker_args + (True,))
+  try:
+    for result in pool.imap_unordered(function, items):
+      yield result
+  finally:
+    pool.terminate()
+    pool.join()
+
+
+def _run_apptests(test_list, jobs, worker_args):
+  """Runs the apptests, |jobs| fixtures (or whole apptests, if they aren't
+  isolated) at a time, yielding a tuple (index, result, fixture results, output)
+  for each apptest as it completes, where fixture results is a list of tuples
+  (fixture, result, run time)."""
+  # The work items, (index, fixture) tuples, are all enumerated up front, so
+  # that the fixtures of every apptest can run concurrently.
+  work_items = []
+  isolated = []
+  for (index, test_dict) in enumerate(test_list):
+    test_type = test_dict.get("type", "gtest")
+    if test_type == "gtest_isolated":
+      isolated.append(index)
+    elif test_type in ("dart", "gtest"):
+      work_items.append((index, None))
+    else:
+      yield (index, "Invalid test type in %r" % test_dict, [], "")
+
+  # The number of work items that haven't completed for each apptest.
+  remaining = {}
+  outputs = {}
+  for (index, _) in work_items:
+    remaining[index] = 1
+    outputs[index] = []
+  for (index, fixtures, output) in _imap(_list_fixtures, isolated, jobs,
+                                         worker_args):
+    if not fixtures:
+      yield (index, "Failed with no tests found.", [], output)
+      continue
+    work_items.extend((index, fixture) for fixture in fixtures)
+    remaining[index] = len(fixtures)
+    outputs[index] = [output]
+  # Keep the work items of each apptest together, in the order of the list.
+  work_items.sort(key=lambda (index, _): index)
+  # The position of each work item, to report the fixtures in order.
+  positions = dict((work_item, position)
+                   for (position, work_item) in enumerate(work_items))
+
+  fixture_results = dict((index, []) for index in remaining)
+  for (index, fixture, result, run_time, output) in _imap(
+      _run_work_item, work_items, jobs, worker_args):
+    fixture_results[index].append((fixture, result, run_time))
+    outputs[index].append(output)
+    remaining[index] -= 1
+    if remaining[index]:
+      continue
+    fixture_results[index].sort(
+        key=lambda fixture_result: positions[(index, fixture_result[0])])
+    if all(fixture_result[1] == gtest.PASSED
+           for fixture_result in fixture_results[index]):
+      apptest_result = "Succeeded"
+    else:
+      apptest_result = "Failed test(s) in %r" % test_list[index]
+    yield (index, apptest_result, fixture_results[index],
+           "".join(outputs[index]))
+
+
+def _write_json_results(filename, test_list, results):
+  """Writes the results (a dictionary mapping the indices of the apptests in
+  the test list to tuples (result, fixture results)) to |filename|, in the
+  format:
+    {
+      "succeeded": true if all the apptests succeeded,
+      "apptests": [
+        {
+          "name": "Short name",
+          "result": "Succeeded" or the reason of the failure,
+          "fixtures": [
+            {
+              "name": "TestSuite.TestFixture" (or the name of the apptest, if
+                  it isn't isolated),
+              "result": "PASS", "FAIL" or "TIMEOUT",
+              "time": run time in seconds
+            },
+            ...
+          ]
+        },
+        ...
+      ]
+    }
+  """
+  apptests = []
+  for (index, test_dict) in enumerate(test_list):
+    test_name = test_dict.get("name", test_dict["test"])
+    (apptest_result, fixture_results) = results[index]
+    apptests.append({
+        "name": test_name,
+        "result": apptest_result,
+        "fixtures": [{"name": fixture or test_name,
+                      "result": result,
+                      "time": run_time}
+                     for (fixture, result, run_time) in fixture_results],
+    })
+  with open(filename, "w") as f:
+    json.dump({
+        "succeeded": all(apptest["result"] == "Succeeded"
+                         for apptest in apptests),
+        "apptests": apptests,
+    }, f, indent=2, sort_keys=True)
+
 
 def main():
   parser = argparse.ArgumentParser(description="A test runner for application "
@@ -30,11 +224,25 @@ def main():
 
   parser.add_argument("--verbose", help="be verbose (multiple times for more)",
                       default=0, dest="verbose_count", action="count")
+  parser.add_argument("-j", "--jobs", type=int, default=1,
+                      help="the number of fixtures (or apptests) to run "
+                           "concurrently (not supported for Android)")
+  parser.add_argument("--timeout", type=float,
+                      help="the number of seconds after which a fixture (or "
+                           "an apptest, if it isn't isolated) is killed and "
+                           "fails (not supported for Android)")
+  parser.add_argument("--write-json-results", metavar="FILE",
+                      help="write the results of the apptests and their "
+                           "fixtures to FILE, in JSON")
   parser.add_argument("test_list_file", type=file,
                       help="a file listing apptests to run")
   parser.add_argument("build_dir", type=str,
                       help="the build output directory")
   args = parser.parse_args()
+  if args.jobs < 1:
+    parser.error("--jobs must be positive")
+  if args.timeout is not None and args.timeout <= 0:
+    parser.error("--timeout must be positive")
 
   InitLogging(args.verbose_count)
   config = ConfigForGNArgs(ParseGNConfig(args.build_dir))
@@ -45,46 +253,37 @@ def main():
   test_list = execution_globals["tests"]
   _logger.debug("Test list: %s" % test_list)
 
+  jobs = args.jobs
   extra_args = []
   if config.target_os == Config.OS_ANDROID:
     paths = Paths(config)
     shell = AndroidShell(paths.adb_path)
     shell.InstallApk(paths.target_mojo_shell_path)
     extra_args.append(shell.SetUpLocalOrigin(paths.build_dir, fixed_port=False))
+    if jobs > 1:
+      # The apptests would compete for the device.
+      print "Running apptests serially on Android (ignoring --jobs)"
+      jobs = 1
   else:
     shell = None
 
   gtest.set_color()
 
   exit_code = 0
-  for test_dict in test_list:
-    test = test_dict["test"]
-    test_name = test_dict.get("name", test)
-    test_type = test_dict.get("type", "gtest")
-    test_args = test_dict.get("test-args", [])
-    shell_args = test_dict.get("shell-args", []) + extra_args
-
-    _logger.info("Will start: %s" % test_name)
-    print "Running %s...." % test_name,
+  results = {}
+  for (index, apptest_result, fixture_results, output) in _run_apptests(
+      test_list, jobs, (config, shell, test_list, extra_args, args.timeout)):
+    test_dict = test_list[index]
+    sys.stdout.write(output)
+    print "Running %s.... %s" % (test_dict.get("name", test_dict["test"]),
+                                 apptest_result)
     sys.stdout.flush()
-
-    if test_type == "dart":
-      apptest_result = dart_apptest.run_test(config, shell, test_dict,
-                                             shell_args, {test: test_args})
-    elif test_type == "gtest":
-      apptest_result = gtest.run_fixtures(config, shell, test_dict,
-                                          test, False,
-                                          test_args, shell_args)
-    elif test_type == "gtest_isolated":
-      apptest_result = gtest.run_fixtures(config, shell, test_dict,
-                                          test, True, test_args, shell_args)
-    else:
-      apptest_result = "Invalid test type in %r" % test_dict
-
     if apptest_result != "Succeeded":
       exit_code = 1
-    print apptest_result
-    _logger.info("Completed: %s" % test_name)
+    results[index] = (apptest_result, fixture_results)
+
+  if args.write_json_results:
+    _write_json_results(args.write_json_results, test_list, results)
 
   return exit_code
 
@@ -12,6 +12,7 @@ recipe)."""
 
 import argparse
 import json
+import multiprocessing
 import os
 import sys
 
@@ -76,10 +77,14 @@ def GetTestList(config, verbose_count=0):
 
   # C++ unit tests:
   if ShouldRunTest(Config.TEST_TYPE_DEFAULT, Config.TEST_TYPE_UNIT):
+    # (On Android, the tests are run serially on the device.)
+    jobs_flags = []
+    if target_os != Config.OS_ANDROID:
+      jobs_flags = ["--jobs", str(multiprocessing.cpu_count())]
     AddXvfbEntry("Unit tests",
                  [os.path.join("mojo", "tools", "test_runner.py"),
                   os.path.join("mojo", "tools", "data", "unittests"),
-                  build_dir] + verbose_flags)
+                  build_dir] + jobs_flags + verbose_flags)
 
   # C++ app tests:
   if ShouldRunTest(Config.TEST_TYPE_DEFAULT, "app"):
@@ -6,22 +6,37 @@ import logging
 
 _logging = logging.getLogger()
 
+from mopy import gtest
 from mopy import test_util
 from mopy.print_process_error import print_process_error
 
 
 # TODO(erg): Support android, launched services and fixture isolation.
-def run_test(config, shell, apptest_dict, shell_args, apps_and_args=None):
-  """Runs a command line and checks the output for signs of gtest failure.
+def run_test(config, shell, shell_args, apps_and_args=None, timeout=None):
+  """Runs a command line and checks the output for signs of dart unittest
+  failure. Returns gtest.PASSED, gtest.FAILED or gtest.TIMED_OUT.
 
   Args:
     config: The mopy.config.Config object for the build.
     shell_args: The arguments for mojo_shell.
     apps_and_args: A Dict keyed by application URL associated to the
         application's specific arguments.
+    timeout: The number of seconds after which the test is killed (and times
+        out), if any.
   """
   apps_and_args = apps_and_args or {}
-  output = test_util.try_run_test(config, shell, shell_args, apps_and_args)
+  command_line = test_util.build_command_line(config, shell_args, apps_and_args)
+  _logging.debug("Running command line: %s" % command_line)
+  try:
+    output = test_util.run_test(config, shell, shell_args, apps_and_args,
+                                timeout)
+  except test_util.TestTimeoutError as e:
+    print "Timed out test:"
+    print_process_error(command_line, e)
+    return gtest.TIMED_OUT
+  except Exception as e:
+    print_process_error(command_line, e)
+    output = None
   # Fail on output with dart unittests' "FAIL:"/"ERROR:" or a lack of "PASS:".
   # The latter condition ensures failure on broken command lines or output.
   # Check output instead of exit codes because mojo_shell always exits with 0.
@@ -30,9 +45,7 @@ def run_test(config, shell, apptest_dict, shell_args, apps_and_args=None):
       '\nERROR: ' in output or
       '\nPASS: ' not in output):
     print "Failed test:"
-    print_process_error(
-        test_util.build_command_line(config, shell_args, apps_and_args),
-        output)
-    return "Failed test(s) in %r" % apptest_dict
+    print_process_error(command_line, output)
+    return gtest.FAILED
   _logging.debug("Succeeded with output:\n%s" % output)
-  return "Succeeded"
+  return gtest.PASSED
@@ -0,0 +1,48 @@
+# Copyright 2015 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+import os
+import shutil
+import stat
+import tempfile
+import unittest
+
+from mopy import dart_apptest
+from mopy import gtest
+from mopy import test_util
+from mopy.config import Config
+
+
+class DartApptestTest(unittest.TestCase):
+  """Tests mopy.dart_apptest."""
+
+  def setUp(self):
+    self._temp_dir = tempfile.mkdtemp()
+    self._get_shell_executable = test_util.get_shell_executable
+    self._shell = os.path.join(self._temp_dir, "mojo_shell")
+    test_util.get_shell_executable = lambda config: self._shell
+
+  def tearDown(self):
+    test_util.get_shell_executable = self._get_shell_executable
+    shutil.rmtree(self._temp_dir)
+
+  def _run_test(self, shell_script, timeout=None):
+    """Runs a dart apptest in a fake mojo_shell, the shell script
+    |shell_script|."""
+    with open(self._shell, "w") as f:
+      f.write("#!/bin/sh\n" + shell_script)
+    os.chmod(self._shell, stat.S_IRWXU)
+    return dart_apptest.run_test(Config(target_os=Config.OS_LINUX), None, [],
+                                 {"mojo:dart_apptests": []}, timeout)
+
+  def testRunTest(self):
+    self.assertEqual(self._run_test("echo; echo 'PASS: test'"), gtest.PASSED)
+    self.assertEqual(self._run_test("echo; echo 'FAIL: test'"), gtest.FAILED)
+    self.assertEqual(self._run_test("exit 1"), gtest.FAILED)
+    self.assertEqual(self._run_test("exec sleep 10", timeout=0.1),
+                     gtest.TIMED_OUT)
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -13,6 +13,11 @@ from mopy.print_process_error import print_process_error
 
 _logger = logging.getLogger()
 
+# The results of run_fixture().
+PASSED = "PASS"
+FAILED = "FAIL"
+TIMED_OUT = "TIMEOUT"
+
 
 def set_color():
   """Run gtests with color if we're on a TTY (and we're not being told
@@ -21,37 +26,8 @@ def set_color():
     _logger.debug("Setting GTEST_COLOR=yes")
     os.environ["GTEST_COLOR"] = "yes"
 
-# TODO(vtl): The return value is bizarre. Should just make it either return
-# True/False, or a list of failing fixtures. But the dart_apptest runner would
-# also need to be updated in the same way.
-def run_fixtures(config, shell, apptest_dict, apptest, isolate, test_args,
-                 shell_args):
-  """Run the gtest fixtures in isolation."""
-
-  if not isolate:
-    if not RunApptestInShell(config, shell, apptest, test_args, shell_args):
-      return "Failed test(s) in %r" % apptest_dict
-    return "Succeeded"
-
-  # List the apptest fixtures so they can be run independently for isolation.
-  fixtures = get_fixtures(config, shell, shell_args, apptest)
-
-  if not fixtures:
-    return "Failed with no tests found."
-
-  apptest_result = "Succeeded"
-  for fixture in fixtures:
-    apptest_args = test_args + ["--gtest_filter=%s" % fixture]
-    success = RunApptestInShell(config, shell, apptest, apptest_args,
-                                shell_args)
 
-    if not success:
-      apptest_result = "Failed test(s) in %r" % apptest_dict
-
-  return apptest_result
-
-
-def run_test(config, shell, shell_args, apps_and_args=None):
+def run_test(config, shell, shell_args, apps_and_args=None, timeout=None):
   """Runs a command line and checks the output for signs of gtest failure.
 
   Args:
@@ -59,21 +35,47 @@ def run_test(config, shell, shell_args, apps_and_args=None):
     shell_args: The arguments for mojo_shell.
     apps_and_args: A Dict keyed by application URL associated to the
         application's specific arguments.
+    timeout: The number of seconds after which the test is killed (and fails),
+        if any.
   """
+  return _run_test(config, shell, shell_args, apps_and_args, timeout) == PASSED
+
+
+def _run_test(config, shell, shell_args, apps_and_args, timeout):
+  """Like run_test(), but returns PASSED, FAILED or TIMED_OUT."""
   apps_and_args = apps_and_args or {}
-  output = test_util.try_run_test(config, shell, shell_args, apps_and_args)
+  command_line = test_util.build_command_line(config, shell_args, apps_and_args)
+  _logger.debug("Running command line: %s" % command_line)
+  try:
+    output = test_util.run_test(config, shell, shell_args, apps_and_args,
+                                timeout)
+  except test_util.TestTimeoutError as e:
+    print "Timed out test:"
+    print_process_error(command_line, e)
+    return TIMED_OUT
+  except Exception as e:
+    print_process_error(command_line, e)
+    output = None
   # Fail on output with gtest's "[  FAILED  ]" or a lack of "[  PASSED  ]".
   # The latter condition ensures failure on broken command lines or output.
   # Check output instead of exit codes because mojo_shell always exits with 0.
   if (output is None or
       (output.find("[  FAILED  ]") != -1 or output.find("[  PASSED  ]") == -1)):
     print "Failed test:"
-    print_process_error(
-        test_util.build_command_line(config, shell_args, apps_and_args),
-        output)
-    return False
+    print_process_error(command_line, output)
+    return FAILED
   _logger.debug("Succeeded with output:\n%s" % output)
-  return True
+  return PASSED
+
+
+def run_fixture(config, shell, apptest, fixture, test_args, shell_args,
+                timeout=None):
+  """Runs the gtest |fixture| ("TestSuite.TestFixture", as returned by
+  get_fixtures()) of |apptest| in its own mojo_shell, or all of its fixtures if
+  |fixture| is None. Returns PASSED, FAILED or TIMED_OUT."""
+  if fixture is not None:
+    test_args = test_args + ["--gtest_filter=%s" % fixture]
+  return _run_test(config, shell, shell_args, {apptest: test_args}, timeout)
 
 
 def get_fixtures(config, shell, shell_args, apptest):
@@ -126,7 +128,3 @@ def _gtest_list_tests(gtest_list_tests_output):
     test_list.append(suite + line.strip())
 
   return test_list
-
-
-def RunApptestInShell(config, shell, application, application_args, shell_args):
-  return run_test(config, shell, shell_args, {application: application_args})
@@ -31,6 +31,23 @@ _PRODUCTION_SERVER = "https://chromeperf.appspot.com"
 _TESTING_SERVER = "https://chrome-perf.googleplex.com"
 
 
+def ParsePerfData(perf_data):
+  """Parses perf data (lines in the format "chart_name[/trace_name] value
+  units").
+
+  Returns:
+    A list of tuples (chart name, trace name (or None), value, units).
+  """
+  line_format = re.compile(_PERF_LINE_FORMAT, re.VERBOSE)
+  data_points = []
+  for line in perf_data:
+    match = re.match(line_format, line)
+    assert match, "Unable to parse the following input: %s" % line
+    data_points.append((match.group(1), match.group(3), float(match.group(4)),
+                        match.group(5)))
+  return data_points
+
+
 def UploadPerfData(master_name, perf_id, test_name, builder_name, build_number,
                    revision, perf_data, point_id, dry_run=False,
                    testing_dashboard=True):
@@ -51,20 +68,15 @@ def UploadPerfData(master_name, perf_id, test_name, builder_name, build_number,
       format.
     """
     charts = {}
-    line_format = re.compile(_PERF_LINE_FORMAT, re.VERBOSE)
-    for line in perf_data:
-      match = re.match(line_format, line)
-      assert match, "Unable to parse the following input: %s" % line
-
-      chart_name = match.group(1)
-      trace_name = match.group(3) if match.group(3) else "summary"
+    for chart_name, trace_name, value, units in ParsePerfData(perf_data):
+      trace_name = trace_name if trace_name else "summary"
 
       if chart_name not in charts:
         charts[chart_name] = {}
       charts[chart_name][trace_name] = {
           "type": "scalar",
-          "value": float(match.group(4)),
-          "units": match.group(5)
+          "value": value,
+          "units": units
       }
 
     return {
@@ -0,0 +1,152 @@
+# Copyright 2015 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""A local store of perf test results, and the comparison of the results of two
+revisions in it (see perf_results.py).
+
+The store is an append-only file with a JSON object per line (so that
+concurrent writers don't need to lock it), each holding the values of a metric
+of a test at a revision:
+  {"test": test name, "metric": "chart_name[/trace_name]", "revision": revision,
+   "units": units, "values": [value, ...], "time": seconds since the epoch}
+"""
+
+import json
+import math
+import os
+import time
+
+from mopy import perf_data_uploader
+
+# Metrics in these units get better as they get higher (the others, e.g.
+# times and sizes, as they get lower).
+_HIGHER_IS_BETTER_UNITS = ("fps", "runs/s", "score")
+
+
+class PerfResultsStore(object):
+  """The file a store of perf test results is kept in."""
+
+  def __init__(self, filename):
+    self._filename = filename
+
+  def Add(self, test_name, revision, metric, units, values, timestamp=None):
+    record = {
+        "test": test_name,
+        "metric": metric,
+        "revision": revision,
+        "units": units,
+        "values": list(values),
+        "time": time.time() if timestamp is None else timestamp,
+    }
+    # A single write of a line to a file opened for appending isn't
+    # interleaved with the writes of other processes.
+    fd = os.open(self._filename, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0644)
+    try:
+      os.write(fd, json.dumps(record, sort_keys=True) + "\n")
+    finally:
+      os.close(fd)
+
+  def AddPerfData(self, test_name, revision, perf_data):
+    """Adds the data points of |perf_data| (lines in the format
+    "chart_name[/trace_name] value units")."""
+    for chart_name, trace_name, value, units in \
+        perf_data_uploader.ParsePerfData(perf_data):
+      self.Add(test_name, revision, _MetricName(chart_name, trace_name), units,
+               [value])
+
+  def Read(self):
+    """Returns the values in the store, as a dictionary mapping (test name,
+    metric name) to a tuple (units, dictionary mapping revisions to the list of
+    their values)."""
+    results = {}
+    if not os.path.exists(self._filename):
+      return results
+    with open(self._filename, "r") as f:
+      for line in f:
+        try:
+          record = json.loads(line)
+        except ValueError:
+          # A line cut short by a writer that was killed.
+          continue
+        units, values = results.setdefault(
+            (record["test"], record["metric"]), (record["units"], {}))
+        values.setdefault(record["revision"], []).extend(record["values"])
+    return results
+
+
+def _MetricName(chart_name, trace_name):
+  return chart_name + "/" + trace_name if trace_name else chart_name
+
+
+def _Median(values):
+  values = sorted(values)
+  middle = len(values) / 2
+  if len(values) % 2:
+    return values[middle]
+  return (values[middle - 1] + values[middle]) / 2.0
+
+
+def MannWhitneyU(a, b):
+  """Returns the two-sided p-value of the Mann-Whitney U test of whether the
+  values of |a| and |b| come from the same distribution (using the normal
+  approximation, with corrections for ties and continuity)."""
+  n1 = len(a)
+  n2 = len(b)
+  if not n1 or not n2:
+    return 1.0
+  combined = sorted([(value, 0) for value in a] + [(value, 1) for value in b])
+  n = n1 + n2
+
+  # Ranks, from 1, with tied values getting the average of their ranks.
+  rank_sum = 0.0
+  ties = 0.0
+  i = 0
+  while i < n:
+    j = i
+    while j < n and combined[j][0] == combined[i][0]:
+      j += 1
+    count = j - i
+    rank = (i + 1 + j) / 2.0
+    rank_sum += rank * sum(1 for k in xrange(i, j) if combined[k][1] == 0)
+    ties += count ** 3 - count
+    i = j
+
+  u = rank_sum - n1 * (n1 + 1) / 2.0
+  mean = n1 * n2 / 2.0
+  variance = n1 * n2 / 12.0 * ((n + 1) - ties / (n * (n - 1)))
+  if variance <= 0:
+    return 1.0
+  z = max(abs(u - mean) - 0.5, 0) / math.sqrt(variance)
+  return math.erfc(z / math.sqrt(2))
+
+
+def Compare(results, base_revision, revision, significance=0.05):
+  """Compares the values of the metrics of |revision| to those of
+  |base_revision| in |results| (as returned by PerfResultsStore.Read()).
+  Returns a list of dictionaries (sorted by test and metric names), one for each
+  metric with values at both revisions."""
+  comparisons = []
+  for (test_name, metric), (units, values) in sorted(results.iteritems()):
+    base_values = values.get(base_revision)
+    new_values = values.get(revision)
+    if not base_values or not new_values:
+      continue
+    base_median = _Median(base_values)
+    new_median = _Median(new_values)
+    p_value = MannWhitneyU(base_values, new_values)
+    higher_is_better = units in _HIGHER_IS_BETTER_UNITS
+    changed = p_value < significance and new_median != base_median
+    comparisons.append({
+        "test": test_name,
+        "metric": metric,
+        "units": units,
+        "base_median": base_median,
+        "median": new_median,
+        "change": (float(new_median - base_median) / abs(base_median)
+                   if base_median else None),
+        "p_value": p_value,
+        "regressed": changed and (new_median < base_median) == higher_is_better,
+        "improved": changed and (new_median > base_median) == higher_is_better,
+    })
+  return comparisons
@@ -0,0 +1,60 @@
+# Copyright 2015 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from mopy.perf_results_store import Compare, MannWhitneyU, PerfResultsStore
+
+
+class PerfResultsStoreTest(unittest.TestCase):
+  """Tests mopy.perf_results_store."""
+
+  def setUp(self):
+    self._temp_dir = tempfile.mkdtemp()
+    self._store = PerfResultsStore(os.path.join(self._temp_dir, "store.jsonl"))
+
+  def tearDown(self):
+    shutil.rmtree(self._temp_dir)
+
+  def testAddAndRead(self):
+    self.assertEqual(self._store.Read(), {})
+    self._store.AddPerfData("test", "rev1", ["startup 10 ms\n",
+                                             "memory/heap 1024 bytes\n"])
+    self._store.AddPerfData("test", "rev1", ["startup 12 ms\n"])
+    self._store.Add("test", "rev2", "startup", "ms", [11, 13])
+    self.assertEqual(self._store.Read(), {
+        ("test", "startup"): ("ms", {"rev1": [10, 12], "rev2": [11, 13]}),
+        ("test", "memory/heap"): ("bytes", {"rev1": [1024]}),
+    })
+
+  def testMannWhitneyU(self):
+    self.assertEqual(MannWhitneyU([], [1]), 1.0)
+    self.assertEqual(MannWhitneyU([1, 1, 1], [1, 1, 1]), 1.0)
+    self.assertGreater(MannWhitneyU([1, 3, 5, 7], [2, 4, 6, 8]), 0.5)
+    self.assertLess(MannWhitneyU(range(10), range(10, 20)), 0.001)
+
+  def testCompare(self):
+    base = [100, 102, 98, 101, 99, 100, 103, 97]
+    slower = [value + 10 for value in base]
+    for revision, times, runs in (("base", base, base),
+                                  ("new", slower, slower)):
+      self._store.Add("test", revision, "time", "ms", times)
+      self._store.Add("test", revision, "runs", "runs/s", runs)
+      self._store.Add("test", revision, "size", "bytes", base)
+    self._store.Add("test", "base", "other", "ms", base)
+
+    comparisons = Compare(self._store.Read(), "base", "new")
+    self.assertEqual([(c["metric"], c["regressed"], c["improved"])
+                      for c in comparisons],
+                     [("runs", False, True),
+                      ("size", False, False),
+                      ("time", True, False)])
+    self.assertAlmostEqual(comparisons[2]["change"], 0.1)
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -4,7 +4,9 @@
 
 import logging
 import os
+import signal
 import subprocess
+import threading
 import time
 
 from mopy.config import Config
@@ -15,6 +17,14 @@ from mopy.print_process_error import print_process_error
 _logger = logging.getLogger()
 
 
+class TestTimeoutError(Exception):
+  """Raised by run_test() when the test doesn't complete in time."""
+
+  def __init__(self, timeout, output):
+    Exception.__init__(self, "Timed out after %s seconds" % timeout)
+    self.output = "%s\n%s" % (output, self)
+
+
 def build_shell_arguments(shell_args, apps_and_args=None):
   """Build the list of arguments for the shell. |shell_args| are the base
   arguments, |apps_and_args| is a dictionary that associates each application to
@@ -65,8 +75,45 @@ def run_test_android(shell, shell_args, apps_and_args):
       return rv
 
 
-def run_test(config, shell, shell_args, apps_and_args):
-  """Run the given test."""
+def _check_output_with_timeout(command, timeout):
+  """Like subprocess.check_output(), but kills the process and its children
+  (and raises a TestTimeoutError) if it doesn't complete in |timeout| seconds."""
+  # The process gets its own process group, so that its children (e.g. those of
+  # a multiprocess mojo_shell), which may hold its output open, are killed too.
+  process = subprocess.Popen(command, stdout=subprocess.PIPE,
+                             stderr=subprocess.STDOUT, preexec_fn=os.setsid)
+  lock = threading.Lock()
+  killed = threading.Event()
+  def kill():
+    with lock:
+      if process.returncode is None:
+        try:
+          os.killpg(process.pid, signal.SIGKILL)
+          killed.set()
+        except OSError:
+          # They all just completed.
+          pass
+  timer = threading.Timer(timeout, kill)
+  timer.start()
+  try:
+    output = process.communicate()[0]
+  finally:
+    # Once this returns, kill() is neither running nor will it run.
+    with lock:
+      timer.cancel()
+  # The process may have completed just as it was killed: it only timed out if
+  # it was our signal that ended it.
+  if killed.is_set() and process.returncode == -signal.SIGKILL:
+    raise TestTimeoutError(timeout, output)
+  if process.returncode:
+    raise subprocess.CalledProcessError(process.returncode, command, output)
+  return output
+
+
+def run_test(config, shell, shell_args, apps_and_args, timeout=None):
+  """Run the given test. If |timeout| (in seconds) is given, the test is killed
+  (and a TestTimeoutError raised) if it doesn't complete in time (this isn't
+  supported on Android)."""
   if (config.target_os == Config.OS_ANDROID):
     return run_test_android(shell, shell_args, apps_and_args)
 
@@ -74,7 +121,10 @@ def run_test(config, shell, shell_args, apps_and_args):
   command = ([executable] + build_shell_arguments(shell_args, apps_and_args))
   _logger.debug("Starting: %s" % " ".join(command))
   start_time = time.time()
-  rv = subprocess.check_output(command, stderr=subprocess.STDOUT)
+  if timeout is None:
+    rv = subprocess.check_output(command, stderr=subprocess.STDOUT)
+  else:
+    rv = _check_output_with_timeout(command, timeout)
   run_time = time.time() - start_time
   _logger.debug("Completed: %s" % " ".join(command))
   # Only log if it took more than 1 second.
@@ -0,0 +1,37 @@
+# Copyright 2015 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+import subprocess
+import time
+import unittest
+
+from mopy import test_util
+
+
+class TestUtilTest(unittest.TestCase):
+  """Tests mopy.test_util."""
+
+  def testCheckOutputWithTimeout(self):
+    self.assertEqual(
+        test_util._check_output_with_timeout(["echo", "output"], 10),
+        "output\n")
+    with self.assertRaises(subprocess.CalledProcessError):
+      test_util._check_output_with_timeout(["false"], 10)
+
+    # The children of the process, which keep its output open, are killed too.
+    start_time = time.time()
+    with self.assertRaises(test_util.TestTimeoutError) as context:
+      test_util._check_output_with_timeout(
+          ["sh", "-c", "echo output; sleep 10; echo done"], 0.1)
+    self.assertLess(time.time() - start_time, 5)
+    self.assertEqual(context.exception.output,
+                     "output\n\nTimed out after 0.1 seconds")
+
+    # A process killed by something else didn't time out.
+    with self.assertRaises(subprocess.CalledProcessError):
+      test_util._check_output_with_timeout(["sh", "-c", "kill -9 $$"], 10)
+
+
+if __name__ == "__main__":
+  unittest.main()
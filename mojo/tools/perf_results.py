@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+# Copyright 2015 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""A tool that adds perf test results to a local store of results, and
+compares the results of two revisions in it (e.g., to tell whether a change
+regressed).
+"""
+
+import argparse
+import sys
+
+from mopy.perf_results_store import Compare, PerfResultsStore
+
+
+def _FormatComparison(comparison):
+  if comparison["regressed"]:
+    status = "REGRESSED"
+  elif comparison["improved"]:
+    status = "IMPROVED"
+  else:
+    status = "unchanged"
+  change = comparison["change"]
+  return "%-9s %s: %s: %g -> %g %s (%s, p=%.3g)" % (
+      status, comparison["test"], comparison["metric"],
+      comparison["base_median"], comparison["median"], comparison["units"],
+      "%+.1f%%" % (change * 100) if change is not None else "n/a",
+      comparison["p_value"])
+
+
+def main():
+  parser = argparse.ArgumentParser(
+      description="A tool that keeps perf test results locally, and compares "
+                  "the results of two revisions.")
+  parser.add_argument(
+      "--store", required=True, metavar="perf_results.jsonl",
+      help="The file the results are stored in.")
+  subparsers = parser.add_subparsers(dest="command")
+
+  add_parser = subparsers.add_parser(
+      "add", help="Add the data points of a perf test run to the store.")
+  add_parser.add_argument(
+      "--test-name", required=True,
+      help="Name of the test that the perf data was generated from.")
+  add_parser.add_argument(
+      "--revision", required=True, help="The revision that was tested.")
+  add_parser.add_argument(
+      "--perf-data", required=True, metavar="foo_perf.log",
+      type=argparse.FileType("r"),
+      help="A text file containing the perf data. Each line is a data point in "
+           "the following format: chart_name[/trace_name] value units")
+
+  compare_parser = subparsers.add_parser(
+      "compare", help="Compare the results of two revisions (using the "
+                      "Mann-Whitney U test), and fail if any regressed.")
+  compare_parser.add_argument("base_revision")
+  compare_parser.add_argument("revision")
+  compare_parser.add_argument(
+      "--significance", type=float, default=0.05,
+      help="The p-value under which a change is significant (default: "
+           "%(default)s).")
+  compare_parser.add_argument(
+      "--all", action="store_true",
+      help="Also list the metrics that didn't change significantly.")
+  args = parser.parse_args()
+
+  store = PerfResultsStore(args.store)
+  if args.command == "add":
+    store.AddPerfData(args.test_name, args.revision, args.perf_data)
+    return 0
+
+  comparisons = Compare(store.Read(), args.base_revision, args.revision,
+                        args.significance)
+  if not comparisons:
+    print "No metrics have results for both %s and %s." % (
+        args.base_revision, args.revision)
+    return 0
+  for comparison in comparisons:
+    if args.all or comparison["regressed"] or comparison["improved"]:
+      print _FormatComparison(comparison)
+  regressions = sum(1 for c in comparisons if c["regressed"])
+  print "%d of %d metrics regressed." % (regressions, len(comparisons))
+  return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+  sys.exit(main())
@@ -4,11 +4,13 @@
 # found in the LICENSE file.
 
 """A tool that runs a perf test and uploads the resulting data to the
-performance dashboard.
+performance dashboard (and/or adds it to a local store of results, see
+perf_results.py).
 """
 
 import argparse
 from mopy import perf_data_uploader
+from mopy.perf_results_store import PerfResultsStore
 from mopy.version import Version
 import subprocess
 import sys
@@ -46,6 +48,10 @@ def main():
   parser.add_argument(
       "--perf-data-path",
       help="The path to the perf data that the perf test generates.")
+  parser.add_argument(
+      "--results-store", metavar="perf_results.jsonl",
+      help="Also add the perf data to this local store of results (requires "
+           "test-name and perf-data-path).")
   server_group = parser.add_mutually_exclusive_group()
   server_group.add_argument(
       "--testing-dashboard", action="store_true", default=True,
@@ -58,6 +64,15 @@ def main():
 
   subprocess.check_call(args.command)
 
+  if args.results_store:
+    if args.test_name is None or args.perf_data_path is None:
+      print "Won't add perf data to the results store because test-name and " \
+            "perf-data-path aren't both specified."
+    else:
+      with open(args.perf_data_path, "r") as perf_data:
+        PerfResultsStore(args.results_store).AddPerfData(
+            args.test_name, Version().version, perf_data)
+
   if args.master_name is None or \
      args.perf_id is None or \
      args.test_name is None or \
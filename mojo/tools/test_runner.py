@@ -7,10 +7,16 @@
 
 import argparse
 import logging
+import multiprocessing
 import os
 import subprocess
 import sys
 
+try:
+  import fcntl
+except ImportError:
+  fcntl = None
+
 from mopy import gtest
 from mopy.config import Config
 from mopy.gn import ConfigForGNArgs, ParseGNConfig
@@ -22,6 +28,140 @@ from mopy.transitive_hash import file_hash, transitive_hash
 _logger = logging.getLogger()
 _paths = Paths()
 
+# Test results.
+_SUCCEEDED = "succeeded"
+_SKIPPED = "skipped"
+_FAILED = "failed"
+_FAILED_TO_START = "failed to start"
+_FAILED_TO_HASH = "failed to hash"
+
+# The state of the processes running tests (see _init_worker()).
+_worker_state = {}
+
+
+class _SuccessesCache(object):
+  """The file caching the transitive hashes of the tests that succeeded. It can
+  be shared by concurrently running test runners (e.g., for different shards):
+  each success is appended with a single (locked, if possible) write."""
+
+  def __init__(self, filename):
+    self._filename = filename
+    self._file = None
+
+  def read(self):
+    """Returns the set of hashes of the tests that succeeded."""
+    try:
+      _logger.debug("Trying to read successes cache file: %s", self._filename)
+      with open(self._filename, 'rb') as f:
+        successes = set([x.strip() for x in f.readlines()])
+      _logger.debug("Successes: %s", successes)
+    except IOError:
+      # Just assume that it didn't exist, or whatever.
+      print ("Failed to read successes cache file %s (will create)" %
+             self._filename)
+      successes = set()
+    return successes
+
+  def add(self, gtest_hash):
+    if not self._file:
+      self._file = open(self._filename, "ab")
+    if fcntl:
+      fcntl.flock(self._file, fcntl.LOCK_EX)
+    try:
+      os.write(self._file.fileno(), gtest_hash + "\n")
+    finally:
+      if fcntl:
+        fcntl.flock(self._file, fcntl.LOCK_UN)
+
+  def close(self):
+    if self._file:
+      self._file.close()
+      self._file = None
+
+
+def _init_worker(target_os, root_dir, successes):
+  """Initializes the state needed by _run_test() (in each process of the
+  pool)."""
+  _worker_state["target_os"] = target_os
+  _worker_state["root_dir"] = root_dir
+  _worker_state["successes"] = successes
+
+
+def _run_test(test_dict):
+  """Runs the given test, unless it previously succeeded. Returns a tuple
+  (test name, result, transitive hash of the test (if it is cacheable),
+  output (if it failed))."""
+  target_os = _worker_state["target_os"]
+  successes = _worker_state["successes"]
+
+  test = test_dict["test"]
+  test_name = test_dict.get("name", test)
+  # TODO(vtl): Add type.
+  cacheable = test_dict.get("cacheable", True)
+  if not cacheable:
+    _logger.debug("%s is marked as non-cacheable" % test_name)
+
+  gtest_file = test
+  if target_os == Config.OS_ANDROID:
+    gtest_file = test + "_apk/" + test + "-debug.apk"
+
+  gtest_hash = None
+  if successes is not None and cacheable:
+    _logger.debug("Getting transitive hash for %s ... " % test_name)
+    try:
+      if target_os == Config.OS_ANDROID:
+        gtest_hash = file_hash(gtest_file)
+      else:
+        gtest_hash = transitive_hash(gtest_file)
+    except subprocess.CalledProcessError:
+      return (test_name, _FAILED_TO_HASH, None, None)
+    _logger.debug("  Transitive hash: %s" % gtest_hash)
+
+    if gtest_hash in successes:
+      return (test_name, _SKIPPED, gtest_hash, None)
+
+  _logger.info("Will start: %s" % test_name)
+  try:
+    if target_os == Config.OS_ANDROID:
+      command = [
+          "python",
+          os.path.join(_paths.src_root, "build", "android", "test_runner.py"),
+          "gtest",
+          "--output-directory",
+          _worker_state["root_dir"],
+          "-s",
+          test,
+      ]
+    else:
+      command = ["./" + test]
+    _logger.debug("Command: %s" % command)
+    subprocess.check_output(command, stderr=subprocess.STDOUT)
+  except subprocess.CalledProcessError as e:
+    return (test_name, _FAILED, gtest_hash,
+            (e.returncode, e.output))
+  except OSError:
+    return (test_name, _FAILED_TO_START, gtest_hash, None)
+  _logger.info("Completed: %s" % test_name)
+  return (test_name, _SUCCEEDED, gtest_hash, None)
+
+
+def _run_tests(test_list, jobs, worker_args):
+  """Runs the tests, |jobs| at a time, yielding their results as they
+  complete."""
+  if jobs == 1:
+    _init_worker(*worker_args)
+    for test_dict in test_list:
+      yield _run_test(test_dict)
+    return
+
+  pool = multiprocessing.Pool(jobs, _init_worker, worker_args)
+  try:
+    for result in pool.imap_unordered(_run_test, test_list):
+      yield result
+  finally:
+    pool.terminate()
+    pool.join()
+
 
 def main():
   parser = argparse.ArgumentParser(
@@ -33,10 +173,21 @@ def main():
   parser.add_argument("--successes-cache",
                       help="the file caching test results (empty to not cache)",
                       default="mojob_test_successes")
+  parser.add_argument("-j", "--jobs", type=int, default=1,
+                      help="the number of tests to run concurrently "
+                           "(not supported for Android)")
+  parser.add_argument("--shard-index", type=int, default=0,
+                      help="the index of the shard of the tests to run")
+  parser.add_argument("--total-shards", type=int, default=1,
+                      help="the number of shards the tests are split into")
   parser.add_argument("test_list_file",
                       help="the file containing the tests to run", type=file)
   parser.add_argument("root_dir", help="the build directory")
   args = parser.parse_args()
+  if args.jobs < 1:
+    parser.error("--jobs must be positive")
+  if not 0 <= args.shard_index < args.total_shards:
+    parser.error("--shard-index must be in [0, --total-shards)")
 
   InitLogging(args.verbose_count)
   config = ConfigForGNArgs(ParseGNConfig(args.root_dir))
@@ -47,6 +198,18 @@ def main():
   test_list = execution_globals["tests"]
   _logger.debug("Test list: %s" % test_list)
 
+  # Every shard gets every |total_shards|-th test of the list.
+  test_list = test_list[args.shard_index::args.total_shards]
+  if args.total_shards > 1:
+    print "Running shard %d of %d (%d tests)" % (
+        args.shard_index, args.total_shards, len(test_list))
+
+  jobs = args.jobs
+  if config.target_os == Config.OS_ANDROID and jobs > 1:
+    # The tests would compete for the device.
+    print "Running tests serially on Android (ignoring --jobs)"
+    jobs = 1
+
   print "Running tests in directory: %s" % args.root_dir
   os.chdir(args.root_dir)
 
@@ -55,95 +218,47 @@ def main():
   else:
     print "No successes cache file (will run all tests unconditionally)"
 
+  successes_cache = None
+  successes = None
   if args.successes_cache:
     # This file simply contains a list of transitive hashes of tests that
     # succeeded.
-    try:
-      _logger.debug("Trying to read successes cache file: %s",
-                     args.successes_cache)
-      with open(args.successes_cache, 'rb') as f:
-        successes = set([x.strip() for x in f.readlines()])
-      _logger.debug("Successes: %s", successes)
-    except IOError:
-      # Just assume that it didn't exist, or whatever.
-      print ("Failed to read successes cache file %s (will create)" %
-             args.successes_cache)
-      successes = set()
+    successes_cache = _SuccessesCache(args.successes_cache)
+    successes = successes_cache.read()
 
   gtest.set_color()
 
   exit_code = 0
-  successes_cache_file = (open(args.successes_cache, "ab")
-      if args.successes_cache else None)
-  for test_dict in test_list:
-    test = test_dict["test"]
-    test_name = test_dict.get("name", test)
-    # TODO(vtl): Add type.
-    cacheable = test_dict.get("cacheable", True)
-    if not cacheable:
-      _logger.debug("%s is marked as non-cacheable" % test_name)
-
-    gtest_file = test
-    if config.target_os == Config.OS_ANDROID:
-      gtest_file = test + "_apk/" + test + "-debug.apk"
-
-    if successes_cache_file and cacheable:
-      _logger.debug("Getting transitive hash for %s ... " % test_name)
-      try:
-        if config.target_os == Config.OS_ANDROID:
-          gtest_hash = file_hash(gtest_file)
-        else:
-          gtest_hash = transitive_hash(gtest_file)
-      except subprocess.CalledProcessError:
-        print "Failed to get transitive hash for %s" % test_name
-        exit_code = 1
-        continue
-      _logger.debug("  Transitive hash: %s" % gtest_hash)
-
-      if gtest_hash in successes:
+  try:
+    for (test_name, result, gtest_hash, failure) in _run_tests(
+        test_list, jobs, (config.target_os, args.root_dir, successes)):
+      if result == _SKIPPED:
         print "Skipping %s (previously succeeded)" % test_name
-        continue
-
-    _logger.info("Will start: %s" % test_name)
-    print "Running %s...." % test_name,
-    sys.stdout.flush()
-    try:
-      if config.target_os == Config.OS_ANDROID:
-        command = [
-            "python",
-            os.path.join(_paths.src_root, "build", "android", "test_runner.py"),
-            "gtest",
-            "--output-directory",
-            args.root_dir,
-            "-s",
-            test,
-        ]
+      elif result == _SUCCEEDED:
+        print "Running %s.... Succeeded" % test_name
+        # Record success.
+        if gtest_hash:
+          successes_cache.add(gtest_hash)
+      elif result == _FAILED:
+        print "Running %s.... Failed with exit code %d and output:" % (
+            test_name, failure[0])
+        print 72 * "-"
+        print failure[1]
+        print 72 * "-"
+        exit_code = 1
+      elif result == _FAILED_TO_START:
+        print "Running %s.... Failed to start test" % test_name
+        exit_code = 1
       else:
-        command = ["./" + test]
-      _logger.debug("Command: %s" % command)
-      subprocess.check_output(command, stderr=subprocess.STDOUT)
-      print "Succeeded"
-      # Record success.
-      if args.successes_cache and cacheable:
-        successes.add(gtest_hash)
-        successes_cache_file.write(gtest_hash + "\n")
-        successes_cache_file.flush()
-    except subprocess.CalledProcessError as e:
-      print "Failed with exit code %d and output:" % e.returncode
-      print 72 * "-"
-      print e.output
-      print 72 * "-"
-      exit_code = 1
-      continue
-    except OSError as e:
-      print "  Failed to start test"
-      exit_code = 1
-      continue
-    _logger.info("Completed: %s" % test_name)
+        assert result == _FAILED_TO_HASH
+        print "Failed to get transitive hash for %s" % test_name
+        exit_code = 1
+      sys.stdout.flush()
+  finally:
+    if successes_cache:
+      successes_cache.close()
   if exit_code == 0:
     print "All tests succeeded"
-  if successes_cache_file:
-    successes_cache_file.close()
 
   return exit_code
 
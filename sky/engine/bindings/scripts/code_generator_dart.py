@@ -106,6 +106,11 @@ class CodeGeneratorDart(object):
             (interface_name, interface_info['component_dir'])
             for interface_name, interface_info in interfaces_info.iteritems()))
 
+    def load_templates(self):
+        """Compiles all the templates (which are otherwise compiled as they
+        are first used)."""
+        load_templates(self.jinja_env)
+
     def generate_code(self, definitions, interface_name, idl_pickle_filename,
                       only_if_changed):
         """Returns .h/.cpp/.dart code as (header_text, cpp_text, dart_text)."""
@@ -114,10 +119,14 @@ class CodeGeneratorDart(object):
         except KeyError:
             raise Exception('%s not in IDL definitions' % interface_name)
 
-        # Store other interfaces for introspection
+        # Store other interfaces for introspection (replacing those of the
+        # previous file compiled by this process, if any)
+        interfaces.clear()
         interfaces.update(definitions.interfaces)
 
-        # Set local type info
+        # Set local type info (likewise)
+        IdlType.callback_functions.clear()
+        IdlType.enums.clear()
         IdlType.set_callback_functions(definitions.callback_functions.keys())
         IdlType.set_enums((enum.name, enum.values)
                           for enum in definitions.enumerations.values())
@@ -250,6 +259,14 @@ def initialize_jinja_env(cache_dir):
     return jinja_env
 
 
+def load_templates(jinja_env):
+    template_filenames = [filename for filename in os.listdir(templates_dir)
+                          # Skip .svn, directories, etc.
+                          if filename.endswith(('.cpp', '.h', '.template'))]
+    for template_filename in template_filenames:
+        jinja_env.get_template(template_filename)
+
+
 ################################################################################
 
 def main(argv):
@@ -262,12 +279,7 @@ def main(argv):
         return 1
 
     # Cache templates
-    jinja_env = initialize_jinja_env(cache_dir)
-    template_filenames = [filename for filename in os.listdir(templates_dir)
-                          # Skip .svn, directories, etc.
-                          if filename.endswith(('.cpp', '.h', '.template'))]
-    for template_filename in template_filenames:
-        jinja_env.get_template(template_filename)
+    load_templates(initialize_jinja_env(cache_dir))
 
     # Create a dummy file as output for the build system,
     # since filenames of individual cache files are unpredictable and opaque
@@ -27,24 +27,43 @@
 # (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
 # OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
-"""Compile an .idl file to Dart bindings (.h and .cpp files).
+"""Compile .idl files to Dart bindings (.h and .cpp files).
 
 Design doc: ??????
 """
 
+import cPickle as pickle
+import hashlib
+import multiprocessing
 from optparse import OptionParser
 import os
 import sys
+import traceback
 
 from dart_compiler import IdlCompiler
-from code_generator_dart import CodeGeneratorDart
+from code_generator_dart import CodeGeneratorDart, templates_dir
+from idl_validator import EXTENDED_ATTRIBUTES_FILENAME
+from utilities import get_file_contents, read_file_to_list, write_file
+
+module_path = os.path.dirname(os.path.realpath(__file__))
+source_root = os.path.normpath(os.path.join(module_path, os.pardir, os.pardir,
+                                            os.pardir, os.pardir))
 
 
 def parse_options():
     parser = OptionParser()
     parser.add_option('--output-directory')
     parser.add_option('--interfaces-info-file')
+    parser.add_option('--interfaces-info-digests-file',
+                      help='pickle file of the digests of the interfaces info '
+                           'each interface depends on (if given, an IDL file '
+                           'is only compiled if what it depends on changed)')
     parser.add_option('--write-file-only-if-changed', type='int', default='1')
+    parser.add_option('--idl-files-list',
+                      help='file listing IDL files to compile (in a batch)')
+    # A few processes only: ninja runs other actions alongside this one.
+    parser.add_option('-j', '--jobs', type='int', default=2,
+                      help='number of IDL files of a batch compiled at a time')
     parser.add_option('--generate-dart-blink',
                       action='append',
                       type='string',
@@ -66,12 +85,17 @@ def parse_options():
     if options.output_directory is None:
         parser.error('Must specify output directory using --output-directory.')
     options.write_file_only_if_changed = bool(options.write_file_only_if_changed)
+    if options.jobs < 1:
+        parser.error('--jobs must be positive.')
     if bool(options.global_entries) or bool(options.blink_global_entries):
         return options, None
-    if len(args) != 1:
-        parser.error('Must specify exactly 1 input file as argument, but %d given.' % len(args))
-    filename = os.path.realpath(args[0])
-    return options, filename
+    filenames = [os.path.realpath(filename) for filename in args]
+    if options.idl_files_list:
+        filenames.extend(os.path.realpath(filename) for filename in
+                         read_file_to_list(options.idl_files_list))
+    if not filenames:
+        parser.error('Must specify input files as arguments or using --idl-files-list.')
+    return options, filenames
 
 
 def idl_filename_to_interface_name(idl_filename):
@@ -80,8 +104,32 @@ def idl_filename_to_interface_name(idl_filename):
     return interface_name
 
 
+def compute_code_digest():
+    """Returns a digest of the code generating the bindings: the modules
+    loaded from the source tree, the templates and the extended attributes."""
+    filenames = set([EXTENDED_ATTRIBUTES_FILENAME])
+    for module in sys.modules.values():
+        filename = getattr(module, '__file__', None)
+        if not filename:
+            continue
+        filename = os.path.realpath(filename)
+        if filename.endswith(('.pyc', '.pyo')):
+            filename = filename[:-1]
+        if filename.startswith(source_root + os.sep) and os.path.isfile(filename):
+            filenames.add(filename)
+    filenames.update(os.path.join(templates_dir, filename)
+                     for filename in os.listdir(templates_dir))
+    md5 = hashlib.md5()
+    for filename in sorted(filenames):
+        md5.update(filename)
+        md5.update(get_file_contents(filename))
+    return md5.hexdigest()
+
+
 class IdlCompilerDart(IdlCompiler):
     def __init__(self, *args, **kwargs):
+        interfaces_info_digests_filename = kwargs.pop(
+            'interfaces_info_digests_filename', None)
         IdlCompiler.__init__(self, *args, **kwargs)
 
         interfaces_info = self.interfaces_info
@@ -89,6 +137,35 @@ class IdlCompilerDart(IdlCompiler):
 
         self.code_generator = CodeGeneratorDart(interfaces_info, self.output_directory)
 
+        self.interfaces_info_digests = None
+        if interfaces_info_digests_filename:
+            with open(interfaces_info_digests_filename) as digests_file:
+                self.interfaces_info_digests = pickle.load(digests_file)
+            self.code_digest = compute_code_digest()
+
+    def inputs_digest(self, idl_filename):
+        """Returns a digest of what compiling |idl_filename| depends on, or None
+        if it isn't known (without the digests of the interfaces info)."""
+        interface_name = idl_filename_to_interface_name(idl_filename)
+        if (self.interfaces_info_digests is None or
+            interface_name not in self.interfaces_info_digests):
+            return None
+        md5 = hashlib.md5(self.code_digest)
+        md5.update(self.interfaces_info_digests[interface_name])
+        # The partial interfaces and implemented interfaces are merged in, and
+        # the definitions of the referenced interfaces are read too (as
+        # InterfaceDependencyResolver does).
+        interface_info = self.interfaces_info[interface_name]
+        dependencies = set(interface_info['dependencies_full_paths'])
+        dependencies.update(
+            self.interfaces_info[referenced_interface_name]['full_path']
+            for referenced_interface_name in interface_info['referenced_interfaces'])
+        dependencies.discard(idl_filename)
+        for filename in [idl_filename] + sorted(dependencies):
+            md5.update(filename)
+            md5.update(get_file_contents(filename))
+        return md5.hexdigest()
+
     def compile_file(self, idl_filename):
         interface_name = idl_filename_to_interface_name(idl_filename)
         header_filename = os.path.join(self.output_directory,
@@ -98,7 +175,52 @@ class IdlCompilerDart(IdlCompiler):
         dart_filename = os.path.join(self.output_directory,
                                        '%s.dart' % interface_name)
         output_paths = (header_filename, cpp_filename, dart_filename)
+
+        # Skip the file if nothing it depends on changed since it was last
+        # compiled (as recorded in the digest file, written after the outputs).
+        inputs_digest = self.inputs_digest(idl_filename)
+        digest_filename = os.path.join(self.output_directory,
+                                       '%s_inputs.md5' % interface_name)
+        globals_filename = os.path.join(self.output_directory,
+                                        '%s_globals.pickle' % interface_name)
+        if (inputs_digest and
+            all(os.path.isfile(filename)
+                for filename in output_paths + (globals_filename,)) and
+            os.path.isfile(digest_filename) and
+            get_file_contents(digest_filename) == inputs_digest):
+            return
+
+        if os.path.isfile(digest_filename):
+            # Stale, even if compiling fails.
+            os.remove(digest_filename)
         self.compile_and_write(idl_filename, output_paths)
+        if inputs_digest:
+            write_file(inputs_digest, digest_filename, self.only_if_changed)
+
+    def compile_files(self, idl_filenames, jobs):
+        """Compiles a batch of files (those that changed, if known), |jobs| at a
+        time, returning whether they all compiled.
+
+        The interfaces info, the parser tables and the templates are loaded
+        once, by this process, and shared with the processes compiling the
+        files (which are forked from it).
+        """
+        global _idl_compiler
+        _idl_compiler = self
+        if jobs == 1:
+            errors = map(_compile_file, idl_filenames)
+        else:
+            self.code_generator.load_templates()
+            pool = multiprocessing.Pool(jobs)
+            try:
+                errors = pool.map(_compile_file, idl_filenames, chunksize=1)
+            finally:
+                pool.terminate()
+                pool.join()
+        for error in errors:
+            if error:
+                sys.stderr.write(error)
+        return not any(errors)
 
     def generate_global(self, global_entries):
         expanded_global_entries = []
@@ -125,17 +247,35 @@ class IdlCompilerDart(IdlCompiler):
                                            global_dart_blink_filename)
 
 
+# The compiler that compile_files() shares with the processes of its pool.
+_idl_compiler = None
+
+
+def _compile_file(idl_filename):
+    """Compiles |idl_filename| with _idl_compiler, returning the error (if
+    any)."""
+    try:
+        _idl_compiler.compile_file(idl_filename)
+    except Exception:
+        return 'Compiling %s failed:\n%s' % (idl_filename,
+                                            traceback.format_exc())
+    return None
+
+
 def main():
-    options, filename = parse_options()
+    options, filenames = parse_options()
     idl_compiler = IdlCompilerDart(options.output_directory,
                                    interfaces_info_filename=options.interfaces_info_file,
+                                   interfaces_info_digests_filename=options.interfaces_info_digests_file,
                                    only_if_changed=options.write_file_only_if_changed)
     if bool(options.global_entries):
         idl_compiler.generate_global(options.global_entries)
     elif bool(options.blink_global_entries):
         idl_compiler.generate_dart_blink(options.blink_global_entries)
-    else:
-        idl_compiler.compile_file(filename)
+    elif len(filenames) == 1:
+        idl_compiler.compile_file(filenames[0])
+    elif not idl_compiler.compile_files(filenames, options.jobs):
+        return 1
 
 
 if __name__ == '__main__':
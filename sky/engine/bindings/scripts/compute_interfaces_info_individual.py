@@ -47,7 +47,7 @@ import os
 import posixpath
 import sys
 
-from utilities import get_file_contents, read_file_to_list, idl_filename_to_interface_name, write_pickle_file, get_interface_extended_attributes_from_idl, is_callback_interface_from_idl, get_partial_interface_name_from_idl, get_implements_from_idl, get_parent_interface, get_put_forward_interfaces_from_idl
+from utilities import get_file_contents, read_file_to_list, idl_filename_to_interface_name, write_pickle_file, get_interface_extended_attributes_from_idl, is_callback_interface_from_idl, get_partial_interface_name_from_idl, get_implements_from_idl, get_parent_interface, get_put_forward_interfaces_from_idl, get_referenced_types_from_idl
 
 module_path = os.path.dirname(__file__)
 source_path = os.path.normpath(os.path.join(module_path, os.pardir, os.pardir))
@@ -57,6 +57,7 @@ interfaces_info = {}
 partial_interface_files = defaultdict(lambda: {
     'full_paths': [],
     'include_paths': [],
+    'referenced_types': [],
 })
 
 
@@ -107,11 +108,12 @@ def include_path(idl_filename, implemented_as=None):
     return posixpath.join(relative_dir, cpp_class_name + '.h')
 
 
-def add_paths_to_partials_dict(partial_interface_name, full_path, this_include_path=None):
+def add_paths_to_partials_dict(partial_interface_name, full_path, this_include_path=None, referenced_types=()):
     paths_dict = partial_interface_files[partial_interface_name]
     paths_dict['full_paths'].append(full_path)
     if this_include_path:
         paths_dict['include_paths'].append(this_include_path)
+    paths_dict['referenced_types'].extend(referenced_types)
 
 
 def compute_info_individual(idl_filename, component_dir):
@@ -122,11 +124,12 @@ def compute_info_individual(idl_filename, component_dir):
     implemented_as = extended_attributes.get('ImplementedAs')
     relative_dir = relative_dir_posix(idl_filename)
     this_include_path = None if 'NoImplHeader' in extended_attributes else include_path(idl_filename, implemented_as)
+    referenced_types = get_referenced_types_from_idl(idl_file_contents)
 
     # Handle partial interfaces
     partial_interface_name = get_partial_interface_name_from_idl(idl_file_contents)
     if partial_interface_name:
-        add_paths_to_partials_dict(partial_interface_name, full_path, this_include_path)
+        add_paths_to_partials_dict(partial_interface_name, full_path, this_include_path, referenced_types)
         return
 
     # If not a partial interface, the basename is the interface name
@@ -158,6 +161,9 @@ def compute_info_individual(idl_filename, component_dir):
         # These cause rebuilds of referrers, due to the dependency, so these
         # should be minimized; currently only targets of [PutForwards].
         'referenced_interfaces': get_put_forward_interfaces_from_idl(idl_file_contents),
+        # Types that may be referenced (used to compute which interfaces_info
+        # each interface depends on): private, removed from the overall info
+        'referenced_types': referenced_types,
         'relative_dir': relative_dir,
     }
 
@@ -35,11 +35,13 @@ output (concretely, exported as a pickle). This is then used by the IDL compiler
 itself, so it does not need to compute global information itself, and so that
 inter-IDL dependencies are clear, since they are all computed here.
 
-The |interfaces_info| pickle is a *global* dependency: any changes cause a full
-rebuild. This is to avoid having to compute which public data is visible by
-which IDL files on a file-by-file basis, which is very complex for little
-benefit.
-|interfaces_info| should thus only contain data about an interface that
+The |interfaces_info| pickle is a *global* dependency of the build: any change
+to it reruns the compiler. So that it only recompiles the IDL files affected
+by the change, a digest of the |interfaces_info| entries read when compiling
+each interface is also computed (its own entry, and those of its ancestors, of
+the interfaces it implements and of the types it or its dependencies may
+reference), and optionally written as a pickle, keyed by |interface_name|.
+|interfaces_info| should nonetheless only contain data about an interface that
 contains paths or is needed by *other* interfaces, e.g., path data (to abstract
 the compiler from OS-specific file paths) or public data (to avoid having to
 read other interfaces unnecessarily).
@@ -78,6 +80,8 @@ Design doc: http://www.chromium.org/developers/design-documents/idl-build
 
 from collections import defaultdict
 import cPickle as pickle
+import hashlib
+import json
 import optparse
 import sys
 
@@ -96,9 +100,11 @@ interfaces_info = {}
 partial_interface_files = defaultdict(lambda: {
     'full_paths': [],
     'include_paths': [],
+    'referenced_types': [],
 })
 parent_interfaces = {}
 inherited_extended_attributes_by_interface = {}  # interface name -> extended attributes
+referenced_types_by_interface = {}  # interface name -> types (maybe) referenced
 
 
 class IdlInterfaceFileNotFoundError(Exception):
@@ -110,6 +116,7 @@ def parse_options():
     usage = 'Usage: %prog [InfoIndividual.pickle]... [Info.pickle]'
     parser = optparse.OptionParser(usage=usage)
     parser.add_option('--write-file-only-if-changed', type='int', help='if true, do not write an output file if it would be identical to the existing one, which avoids unnecessary rebuilds in ninja')
+    parser.add_option('--interfaces-info-digests-file', help='output pickle file of the digests of the interfaces_info each interface depends on')
 
     options, args = parser.parse_args()
     if options.write_file_only_if_changed is None:
@@ -240,10 +247,40 @@ def compute_interfaces_info_overall(info_individuals):
         })
 
     # Clean up temporary private information
-    for interface_info in interfaces_info.itervalues():
+    for interface_name, interface_info in interfaces_info.iteritems():
         del interface_info['extended_attributes']
         del interface_info['is_legacy_treat_as_partial_interface']
         del interface_info['parent']
+        referenced_types_by_interface[interface_name] = interface_info.pop('referenced_types')
+
+
+def compute_interfaces_info_digests():
+    """Returns a dict of the digests of the interfaces_info each interface
+    depends on, keyed by interface name.
+
+    Must be called after compute_interfaces_info_overall().
+    """
+    interfaces_info_digests = {}
+    for interface_name, interface_info in interfaces_info.iteritems():
+        # The types referenced by the partial interfaces and implemented
+        # interfaces too, since these are merged into the interface.
+        referenced_types = set(referenced_types_by_interface[interface_name])
+        referenced_types.update(partial_interface_files[interface_name]['referenced_types'])
+        for implemented_interface in interface_info['implements_interfaces']:
+            referenced_types.update(referenced_types_by_interface[implemented_interface])
+
+        dependency_names = set([interface_name])
+        dependency_names.update(interface_info['ancestors'])
+        dependency_names.update(interface_info['implements_interfaces'])
+        dependency_names.update(interface_info['referenced_interfaces'])
+        dependency_names.update(referenced_types)
+        # Identifiers that aren't interfaces are included too (as None), so
+        # that the digest changes if an interface with their name is added.
+        dependencies_info = dict((name, interfaces_info.get(name))
+                                 for name in dependency_names)
+        interfaces_info_digests[interface_name] = hashlib.md5(
+            json.dumps(dependencies_info, sort_keys=True)).hexdigest()
+    return interfaces_info_digests
 
 
 ################################################################################
@@ -258,6 +295,10 @@ def main():
     write_pickle_file(interfaces_info_filename,
                       interfaces_info,
                       options.write_file_only_if_changed)
+    if options.interfaces_info_digests_file:
+        write_pickle_file(options.interfaces_info_digests_file,
+                          compute_interfaces_info_digests(),
+                          options.write_file_only_if_changed)
 
 
 if __name__ == '__main__':
@@ -145,13 +145,16 @@ def get_parent_interface(file_contents):
     return match and match.group(1)
 
 
-def get_interface_extended_attributes_from_idl(file_contents):
-    # Strip comments
+def strip_comments(file_contents):
     # re.compile needed b/c Python 2.6 doesn't support flags in re.sub
     single_line_comment_re = re.compile(r'//.*$', flags=re.MULTILINE)
     block_comment_re = re.compile(r'/\*.*?\*/', flags=re.MULTILINE | re.DOTALL)
     file_contents = re.sub(single_line_comment_re, '', file_contents)
-    file_contents = re.sub(block_comment_re, '', file_contents)
+    return re.sub(block_comment_re, '', file_contents)
+
+
+def get_interface_extended_attributes_from_idl(file_contents):
+    file_contents = strip_comments(file_contents)
 
     match = re.search(r'\[(.*)\]\s*'
                       r'((callback|partial)\s+)?'
@@ -177,6 +180,15 @@ def get_interface_extended_attributes_from_idl(file_contents):
     return extended_attributes
 
 
+def get_referenced_types_from_idl(file_contents):
+    """Returns the names of the types that may be referenced.
+
+    Types can't be told apart from other identifiers without parsing, so this
+    is all the identifiers (a superset of the referenced types).
+    """
+    return sorted(set(re.findall(r'\b[A-Za-z_]\w*', strip_comments(file_contents))))
+
+
 def get_put_forward_interfaces_from_idl(file_contents):
     put_forwards_pattern = (r'\[[^\]]*PutForwards=[^\]]*\]\s+'
                             r'readonly\s+'
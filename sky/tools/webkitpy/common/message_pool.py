@@ -71,6 +71,12 @@ class _MessagePool(object):
         self._host = host
         self._name = 'manager'
         self._running_inline = (self._num_workers == 1)
+        # The state of the messages being split (see run()).
+        self._can_split = None
+        self._worker_queues = {}
+        self._unassigned_messages = []
+        self._assigned_messages = {}
+        self._idle_workers = []
         if self._running_inline:
             self._messages_to_worker = Queue.Queue()
             self._messages_to_manager = Queue.Queue()
@@ -85,8 +91,20 @@ class _MessagePool(object):
         self._close()
         return False
 
-    def run(self, shards):
-        """Posts a list of messages to the pool and waits for them to complete."""
+    def run(self, shards, can_split=None):
+        """Posts a list of messages to the pool and waits for them to complete.
+
+        If |can_split| is given, it is called with each message. The last argument of
+        the messages it returns True for must be a list: its items are sent one at a time
+        to the worker handling the message, and idle workers take (steal) the items of
+        other workers' messages that weren't sent yet, so that a long message doesn't
+        keep a single worker busy long after the others are done."""
+        if can_split and not self._running_inline:
+            self._can_split = can_split
+            self._unassigned_messages = [(message[0], tuple(message[1:-1]), message[-1], can_split(message)) for message in shards]
+            self.wait()
+            return
+
         for message in shards:
             self._messages_to_worker.put(_Message(self._name, message[0], message[1:], from_user=True, logs=()))
 
@@ -103,7 +121,14 @@ class _MessagePool(object):
             host = self._host
 
         for worker_number in xrange(self._num_workers):
-            worker = _Worker(host, self._messages_to_manager, self._messages_to_worker, self._worker_factory, worker_number, self._running_inline, self if self._running_inline else None, self._worker_log_level())
+            messages_to_worker = self._messages_to_worker
+            if self._can_split:
+                # The messages are sent to each worker by the manager.
+                messages_to_worker = multiprocessing.Queue()
+            worker = _Worker(host, self._messages_to_manager, messages_to_worker, self._worker_factory, worker_number, self._running_inline, self if self._running_inline else None, self._worker_log_level())
+            if self._can_split:
+                self._worker_queues[worker.name] = messages_to_worker
+                self._idle_workers.append(worker.name)
             self._workers.append(worker)
             worker.start()
 
@@ -124,6 +149,8 @@ class _MessagePool(object):
                 self._workers[0].run()
                 self._loop(block=False)
             else:
+                if self._can_split:
+                    self._dispatch_split_messages()
                 self._loop(block=True)
         finally:
             self._close()
@@ -143,6 +170,9 @@ class _MessagePool(object):
             if self._messages_to_manager:
                 self._messages_to_manager.close()
                 self._messages_to_manager = None
+            for queue in self._worker_queues.values():
+                queue.close()
+            self._worker_queues = {}
 
     def _log_messages(self, messages):
         for message in messages:
@@ -150,6 +180,63 @@ class _MessagePool(object):
 
     def _handle_done(self, source):
         self._workers_stopped.add(source)
+        if self._can_split:
+            # Give the items the worker didn't get to to the other workers.
+            message = self._assigned_messages.pop(source, None)
+            if message and message[2]:
+                self._unassigned_messages.insert(0, message)
+            if source in self._idle_workers:
+                self._idle_workers.remove(source)
+            self._dispatch_split_messages()
+
+    def _handle_ready(self, source):
+        if self._can_split:
+            self._idle_workers.append(source)
+            self._dispatch_split_messages()
+
+    def _dispatch_split_messages(self):
+        """Sends the next message to each idle worker, and stops all the workers once
+        there is nothing left to send and none of them is busy."""
+        for worker_name in list(self._idle_workers):
+            message = self._next_split_message(worker_name)
+            if message:
+                self._idle_workers.remove(worker_name)
+                self._worker_queues[worker_name].put(message)
+        busy_workers = len(self._workers) - len(self._workers_stopped) - len(self._idle_workers)
+        if not busy_workers:
+            for worker_name in self._idle_workers:
+                self._worker_queues[worker_name].put(_Message(self._name, 'stop', message_args=(), from_user=False, logs=()))
+            self._idle_workers = []
+
+    def _next_split_message(self, worker_name):
+        # Each message is (name, args, items, can be split).
+        message = self._assigned_messages.get(worker_name)
+        if not message or not message[2]:
+            message = None
+            if self._unassigned_messages:
+                message = self._unassigned_messages.pop(0)
+            else:
+                # Steal the second half of the remaining items of the largest split
+                # message another worker is handling.
+                split_messages = [m for m in self._assigned_messages.values() if m[3] and m[2]]
+                if split_messages:
+                    largest = max(split_messages, key=lambda m: len(m[2]))
+                    items = largest[2]
+                    message = (largest[0], largest[1], items[len(items) / 2:], True)
+                    del items[len(items) / 2:]
+            if not message:
+                self._assigned_messages.pop(worker_name, None)
+                return None
+            message = (message[0], message[1], list(message[2]), message[3])
+            self._assigned_messages[worker_name] = message
+
+        name, args, items, can_split = message
+        if can_split:
+            items_to_send = [items.pop(0)]
+        else:
+            items_to_send = items[:]
+            del items[:]
+        return _Message(self._name, name, args + (items_to_send,), from_user=True, logs=())
 
     @staticmethod
     def _handle_worker_exception(source, exception_type, exception_value, _):
@@ -252,6 +339,8 @@ class _Worker(multiprocessing.Process):
                 message = self._messages_to_worker.get()
                 if message.from_user:
                     worker.handle(message.name, message.src, *message.args)
+                    if self._running:
+                        self._post(name='ready', args=(), from_user=False)
                     self._yield_to_manager()
                 else:
                     assert message.name == 'stop', 'bad message %s' % repr(message)
@@ -0,0 +1,179 @@
+# Copyright 2015 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+import Queue
+import unittest
+
+from webkitpy.common import message_pool
+
+
+def _can_split(message):
+    # As the layout test runner does, the locked shards are never split.
+    return not message[2][0].startswith('locked')
+
+
+class _FakeWorker(object):
+    def __init__(self, name):
+        self.name = name
+
+    def is_alive(self):
+        return False
+
+
+class SplitMessagesTest(unittest.TestCase):
+    """Tests how the messages are dispatched when they can be split, with fake
+    workers whose queues are read by the test (rather than by processes)."""
+
+    def setUp(self):
+        self.pool = message_pool._MessagePool(None, None, 2)
+        # run() only sets up the messages, and the test plays the workers.
+        self.pool.wait = lambda: None
+        self.pool._messages_to_manager = Queue.Queue()
+
+    def start(self, shards, worker_names=('worker/0', 'worker/1')):
+        self.pool.run(shards, can_split=_can_split)
+        self.pool._workers = [_FakeWorker(name) for name in worker_names]
+        self.pool._worker_queues = dict((name, Queue.Queue()) for name in worker_names)
+        self.pool._idle_workers = list(worker_names)
+        self.pool._dispatch_split_messages()
+
+    def post(self, worker_name, message_name):
+        self.pool._messages_to_manager.put(message_pool._Message(worker_name, message_name, (), from_user=False, logs=()))
+        self.pool._loop(block=False)
+
+    def received(self, worker_name):
+        """Returns the messages sent to the worker since the last call, as 'stop' or
+        (name, args) tuples."""
+        messages = []
+        queue = self.pool._worker_queues[worker_name]
+        while not queue.empty():
+            message = queue.get()
+            messages.append(message.args and (message.name, message.args) or message.name)
+        return messages
+
+    def test_steal(self):
+        self.start([('test_list', 'a', ['a1', 'a2', 'a3', 'a4'])])
+        # worker/1 takes the second half of the items worker/0 hasn't started.
+        self.assertEqual(self.received('worker/0'), [('test_list', ('a', ['a1']))])
+        self.assertEqual(self.received('worker/1'), [('test_list', ('a', ['a3']))])
+
+        self.post('worker/0', 'ready')
+        self.assertEqual(self.received('worker/0'), [('test_list', ('a', ['a2']))])
+        self.post('worker/1', 'ready')
+        self.assertEqual(self.received('worker/1'), [('test_list', ('a', ['a4']))])
+
+        # The workers are only stopped once none of them is busy.
+        self.post('worker/0', 'ready')
+        self.assertEqual(self.received('worker/0'), [])
+        self.post('worker/1', 'ready')
+        self.assertEqual(self.received('worker/0'), ['stop'])
+        self.assertEqual(self.received('worker/1'), ['stop'])
+
+    def test_locked_shards(self):
+        self.start([('test_list', 'locked_tests', ['locked1', 'locked2']),
+                    ('test_list', 'b', ['b1', 'b2', 'b3'])])
+        # The locked shard is sent first, as a whole.
+        self.assertEqual(self.received('worker/0'), [('test_list', ('locked_tests', ['locked1', 'locked2']))])
+        self.assertEqual(self.received('worker/1'), [('test_list', ('b', ['b1']))])
+
+        self.post('worker/1', 'ready')
+        self.post('worker/1', 'ready')
+        self.assertEqual(self.received('worker/1'), [('test_list', ('b', ['b2'])), ('test_list', ('b', ['b3']))])
+        self.post('worker/1', 'ready')
+        self.assertEqual(self.received('worker/1'), [])
+
+        self.post('worker/0', 'ready')
+        self.assertEqual(self.received('worker/0'), ['stop'])
+        self.assertEqual(self.received('worker/1'), ['stop'])
+
+    def test_locked_shards_are_not_stolen(self):
+        self.start([('test_list', 'locked_tests', ['locked1', 'locked2', 'locked3'])])
+        self.assertEqual(self.received('worker/0'), [('test_list', ('locked_tests', ['locked1', 'locked2', 'locked3']))])
+        # There is nothing worker/1 can take, but it isn't stopped while worker/0 is busy.
+        self.assertEqual(self.received('worker/1'), [])
+
+        self.post('worker/0', 'ready')
+        self.assertEqual(self.received('worker/0'), ['stop'])
+        self.assertEqual(self.received('worker/1'), ['stop'])
+
+    def test_done_requeues_unsent_items(self):
+        self.start([('test_list', 'a', ['a1', 'a2', 'a3', 'a4'])])
+        self.received('worker/0')
+        self.received('worker/1')
+
+        # worker/0 stops early (e.g. after a device failure, with stop_running()),
+        # so the item of its share that it wasn't sent goes to worker/1.
+        self.post('worker/0', 'done')
+        self.assertEqual(self.received('worker/1'), [])
+        self.post('worker/1', 'ready')
+        self.post('worker/1', 'ready')
+        self.assertEqual(self.received('worker/1'), [('test_list', ('a', ['a4'])), ('test_list', ('a', ['a2']))])
+
+        self.post('worker/1', 'ready')
+        self.assertEqual(self.received('worker/1'), ['stop'])
+        self.assertEqual(self.received('worker/0'), [])
+        self.assertEqual(self.pool._workers_stopped, set(['worker/0']))
+
+    def test_all_workers_done(self):
+        self.start([('test_list', 'a', ['a1', 'a2', 'a3', 'a4']),
+                    ('test_list', 'b', ['b1'])])
+        self.received('worker/0')
+        self.received('worker/1')
+
+        # The manager stops waiting once every worker stopped, even with messages left.
+        self.post('worker/0', 'done')
+        self.post('worker/1', 'done')
+        self.assertEqual(self.received('worker/0'), [])
+        self.assertEqual(self.received('worker/1'), [])
+        self.pool._loop(block=True)
+        self.assertEqual(self.pool._workers_stopped, set(['worker/0', 'worker/1']))
+
+
+class _RecordingWorker(object):
+    def __init__(self, connection):
+        self._connection = connection
+
+    def handle(self, name, source, shard_name, items):
+        for item in items:
+            if item.startswith('fail'):
+                # As the layout test workers do after a device failure.
+                self._connection.post('failed', shard_name, item)
+                self._connection.stop_running()
+                return
+            self._connection.post('handled', shard_name, item)
+
+
+class _RecordingCaller(object):
+    def __init__(self):
+        self.messages = []
+
+    def handle(self, name, source, shard_name, item):
+        self.messages.append((name, source, shard_name, item))
+
+
+class MessagePoolTest(unittest.TestCase):
+    """Runs split messages in worker processes."""
+
+    def run_pool(self, shards):
+        caller = _RecordingCaller()
+        with message_pool.get(caller, _RecordingWorker, 2) as pool:
+            pool.run(shards, can_split=_can_split)
+        return caller.messages
+
+    def test_run(self):
+        items = ['a%d' % i for i in range(20)]
+        messages = self.run_pool([('test_list', 'locked_tests', ['locked1', 'locked2']),
+                                  ('test_list', 'a', items)])
+        self.assertEqual(sorted(item for (_, _, _, item) in messages), sorted(['locked1', 'locked2'] + items))
+        # The locked shard ran in a single worker.
+        self.assertEqual(len(set(source for (_, source, shard_name, _) in messages if shard_name == 'locked_tests')), 1)
+
+    def test_stop_running(self):
+        messages = self.run_pool([('test_list', 'locked_tests', ['locked1', 'fail', 'locked2']),
+                                  ('test_list', 'a', ['a1', 'a2', 'a3'])])
+        failed_worker = [source for (name, source, _, _) in messages if name == 'failed']
+        self.assertEqual(len(failed_worker), 1)
+        # The worker that failed ran nothing more, and the other one ran the rest.
+        self.assertEqual([item for (_, source, _, item) in messages if source == failed_worker[0]], ['locked1', 'fail'])
+        self.assertEqual(sorted(item for (name, source, _, item) in messages if source != failed_worker[0]), ['a1', 'a2', 'a3'])
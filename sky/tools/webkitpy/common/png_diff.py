@@ -0,0 +1,228 @@
+# Copyright 2015 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""Compares PNG images in-process, the way the image_diff tool does.
+
+Only the (non-interlaced, 8-bit, non-palette) PNGs the drivers produce are
+supported; diff_png() raises UnsupportedPNGError for anything else, and the
+caller should then run image_diff.
+
+Telling that two images are the same is fast, as it doesn't need to decode
+them (see diff_png()); decoding them is much slower than image_diff is."""
+
+import binascii
+import struct
+import zlib
+
+_PNG_SIGNATURE = '\x89PNG\r\n\x1a\n'
+_CHECKSUM_KEY = 'checksum\x00'
+
+# Bytes per pixel, by PNG color type (grayscale, RGB, grayscale and alpha, RGBA).
+_BYTES_PER_PIXEL = {0: 1, 2: 3, 4: 2, 6: 4}
+
+_RED = '\xff\x00\x00\xff'
+
+# Maps an alpha value to the one of the same pixel in the diff image (faded).
+_FADE_TABLE = ''.join(chr(alpha - alpha / 2) for alpha in xrange(256))
+
+
+class UnsupportedPNGError(Exception):
+    pass
+
+
+class ImageTooLargeError(UnsupportedPNGError):
+    pass
+
+
+def diff_png(expected_contents, actual_contents, max_pixels=None):
+    """Returns a PNG image of the differences between the two PNG images, or
+    None if they have the same pixels.
+
+    Like image_diff, the diff image is the actual image, with the pixels that
+    differ from the expected image in red and the others faded.
+
+    The images are only decoded if they have neither the same checksum (see
+    read_checksum_from_png.py) nor the same image data; if they have more
+    than |max_pixels| pixels, ImageTooLargeError is raised instead."""
+    if expected_contents == actual_contents:
+        return None
+    expected = _PNG(expected_contents)
+    actual = _PNG(actual_contents)
+    if expected.checksum and actual.checksum:
+        # The checksums are those of the pixels.
+        if expected.checksum == actual.checksum:
+            return None
+    elif expected.header == actual.header and expected.data() == actual.data():
+        # Same pixels, encoded the same way (only the other chunks differ).
+        return None
+
+    for image in (expected, actual):
+        if max_pixels is not None and image.width * image.height > max_pixels:
+            raise ImageTooLargeError('%dx%d image' % (image.width, image.height))
+
+    expected_rows = expected.rgba_rows()
+    actual_rows = actual.rgba_rows()
+    if expected_rows == actual_rows:
+        return None
+
+    width = min(expected.width, actual.width) * 4
+    diff_rows = []
+    for y, actual_row in enumerate(actual_rows):
+        diff_row = bytearray(actual_row)
+        if y < len(expected_rows):
+            expected_row = expected_rows[y]
+            if actual_row[:width] != expected_row[:width]:
+                for x in xrange(0, width, 4):
+                    if actual_row[x:x + 4] != expected_row[x:x + 4]:
+                        diff_row[x:x + 4] = _RED
+            diff_row[3:width:4] = str(diff_row[3:width:4]).translate(_FADE_TABLE)
+        diff_rows.append(diff_row)
+    return _encode_png(actual.width, actual.height, diff_rows)
+
+
+class _PNG(object):
+    def __init__(self, contents):
+        if not contents.startswith(_PNG_SIGNATURE):
+            raise UnsupportedPNGError('not a PNG image')
+        self.header = None
+        self.checksum = None
+        self._compressed_data = []
+        self._data = None
+        position = len(_PNG_SIGNATURE)
+        while position + 8 <= len(contents):
+            length, chunk_type = struct.unpack('>I4s', contents[position:position + 8])
+            chunk = contents[position + 8:position + 8 + length]
+            position += length + 12
+            if len(chunk) != length:
+                raise UnsupportedPNGError('truncated %s chunk' % chunk_type)
+            if chunk_type == 'IHDR':
+                self.header = chunk
+            elif chunk_type == 'IDAT':
+                self._compressed_data.append(chunk)
+            elif chunk_type == 'tEXt' and chunk.startswith(_CHECKSUM_KEY):
+                self.checksum = chunk[len(_CHECKSUM_KEY):]
+            elif chunk_type in ('PLTE', 'tRNS'):
+                raise UnsupportedPNGError('%s chunks are not supported' % chunk_type)
+            elif chunk_type == 'IEND':
+                break
+        if not self.header or len(self.header) != 13:
+            raise UnsupportedPNGError('missing IHDR chunk')
+
+        (self.width, self.height, bit_depth, self._color_type, compression, filter_method,
+         interlace) = struct.unpack('>IIBBBBB', self.header)
+        if bit_depth != 8 or self._color_type not in _BYTES_PER_PIXEL or compression or filter_method or interlace:
+            raise UnsupportedPNGError('unsupported image format %r' % ((bit_depth, self._color_type, interlace),))
+
+    def data(self):
+        """Returns the (filtered) rows of the image."""
+        if self._data is None:
+            try:
+                self._data = zlib.decompress(''.join(self._compressed_data))
+            except zlib.error, e:
+                raise UnsupportedPNGError('corrupt image data: %s' % e)
+        return self._data
+
+    def rgba_rows(self):
+        """Returns the rows of pixels of the image, as RGBA strings."""
+        bpp = _BYTES_PER_PIXEL[self._color_type]
+        stride = self.width * bpp
+        data = self.data()
+        if len(data) < (stride + 1) * self.height:
+            raise UnsupportedPNGError('truncated image data')
+
+        rows = []
+        previous = None
+        for y in xrange(self.height):
+            start = y * (stride + 1)
+            row = _unfilter(ord(data[start]), bytearray(data[start + 1:start + 1 + stride]), previous, bpp)
+            previous = row
+            rows.append(self._to_rgba(row))
+        return rows
+
+    def _to_rgba(self, row):
+        if self._color_type == 6:
+            return str(row)
+        rgba = bytearray('\xff' * (self.width * 4))
+        if self._color_type == 2:
+            rgba[0::4] = row[0::3]
+            rgba[1::4] = row[1::3]
+            rgba[2::4] = row[2::3]
+        else:
+            gray = row[0::_BYTES_PER_PIXEL[self._color_type]]
+            rgba[0::4] = gray
+            rgba[1::4] = gray
+            rgba[2::4] = gray
+            if self._color_type == 4:
+                rgba[3::4] = row[1::2]
+        return str(rgba)
+
+
+# Masks of the low 7 bits and of the high bit of each byte, by number of bytes.
+_masks = {}
+
+
+def _add_bytes(row, other):
+    """Returns the bytewise sum (modulo 256) of two rows of the same length,
+    computed on the whole rows at once as (big) integers."""
+    length = len(row)
+    if length not in _masks:
+        _masks[length] = (int('7f' * length, 16), int('80' * length, 16))
+    low_bits, high_bits = _masks[length]
+    a = int(binascii.hexlify(row), 16)
+    b = int(binascii.hexlify(other), 16)
+    total = ((a & low_bits) + (b & low_bits)) ^ ((a ^ b) & high_bits)
+    return bytearray(binascii.unhexlify('%0*x' % (length * 2, total)))
+
+
+def _unfilter(filter_type, row, previous, bpp):
+    if filter_type == 0 or not row:
+        return row
+    if filter_type == 1:  # Sub
+        for i in xrange(bpp, len(row)):
+            row[i] = (row[i] + row[i - bpp]) & 0xff
+        return row
+    if filter_type == 2:  # Up
+        if previous is None:
+            return row
+        return _add_bytes(row, previous)
+    if previous is None:
+        previous = bytearray(len(row))
+    if filter_type == 3:  # Average
+        for i in xrange(bpp):
+            row[i] = (row[i] + (previous[i] >> 1)) & 0xff
+        for i in xrange(bpp, len(row)):
+            row[i] = (row[i] + ((row[i - bpp] + previous[i]) >> 1)) & 0xff
+        return row
+    if filter_type == 4:  # Paeth
+        for i in xrange(bpp):
+            row[i] = (row[i] + previous[i]) & 0xff
+        for i in xrange(bpp, len(row)):
+            left = row[i - bpp]
+            up = previous[i]
+            up_left = previous[i - bpp]
+            p = left + up - up_left
+            pa = abs(p - left)
+            pb = abs(p - up)
+            pc = abs(p - up_left)
+            if pa <= pb and pa <= pc:
+                predictor = left
+            elif pb <= pc:
+                predictor = up
+            else:
+                predictor = up_left
+            row[i] = (row[i] + predictor) & 0xff
+        return row
+    raise UnsupportedPNGError('unknown filter type %d' % filter_type)
+
+
+def _chunk(chunk_type, data):
+    return struct.pack('>I', len(data)) + chunk_type + data + struct.pack('>I', zlib.crc32(chunk_type + data) & 0xffffffff)
+
+
+def _encode_png(width, height, rgba_rows):
+    data = ''.join('\x00' + str(row) for row in rgba_rows)
+    return (_PNG_SIGNATURE +
+            _chunk('IHDR', struct.pack('>IIBBBBB', width, height, 8, 6, 0, 0, 0)) +
+            _chunk('IDAT', zlib.compress(data)) +
+            _chunk('IEND', ''))
@@ -0,0 +1,115 @@
+# Copyright 2015 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+import struct
+import unittest
+import zlib
+
+from webkitpy.common import png_diff
+
+
+def _chunk(chunk_type, data):
+    return struct.pack('>I', len(data)) + chunk_type + data + struct.pack('>I', zlib.crc32(chunk_type + data) & 0xffffffff)
+
+
+def _paeth(left, up, up_left):
+    p = left + up - up_left
+    if abs(p - left) <= abs(p - up) and abs(p - left) <= abs(p - up_left):
+        return left
+    if abs(p - up) <= abs(p - up_left):
+        return up
+    return up_left
+
+
+def _filter(filter_type, row, previous, bpp):
+    filtered = bytearray(row)
+    for i in xrange(len(row)):
+        left = row[i - bpp] if i >= bpp else 0
+        up = previous[i] if previous else 0
+        up_left = previous[i - bpp] if previous and i >= bpp else 0
+        predictor = [0, left, up, (left + up) >> 1, _paeth(left, up, up_left)][filter_type]
+        filtered[i] = (row[i] - predictor) & 0xff
+    return filtered
+
+
+def _png(width, height, pixel_fn, color_type=6, checksum=None, filter_types=(0,)):
+    """Returns a PNG image with the pixels |pixel_fn|(x, y) returns, filtering
+    each row with the next of |filter_types|."""
+    bpp = {2: 3, 6: 4}[color_type]
+    data = ''
+    previous = None
+    for y in xrange(height):
+        row = bytearray(''.join(pixel_fn(x, y)[:bpp] for x in xrange(width)))
+        filter_type = filter_types[y % len(filter_types)]
+        data += chr(filter_type) + str(_filter(filter_type, row, previous, bpp))
+        previous = row
+    png = '\x89PNG\r\n\x1a\n' + _chunk('IHDR', struct.pack('>IIBBBBB', width, height, 8, color_type, 0, 0, 0))
+    if checksum:
+        png += _chunk('tEXt', 'checksum\x00' + checksum)
+    return png + _chunk('IDAT', zlib.compress(data)) + _chunk('IEND', '')
+
+
+def _gradient(x, y):
+    return chr(x * 16 % 256) + chr(y * 32 % 256) + chr((x * y) % 256) + chr(255 - x)
+
+
+class PNGDiffTest(unittest.TestCase):
+    def assert_same(self, expected, actual):
+        self.assertIsNone(png_diff.diff_png(expected, actual))
+
+    def test_same_contents(self):
+        self.assert_same('not a png', 'not a png')
+        image = _png(4, 4, _gradient)
+        self.assert_same(image, image)
+
+    def test_same_checksums(self):
+        # The pixels aren't compared if the checksums are the same.
+        self.assert_same(_png(4, 4, _gradient, checksum='0' * 32), _png(4, 4, lambda x, y: '\0\0\0\0', checksum='0' * 32))
+        # Otherwise they are.
+        self.assert_same(_png(4, 4, _gradient, checksum='0' * 32), _png(4, 4, _gradient, checksum='1' * 32, filter_types=(4,)))
+
+    def test_same_data(self):
+        self.assert_same(_png(4, 4, _gradient), _png(4, 4, _gradient, checksum='0' * 32))
+
+    def test_filters(self):
+        expected = _png(8, 10, _gradient)
+        for filter_type in xrange(5):
+            self.assert_same(expected, _png(8, 10, _gradient, filter_types=(filter_type,)))
+        self.assert_same(expected, _png(8, 10, _gradient, filter_types=(4, 3, 2, 1, 0)))
+
+    def test_color_types(self):
+        opaque = lambda x, y: _gradient(x, y)[:3] + '\xff'
+        self.assert_same(_png(4, 4, opaque), _png(4, 4, opaque, color_type=2, filter_types=(4, 1)))
+
+    def test_diff(self):
+        expected = _png(3, 2, lambda x, y: '\x10\x20\x30\x80')
+        actual = _png(3, 2, lambda x, y: '\x00\x00\x00\x00' if (x, y) == (1, 1) else '\x10\x20\x30\x80', filter_types=(4,))
+        diff = png_diff.diff_png(expected, actual)
+        self.assertEqual(png_diff._PNG(diff).rgba_rows(), [
+            '\x10\x20\x30\x40' * 3,
+            '\x10\x20\x30\x40' + '\xff\x00\x00\x80' + '\x10\x20\x30\x40',
+        ])
+
+    def test_diff_different_sizes(self):
+        # Like image_diff, only the pixels of both images are compared.
+        expected = _png(2, 1, lambda x, y: '\x10\x20\x30\x80')
+        actual = _png(3, 2, lambda x, y: '\x10\x20\x30\x80')
+        diff = png_diff.diff_png(expected, actual)
+        self.assertEqual(png_diff._PNG(diff).rgba_rows(), [
+            '\x10\x20\x30\x40' * 2 + '\x10\x20\x30\x80',
+            '\x10\x20\x30\x80' * 3,
+        ])
+
+    def test_max_pixels(self):
+        expected = _png(4, 4, _gradient)
+        actual = _png(4, 4, lambda x, y: '\0\0\0\0')
+        self.assertRaises(png_diff.ImageTooLargeError, png_diff.diff_png, expected, actual, max_pixels=15)
+        self.assertIsNotNone(png_diff.diff_png(expected, actual, max_pixels=16))
+        # Images that are the same don't need to be decoded.
+        self.assert_same(expected, _png(4, 4, _gradient, checksum='0' * 32))
+
+    def test_unsupported(self):
+        self.assertRaises(png_diff.UnsupportedPNGError, png_diff.diff_png, 'EXPECTED', 'ACTUAL')
+        interlaced = _png(4, 4, _gradient).replace(struct.pack('>IIBBBBB', 4, 4, 8, 6, 0, 0, 0), struct.pack('>IIBBBBB', 4, 4, 8, 6, 0, 0, 1))
+        self.assertRaises(png_diff.UnsupportedPNGError, png_diff.diff_png, _png(4, 4, _gradient, filter_types=(1,)), interlaced)
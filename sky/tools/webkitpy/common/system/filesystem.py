@@ -223,6 +223,19 @@ class FileSystem(object):
         with codecs.open(path, 'w', 'utf8') as f:
             f.write(contents)
 
+    def append_text_file(self, path, contents):
+        """Appends the contents to the file at the given location (creating it
+        if needed), encoded as UTF-8.
+
+        The contents are written with a single write to a file opened for
+        appending, so they aren't interleaved with those appended by other
+        processes."""
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0644)
+        try:
+            os.write(fd, contents.encode('utf8'))
+        finally:
+            os.close(fd)
+
     def sha1(self, path):
         contents = self.read_binary_file(path)
         return hashlib.sha1(contents).hexdigest()
@@ -335,6 +335,10 @@ class MockFileSystem(object):
     def write_text_file(self, path, contents):
         return self.write_binary_file(path, contents.encode('utf-8'))
 
+    def append_text_file(self, path, contents):
+        existing = self.files.get(path) or ''
+        return self.write_binary_file(path, existing + contents.encode('utf-8'))
+
     def sha1(self, path):
         contents = self.read_binary_file(path)
         return hashlib.sha1(contents).hexdigest()
@@ -272,6 +272,21 @@ class RealFileSystemTest(unittest.TestCase, GenericFileSystemTests):
             if text_path and fs.isfile(text_path):
                 os.remove(text_path)
 
+    def test_append_text_file(self):
+        fs = FileSystem()
+        text_path = None
+
+        unicode_text_string = u'\u016An\u012Dc\u014Dde\u033D'
+        hex_equivalent = '\xC5\xAA\x6E\xC4\xAD\x63\xC5\x8D\x64\x65\xCC\xBD'
+        try:
+            text_path = tempfile.mktemp(prefix='tree_unittest_')
+            fs.append_text_file(text_path, u'line\n')
+            fs.append_text_file(text_path, unicode_text_string)
+            self.assertEqual(fs.read_binary_file(text_path), 'line\n' + hex_equivalent)
+        finally:
+            if text_path and fs.isfile(text_path):
+                os.remove(text_path)
+
     def test_read_and_write_file(self):
         fs = FileSystem()
         text_path = None
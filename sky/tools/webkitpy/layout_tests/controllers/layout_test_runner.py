@@ -76,6 +76,11 @@ class LayoutTestRunner(object):
 
         self._current_run_results = None
 
+    def set_test_times(self, test_times_ms):
+        """Sets the times the tests took (in a previous run), by test name, so that
+        the longest tests can be started first."""
+        self._sharder = Sharder(self._port.split_test, self._options.max_locked_shards, test_times_ms)
+
     def run_tests(self, expectations, test_inputs, tests_to_skip, num_workers, retrying):
         self._expectations = expectations
         self._test_inputs = test_inputs
@@ -116,13 +121,13 @@ class LayoutTestRunner(object):
         start_time = time.time()
         try:
             with message_pool.get(self, self._worker_factory, num_workers, self._port.host) as pool:
-                pool.run(('test_list', shard.name, shard.test_inputs) for shard in all_shards)
+                pool.run((('test_list', shard.name, shard.test_inputs) for shard in all_shards), can_split=self._can_split)
 
             if self._shards_to_redo:
                 num_workers -= len(self._shards_to_redo)
                 if num_workers > 0:
                     with message_pool.get(self, self._worker_factory, num_workers, self._port.host) as pool:
-                        pool.run(('test_list', shard.name, shard.test_inputs) for shard in self._shards_to_redo)
+                        pool.run((('test_list', shard.name, shard.test_inputs) for shard in self._shards_to_redo), can_split=self._can_split)
         except TestRunInterruptedException, e:
             _log.warning(e.reason)
             run_results.interrupted = True
@@ -138,6 +143,13 @@ class LayoutTestRunner(object):
 
         return run_results
 
+    @staticmethod
+    def _can_split(message):
+        # Idle workers may take the tests of other shards that weren't started yet,
+        # except for the locked shards, which would then run concurrently.
+        test_inputs = message[2]
+        return not test_inputs[0].requires_lock
+
     def _worker_factory(self, worker_connection):
         results_directory = self._results_directory
         if self._retrying:
@@ -358,9 +370,14 @@ class TestShard(object):
 
 
 class Sharder(object):
-    def __init__(self, test_split_fn, max_locked_shards):
+    def __init__(self, test_split_fn, max_locked_shards, test_times_ms=None):
         self._split = test_split_fn
         self._max_locked_shards = max_locked_shards
+        # The times the tests took in a previous run, by test name.
+        self._test_times_ms = test_times_ms or {}
+        known_times = sorted(self._test_times_ms.values())
+        # Tests without a known time are assumed to take the median time.
+        self._default_time_ms = known_times[len(known_times) / 2] if known_times else 0
 
     def shard_tests(self, test_inputs, num_workers, fully_parallel, run_singly):
         """Groups tests into batches.
@@ -378,8 +395,21 @@ class Sharder(object):
         if num_workers == 1:
             return self._shard_in_two(test_inputs)
         elif fully_parallel:
-            return self._shard_every_file(test_inputs, run_singly)
-        return self._shard_by_directory(test_inputs)
+            locked_shards, unlocked_shards = self._shard_every_file(test_inputs, run_singly)
+        else:
+            locked_shards, unlocked_shards = self._shard_by_directory(test_inputs)
+        if self._test_times_ms:
+            # Start the longest shards first: the shards are handed out to the workers
+            # as they become idle, and this way the shorter ones fill in the gaps
+            # at the end, rather than a long one running alone.
+            unlocked_shards.sort(key=self._shard_time_ms, reverse=True)
+        return locked_shards, unlocked_shards
+
+    def _test_time_ms(self, test_input):
+        return self._test_times_ms.get(test_input.test_name, self._default_time_ms)
+
+    def _shard_time_ms(self, shard):
+        return sum(self._test_time_ms(test_input) for test_input in shard.test_inputs)
 
     def _shard_in_two(self, test_inputs):
         """Returns two lists of shards, one with all the tests requiring a lock and one with the rest.
@@ -478,6 +508,9 @@ class Sharder(object):
         """Takes a list of shards and redistributes the tests into no more
         than |max_new_shards| new shards."""
 
+        if self._test_times_ms and len(old_shards) > max_new_shards > 0:
+            return self._pack_shards(old_shards, max_new_shards, shard_name_prefix)
+
         # This implementation assumes that each input shard only contains tests from a
         # single directory, and that tests in each shard must remain together; as a
         # result, a given input shard is never split between output shards.
@@ -504,3 +537,24 @@ class Sharder(object):
             some_shards, remaining_shards = split_at(remaining_shards, num_old_per_new)
             new_shards.append(TestShard('%s_%d' % (shard_name_prefix, len(new_shards) + 1), extract_and_flatten(some_shards)))
         return new_shards
+
+    def _pack_shards(self, old_shards, max_new_shards, shard_name_prefix):
+        """Like _resize_shards, but balances the expected time of the new shards,
+        by adding the longest old shards first, each to the shortest new shard."""
+        bins = [[0, []] for _ in xrange(max_new_shards)]
+        for shard in sorted(old_shards, key=self._shard_time_ms, reverse=True):
+            shortest_bin = min(bins, key=lambda b: b[0])
+            shortest_bin[0] += self._shard_time_ms(shard)
+            shortest_bin[1].append(shard)
+
+        new_shards = []
+        for _, shards in bins:
+            if not shards:
+                continue
+            # Keep the tests in the usual order within each shard.
+            shards.sort(key=lambda shard: shard.name)
+            test_inputs = []
+            for shard in shards:
+                test_inputs.extend(shard.test_inputs)
+            new_shards.append(TestShard('%s_%d' % (shard_name_prefix, len(new_shards) + 1), test_inputs))
+        return new_shards
@@ -176,9 +176,9 @@ class SharderTests(unittest.TestCase):
     def get_test_input(self, test_file):
         return TestInput(test_file, requires_lock=(test_file.startswith('http') or test_file.startswith('perf')))
 
-    def get_shards(self, num_workers, fully_parallel, run_singly, test_list=None, max_locked_shards=1):
+    def get_shards(self, num_workers, fully_parallel, run_singly, test_list=None, max_locked_shards=1, test_times_ms=None):
         port = TestPort(MockSystemHost())
-        self.sharder = Sharder(port.split_test, max_locked_shards)
+        self.sharder = Sharder(port.split_test, max_locked_shards, test_times_ms)
         test_list = test_list or self.test_list
         return self.sharder.shard_tests([self.get_test_input(test) for test in test_list],
             num_workers, fully_parallel, run_singly)
@@ -283,6 +283,46 @@ class SharderTests(unittest.TestCase):
                'http/tests/xmlhttprequest/supported-xml-content-types.html',
                'perf/object-keys.html'])])
 
+    def test_shard_by_time(self):
+        test_times_ms = {
+            'animations/keyframes.html': 10,
+            'dom/html/level2/html/HTMLAnchorElement03.html': 500,
+            'dom/html/level2/html/HTMLAnchorElement06.html': 20,
+            'fast/css/display-none-inline-style-change-crash.html': 1000,
+            'virtual/threaded/dir/test.html': 30,
+        }
+        locked, unlocked = self.get_shards(num_workers=2, fully_parallel=True, max_locked_shards=2, run_singly=False,
+            test_times_ms=test_times_ms)
+        # The tests without a time are assumed to take the median time (30ms).
+        self.assert_shards(unlocked,
+            [('.', ['fast/css/display-none-inline-style-change-crash.html']),
+             ('.', ['dom/html/level2/html/HTMLAnchorElement03.html']),
+             ('virtual/threaded/dir', ['virtual/threaded/dir/test.html']),
+             ('virtual/threaded/fast/foo', ['virtual/threaded/fast/foo/test.html']),
+             ('.', ['ietestcenter/Javascript/11.1.5_4-4-c-1.html']),
+             ('.', ['dom/html/level2/html/HTMLAnchorElement06.html']),
+             ('.', ['animations/keyframes.html'])])
+
+    def test_multiple_locked_shards_by_time(self):
+        test_times_ms = {
+            'http/tests/security/view-source-no-refresh.html': 100,
+            'http/tests/websocket/tests/unicode.htm': 100,
+            'http/tests/websocket/tests/websocket-protocol-ignored.html': 100,
+            'http/tests/xmlhttprequest/supported-xml-content-types.html': 1000,
+            'perf/object-keys.html': 10,
+        }
+        locked, unlocked = self.get_shards(num_workers=4, fully_parallel=False, max_locked_shards=2, run_singly=False,
+            test_times_ms=test_times_ms)
+        # The locked shards are balanced by time rather than by number of tests.
+        self.assert_shards(locked,
+            [('locked_shard_1',
+              ['http/tests/xmlhttprequest/supported-xml-content-types.html']),
+             ('locked_shard_2',
+              ['http/tests/security/view-source-no-refresh.html',
+               'http/tests/websocket/tests/unicode.htm',
+               'http/tests/websocket/tests/websocket-protocol-ignored.html',
+               'perf/object-keys.html'])])
+
     def test_virtual_shards(self):
         # With run_singly=False, we try to keep all of the tests in a virtual suite together even
         # when fully_parallel=True, so that we don't restart every time the command line args change.
@@ -42,6 +42,7 @@ import sys
 import time
 
 from webkitpy.common.net.file_uploader import FileUploader
+from webkitpy.layout_tests import print_layout_test_times
 from webkitpy.layout_tests.controllers.layout_test_finder import LayoutTestFinder
 from webkitpy.layout_tests.controllers.layout_test_runner import LayoutTestRunner
 from webkitpy.layout_tests.controllers.test_result_writer import TestResultWriter
@@ -214,6 +215,12 @@ class Manager(object):
         # Create the output directory if it doesn't already exist.
         self._port.host.filesystem.maybe_make_directory(self._results_directory)
 
+        if self._port.get_option('baseline_index'):
+            # Index the baselines here, so that the workers can read the saved
+            # index rather than each of them scanning the baseline directories.
+            self._printer.write_update("Indexing baselines ...")
+            self._port.baseline_index()
+
         self._port.setup_test_run()
         return test_run_results.OK_EXIT_STATUS
 
@@ -238,6 +245,10 @@ class Manager(object):
             _log.critical('No tests to run.')
             return test_run_results.RunDetails(exit_code=test_run_results.NO_TESTS_EXIT_STATUS)
 
+        if getattr(self._options, 'shard_by_time', True):
+            # This must be read before the results of the previous run are moved away.
+            self._runner.set_test_times(self._read_previous_test_times())
+
         exit_code = self._set_up_run(tests_to_run)
         if exit_code:
             return test_run_results.RunDetails(exit_code=exit_code)
@@ -408,6 +419,18 @@ class Manager(object):
         # Port specific clean-up.
         self._port.clobber_old_port_specific_results()
 
+    def _read_previous_test_times(self):
+        """Returns the times (in ms) the tests took in the previous run, by test name."""
+        times_json_path = self._filesystem.join(self._results_directory, "times_ms.json")
+        if not self._filesystem.exists(times_json_path):
+            return {}
+        try:
+            times_trie = json.loads(self._filesystem.read_text_file(times_json_path))
+        except ValueError:
+            _log.warning("Could not parse %s, not sharding by time." % times_json_path)
+            return {}
+        return print_layout_test_times.convert_trie_to_flat_paths(times_trie)
+
     def _tests_to_retry(self, run_results):
         return [result.test_name for result in run_results.unexpected_results_by_name.values() if result.type != test_expectations.PASS]
 
@@ -50,6 +50,7 @@ except ImportError:
 
 
 from webkitpy.common import find_files
+from webkitpy.common import png_diff
 from webkitpy.common import read_checksum_from_png
 from webkitpy.common.memoized import memoized
 from webkitpy.common.system import path
@@ -61,6 +62,7 @@ from webkitpy.layout_tests.layout_package.bot_test_expectations import BotTestEx
 from webkitpy.layout_tests.models import test_run_results
 from webkitpy.layout_tests.models.test_configuration import TestConfiguration
 from webkitpy.layout_tests.port import config as port_config
+from webkitpy.layout_tests.port.baseline_index import BaselineIndex
 from webkitpy.layout_tests.port import driver
 from webkitpy.layout_tests.port import server_process
 from webkitpy.layout_tests.port.factory import PortFactory
@@ -127,6 +129,10 @@ class Port(object):
 
     DEFAULT_BUILD_DIRECTORIES = ('out',)
 
+    # The largest images diff_image() decodes itself rather than running image_diff,
+    # which is faster for all but the smallest images.
+    MAX_IN_PROCESS_IMAGE_DIFF_PIXELS = 64 * 64
+
     # overridden in subclasses.
     FALLBACK_PATHS = {}
 
@@ -218,6 +224,7 @@ class Port(object):
         self._test_configuration = None
         self._reftest_list = {}
         self._results_directory = None
+        self._baseline_index = None
 
     def buildbot_archives_baselines(self):
         return True
@@ -459,6 +466,13 @@ class Port(object):
         if not expected_contents:
             return (actual_contents, None)
 
+        # The images are usually the same (e.g., those of passing reftests), which
+        # can be told without writing them out and running image_diff.
+        try:
+            return (self._diff_png(expected_contents, actual_contents), None)
+        except png_diff.UnsupportedPNGError, e:
+            _log.debug('Running image_diff to compare the images: %s' % e)
+
         tempdir = self._filesystem.mkdtemp()
 
         expected_filename = self._filesystem.join(str(tempdir), "expected.png")
@@ -496,6 +510,15 @@ class Port(object):
 
         return (result, err_str or None)
 
+    def _diff_png(self, expected_contents, actual_contents):
+        try:
+            return png_diff.diff_png(expected_contents, actual_contents, self.MAX_IN_PROCESS_IMAGE_DIFF_PIXELS)
+        except png_diff.ImageTooLargeError:
+            # image_diff is faster at decoding large images, if it was built.
+            if self._filesystem.exists(self._path_to_image_diff()):
+                raise
+        return png_diff.diff_png(expected_contents, actual_contents)
+
     def diff_text(self, expected_text, actual_text, expected_filename, actual_filename):
         """Returns a string containing the diff of the two text strings
         in 'unified diff' format."""
@@ -583,7 +606,7 @@ class Port(object):
 
         baselines = []
         for platform_dir in baseline_search_path:
-            if self._filesystem.exists(self._filesystem.join(platform_dir, baseline_filename)):
+            if self._baseline_exists(self._filesystem.join(platform_dir, baseline_filename)):
                 baselines.append((platform_dir, baseline_filename))
 
             if not all_baselines and baselines:
@@ -592,7 +615,7 @@ class Port(object):
         # If it wasn't found in a platform directory, return the expected
         # result in the test directory, even if no such file actually exists.
         platform_dir = self.layout_tests_dir()
-        if self._filesystem.exists(self._filesystem.join(platform_dir, baseline_filename)):
+        if self._baseline_exists(self._filesystem.join(platform_dir, baseline_filename)):
             baselines.append((platform_dir, baseline_filename))
 
         if baselines:
@@ -638,7 +661,7 @@ class Port(object):
         """Returns the checksum of the image we expect the test to produce, or None if it is a text-only test."""
         png_path = self.expected_filename(test_name, '.png')
 
-        if self._filesystem.exists(png_path):
+        if self._baseline_exists(png_path):
             with self._filesystem.open_binary_file_for_reading(png_path) as filehandle:
                 return read_checksum_from_png.read_checksum(filehandle)
 
@@ -647,13 +670,13 @@ class Port(object):
     def expected_image(self, test_name):
         """Returns the image we expect the test to produce."""
         baseline_path = self.expected_filename(test_name, '.png')
-        if not self._filesystem.exists(baseline_path):
+        if not self._baseline_exists(baseline_path):
             return None
         return self._filesystem.read_binary_file(baseline_path)
 
     def expected_audio(self, test_name):
         baseline_path = self.expected_filename(test_name, '.wav')
-        if not self._filesystem.exists(baseline_path):
+        if not self._baseline_exists(baseline_path):
             return None
         return self._filesystem.read_binary_file(baseline_path)
 
@@ -665,11 +688,29 @@ class Port(object):
         # output from DRT (instead treating it as a binary string), we read the
         # baselines as a binary string, too.
         baseline_path = self.expected_filename(test_name, '.txt')
-        if not self._filesystem.exists(baseline_path):
+        if not self._baseline_exists(baseline_path):
             return None
         text = self._filesystem.read_binary_file(baseline_path)
         return text.replace("\r\n", "\n")
 
+    def baseline_index(self):
+        """Returns the index of the baselines in the baseline search path (and
+        the test directory), or None if the baselines should be looked up on
+        disk (see --no-baseline-index). The index is built on first use, from
+        the index saved by a previous run if the baselines didn't change."""
+        if not self.get_option('baseline_index'):
+            return None
+        if not self._baseline_index:
+            directories = self.baseline_search_path() + [self.layout_tests_dir()]
+            self._baseline_index = BaselineIndex(self._filesystem, directories, self._build_path('layout-test-baselines.json'))
+        return self._baseline_index
+
+    def _baseline_exists(self, path):
+        baseline_index = self.baseline_index()
+        if baseline_index:
+            return baseline_index.exists(path)
+        return self._filesystem.exists(path)
+
     def _get_reftest_list(self, test_name):
         dirname = self._filesystem.join(self.layout_tests_dir(), self._filesystem.dirname(test_name))
         if dirname not in self._reftest_list:
@@ -854,6 +895,8 @@ class Port(object):
             data: contents of the baseline.
         """
         self._filesystem.write_binary_file(baseline_path, data)
+        if self._baseline_index:
+            self._baseline_index.add(baseline_path)
 
     # FIXME: update callers to create a finder and call it instead of these next five routines (which should be protected).
     def webkit_base(self):
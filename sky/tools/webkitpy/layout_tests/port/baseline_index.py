@@ -0,0 +1,118 @@
+# Copyright 2015 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+"""An in-memory index of the baselines (the -expected.* files) under a set of
+directories, so that looking a baseline up doesn't have to touch the disk."""
+
+import json
+import logging
+import os
+
+_log = logging.getLogger(__name__)
+
+
+class BaselineIndex(object):
+    # Bump this if the format of the cache file changes.
+    CACHE_VERSION = 1
+
+    def __init__(self, filesystem, directories, cache_path=None):
+        """Indexes the baselines under |directories|.
+
+        If |cache_path| is given, the index of each directory is read from
+        (and written to) that file, and it is only rebuilt if one of the
+        directories under it changed (as told by their mtimes)."""
+        self._filesystem = filesystem
+        self._cache_path = cache_path
+        self._baselines = set()
+
+        # Nested directories are indexed with the directories they are in.
+        self._roots = []
+        for directory in sorted(set(filesystem.normpath(d) for d in directories)):
+            if not any(self._is_under(directory, root) for root in self._roots):
+                self._roots.append(directory)
+
+        cache = self._read_cache()
+        new_cache = {}
+        for root in self._roots:
+            entry = cache.get(root)
+            if not entry or not self._is_up_to_date(entry['mtimes']):
+                entry = self._scan(root)
+            new_cache[root] = entry
+            self._baselines.update(filesystem.join(root, path) for path in entry['baselines'])
+        if new_cache != cache:
+            self._write_cache(new_cache)
+
+    def exists(self, path):
+        """Returns whether the file at |path| exists (looking it up in the
+        index if it is a baseline under one of the indexed directories)."""
+        path = self._filesystem.normpath(path)
+        if '-expected.' in self._filesystem.basename(path) and any(self._is_under(path, root) for root in self._roots):
+            return path in self._baselines
+        return self._filesystem.exists(path)
+
+    def add(self, path):
+        """Records that a baseline was written at |path|."""
+        self._baselines.add(self._filesystem.normpath(path))
+
+    def _is_under(self, path, directory):
+        return path.startswith(directory.rstrip(self._filesystem.sep) + self._filesystem.sep)
+
+    def _scan(self, root):
+        """Returns the baselines (relative to |root|) and the mtimes of the
+        directories under |root|."""
+        fs = self._filesystem
+        mtimes = {}
+        baselines = []
+        if not fs.isdir(root):
+            return {'mtimes': mtimes, 'baselines': baselines}
+
+        directories = [root]
+        while directories:
+            directory = directories.pop()
+            mtimes[directory] = fs.mtime(directory)
+            for name in fs.listdir(directory):
+                if name.startswith('.'):
+                    continue
+                path = fs.join(directory, name)
+                if fs.isdir(path):
+                    directories.append(path)
+                elif '-expected.' in name:
+                    baselines.append(fs.relpath(path, root))
+        return {'mtimes': mtimes, 'baselines': sorted(baselines)}
+
+    def _is_up_to_date(self, mtimes):
+        # Adding or removing a file (or a directory) changes the mtime of the
+        # directory it is in.
+        if not mtimes:
+            return False
+        try:
+            return all(self._filesystem.mtime(directory) == mtime for directory, mtime in mtimes.iteritems())
+        except (IOError, OSError):
+            return False
+
+    def _read_cache(self):
+        if not self._cache_path or not self._filesystem.exists(self._cache_path):
+            return {}
+        try:
+            cache = json.loads(self._filesystem.read_text_file(self._cache_path))
+        except (IOError, OSError, ValueError):
+            _log.debug('Could not read the baseline index from %s' % self._cache_path)
+            return {}
+        if cache.get('version') != self.CACHE_VERSION:
+            return {}
+        return cache['roots']
+
+    def _write_cache(self, roots):
+        if not self._cache_path:
+            return
+        # Write a temporary file first, so that the concurrent readers (the
+        # other workers) never see a partial file.
+        temp_path = '%s.%d.tmp' % (self._cache_path, os.getpid())
+        try:
+            self._filesystem.write_text_file(temp_path, json.dumps({'version': self.CACHE_VERSION, 'roots': roots}))
+            self._filesystem.move(temp_path, self._cache_path)
+        except (IOError, OSError):
+            _log.debug('Could not write the baseline index to %s' % self._cache_path)
+            if self._filesystem.exists(temp_path):
+                self._filesystem.remove(temp_path)
@@ -0,0 +1,97 @@
+# Copyright 2015 The Chromium Authors. All rights reserved.
+# Use of this source code is governed by a BSD-style license that can be
+# found in the LICENSE file.
+
+import optparse
+import os
+import shutil
+import tempfile
+import unittest
+
+from webkitpy.common.system.filesystem import FileSystem
+from webkitpy.common.system.filesystem_mock import MockFileSystem
+from webkitpy.common.system.systemhost_mock import MockSystemHost
+from webkitpy.layout_tests.port.baseline_index import BaselineIndex
+from webkitpy.layout_tests.port.test import add_unit_tests_to_mock_filesystem, unit_test_list, TestPort
+
+
+class _NoScanBaselineIndex(BaselineIndex):
+    def _scan(self, root):
+        raise AssertionError('%s should not be scanned' % root)
+
+
+class BaselineIndexTest(unittest.TestCase):
+    def test_exists(self):
+        filesystem = MockFileSystem({
+            '/tests/fast/a.html': '',
+            '/tests/fast/a-expected.txt': '',
+            '/tests/platform/mac/fast/a-expected.png': '',
+            '/other/b-expected.txt': '',
+        })
+        index = BaselineIndex(filesystem, ['/tests/platform/mac', '/tests'])
+        self.assertTrue(index.exists('/tests/fast/a-expected.txt'))
+        self.assertTrue(index.exists('/tests/platform/mac/fast/a-expected.png'))
+        self.assertFalse(index.exists('/tests/fast/a-expected.png'))
+        self.assertFalse(index.exists('/tests/platform/mac/fast/a-expected.txt'))
+
+        # Files that aren't baselines under the indexed directories are looked up on disk.
+        self.assertTrue(index.exists('/tests/fast/a.html'))
+        self.assertTrue(index.exists('/other/b-expected.txt'))
+
+    def test_add(self):
+        filesystem = MockFileSystem({'/tests/a.html': ''})
+        index = BaselineIndex(filesystem, ['/tests'])
+        self.assertFalse(index.exists('/tests/a-expected.txt'))
+        index.add('/tests/a-expected.txt')
+        self.assertTrue(index.exists('/tests/a-expected.txt'))
+
+    def test_missing_directory(self):
+        filesystem = MockFileSystem({'/tests/a-expected.txt': ''})
+        index = BaselineIndex(filesystem, ['/tests/platform/mac', '/nonexistent', '/tests'])
+        self.assertTrue(index.exists('/tests/a-expected.txt'))
+        self.assertFalse(index.exists('/nonexistent/a-expected.txt'))
+
+    def test_cache(self):
+        temp_dir = tempfile.mkdtemp()
+        try:
+            filesystem = FileSystem()
+            tests_dir = filesystem.join(temp_dir, 'tests')
+            cache_path = filesystem.join(temp_dir, 'baselines.json')
+            filesystem.maybe_make_directory(tests_dir, 'fast')
+            filesystem.write_text_file(filesystem.join(tests_dir, 'fast', 'a-expected.txt'), '')
+
+            index = BaselineIndex(filesystem, [tests_dir], cache_path)
+            self.assertTrue(index.exists(filesystem.join(tests_dir, 'fast', 'a-expected.txt')))
+            self.assertTrue(filesystem.exists(cache_path))
+
+            # An up-to-date index is read from the cache, without scanning the directories.
+            index = _NoScanBaselineIndex(filesystem, [tests_dir], cache_path)
+            self.assertTrue(index.exists(filesystem.join(tests_dir, 'fast', 'a-expected.txt')))
+
+            # Adding a baseline changes the mtime of its directory.
+            filesystem.write_text_file(filesystem.join(tests_dir, 'fast', 'b-expected.txt'), '')
+            os.utime(filesystem.join(tests_dir, 'fast'), (0, 0))
+            index = BaselineIndex(filesystem, [tests_dir], cache_path)
+            self.assertTrue(index.exists(filesystem.join(tests_dir, 'fast', 'b-expected.txt')))
+        finally:
+            shutil.rmtree(temp_dir)
+
+    def test_port_expected_filename(self):
+        host = MockSystemHost()
+        add_unit_tests_to_mock_filesystem(host.filesystem)
+        host.filesystem.write_text_file('/test.checkout/tests/platform/test-mac-leopard/passes/text-expected.txt', 'leopard')
+        port = TestPort(host)
+        indexed_port = TestPort(host, options=optparse.Values({'baseline_index': True}))
+        self.assertIsNone(port.baseline_index())
+        self.assertIsNotNone(indexed_port.baseline_index())
+
+        for test_name in unit_test_list().tests:
+            for suffix in ('.txt', '.png', '.wav'):
+                self.assertEqual(indexed_port.expected_filename(test_name, suffix), port.expected_filename(test_name, suffix))
+            self.assertEqual(indexed_port.expected_text(test_name), port.expected_text(test_name))
+            self.assertEqual(indexed_port.expected_image(test_name), port.expected_image(test_name))
+            self.assertEqual(indexed_port.expected_checksum(test_name), port.expected_checksum(test_name))
+        self.assertEqual(indexed_port.expected_text('passes/text.html'), 'leopard')
+
+        indexed_port.update_baseline('/test.checkout/tests/passes/new-expected.txt', 'new')
+        self.assertEqual(indexed_port.expected_text('passes/new.html'), 'new')
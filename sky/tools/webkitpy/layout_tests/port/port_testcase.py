@@ -222,6 +222,13 @@ class PortTestCase(unittest.TestCase):
             exception_raised = True
         self.assertFalse(exception_raised)
 
+    def test_diff_image_in_process(self):
+        port = self.make_port()
+        # image_diff isn't run for images it can be told are the same.
+        port._executive = MockExecutive2(exception=AssertionError('image_diff should not run'))
+        png = '\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00\x00\x03 \x00\x00\x02X\x08\x02\x00\x00\x00\x15\x14\x15\'\x00\x00\x00)tEXtchecksum\x00'
+        self.assertEqual(port.diff_image(png + '3c4134fe2739880353f91c5b84cadbaa', png + '3c4134fe2739880353f91c5b84cadbaa\x00'), (None, None))
+
     def test_diff_image_crashed(self):
         port = self.make_port()
         port._executive = MockExecutive2(exit_code=2)
@@ -28,6 +28,7 @@
 
 """Package that implements the ServerProcess wrapper class"""
 
+import collections
 import errno
 import logging
 import re
@@ -72,6 +73,95 @@ def quote_data(data):
         lines.append(l)
     return lines
 
+
+class ReceiveBuffer(object):
+    """A buffer of the data received from a pipe, as the list of the chunks
+    read, so that neither appending data nor popping it copies the rest of
+    the buffer, and looking for the next line doesn't rescan the data it
+    already looked at."""
+
+    def __init__(self):
+        self._chunks = collections.deque()
+        # The offset of the first byte that wasn't popped, in the first chunk.
+        self._offset = 0
+        self._size = 0
+        # Where to resume looking for a newline: the chunk (its index in
+        # self._chunks) and the offset in that chunk. The data before it
+        # has no newline.
+        self._scan_chunk = 0
+        self._scan_offset = 0
+
+    def __len__(self):
+        return self._size
+
+    def append(self, data):
+        if data:
+            self._chunks.append(data)
+            self._size += len(data)
+
+    def pop_line(self):
+        """Pops the bytes up to (and including) the next newline, or returns
+        None if there is no complete line."""
+        while self._scan_chunk < len(self._chunks):
+            chunk = self._chunks[self._scan_chunk]
+            index = chunk.find('\n', self._scan_offset)
+            if index >= 0:
+                if self._scan_chunk == 0 and index + 1 < len(chunk):
+                    # The common case of a line in the first chunk, which isn't
+                    # popped entirely.
+                    line = chunk[self._offset:index + 1]
+                    self._offset = self._scan_offset = index + 1
+                    self._size -= len(line)
+                    return line
+                return self.pop(self._bytes_before(self._scan_chunk) + index + 1)
+            self._scan_chunk += 1
+            self._scan_offset = 0
+        return None
+
+    def pop(self, size):
+        """Pops |size| bytes (or all of them, if there are fewer)."""
+        size = min(size, self._size)
+        if not size:
+            return ''
+        first_chunk = self._chunks[0]
+        if self._offset + size <= len(first_chunk):
+            # The common case: the bytes are in a single chunk, which is returned
+            # as is if it is popped entirely.
+            if self._offset == 0 and size == len(first_chunk):
+                data = first_chunk
+            else:
+                data = first_chunk[self._offset:self._offset + size]
+            self._offset += size
+        else:
+            pieces = [first_chunk[self._offset:]]
+            remaining = size - len(pieces[0])
+            self._chunks.popleft()
+            self._scan_chunk -= 1
+            while remaining > len(self._chunks[0]):
+                pieces.append(self._chunks.popleft())
+                self._scan_chunk -= 1
+                remaining -= len(pieces[-1])
+            pieces.append(self._chunks[0][:remaining])
+            self._offset = remaining
+            data = ''.join(pieces)
+        if self._offset == len(self._chunks[0]):
+            self._chunks.popleft()
+            self._scan_chunk -= 1
+            self._offset = 0
+        self._size -= size
+        if self._scan_chunk < 0 or (self._scan_chunk == 0 and self._scan_offset < self._offset):
+            self._scan_chunk = 0
+            self._scan_offset = self._offset
+        return data
+
+    def pop_all(self):
+        return self.pop(self._size)
+
+    def _bytes_before(self, chunk_index):
+        """Returns the number of bytes (that weren't popped) before the given chunk."""
+        return sum(len(self._chunks[i]) for i in xrange(chunk_index)) - self._offset
+
+
 class ServerProcess(object):
     """This class provides a wrapper around a subprocess that
     implements a simple request/response usage model. The primary benefit
@@ -117,8 +207,8 @@ class ServerProcess(object):
                 self._proc.stderr = None
 
         self._proc = None
-        self._output = str()  # bytesarray() once we require Python 2.6
-        self._error = str()  # bytesarray() once we require Python 2.6
+        self._output = ReceiveBuffer()
+        self._error = ReceiveBuffer()
         self._crashed = False
         self.timed_out = False
 
@@ -184,19 +274,13 @@ class ServerProcess(object):
             self._crashed = True
 
     def _pop_stdout_line_if_ready(self):
-        index_after_newline = self._output.find('\n') + 1
-        if index_after_newline > 0:
-            return self._pop_output_bytes(index_after_newline)
-        return None
+        return self._output.pop_line()
 
     def _pop_stderr_line_if_ready(self):
-        index_after_newline = self._error.find('\n') + 1
-        if index_after_newline > 0:
-            return self._pop_error_bytes(index_after_newline)
-        return None
+        return self._error.pop_line()
 
     def pop_all_buffered_stderr(self):
-        return self._pop_error_bytes(len(self._error))
+        return self._error.pop_all()
 
     def read_stdout_line(self, deadline):
         return self._read(deadline, self._pop_stdout_line_if_ready)
@@ -226,7 +310,7 @@ class ServerProcess(object):
 
         def retrieve_bytes_from_stdout_buffer():
             if len(self._output) >= size:
-                return self._pop_output_bytes(size)
+                return self._output.pop(size)
             return None
 
         return self._read(deadline, retrieve_bytes_from_stdout_buffer)
@@ -246,17 +330,6 @@ class ServerProcess(object):
         self.timed_out = True
         self._port.sample_process(self._name, self._proc.pid)
 
-    def _split_string_after_index(self, string, index):
-        return string[:index], string[index:]
-
-    def _pop_output_bytes(self, bytes_count):
-        output, self._output = self._split_string_after_index(self._output, bytes_count)
-        return output
-
-    def _pop_error_bytes(self, bytes_count):
-        output, self._error = self._split_string_after_index(self._error, bytes_count)
-        return output
-
     def _wait_for_data_and_update_buffers_using_select(self, deadline, stopping=False):
         if self._proc.stdout.closed or self._proc.stderr.closed:
             # If the process crashed and is using FIFOs, like Chromium Android, the
@@ -286,14 +359,14 @@ class ServerProcess(object):
                 if not data and not stopping and (self._treat_no_data_as_crash or self._proc.poll()):
                     self._crashed = True
                 self._log_data('OUT', data)
-                self._output += data
+                self._output.append(data)
 
             if err_fd in read_fds:
                 data = self._proc.stderr.read()
                 if not data and not stopping and (self._treat_no_data_as_crash or self._proc.poll()):
                     self._crashed = True
                 self._log_data('ERR', data)
-                self._error += data
+                self._error.append(data)
         except IOError, e:
             # We can ignore the IOErrors because we will detect if the subporcess crashed
             # the next time through the loop in _read()
@@ -313,9 +386,9 @@ class ServerProcess(object):
             self._log_data('ERR', error)
             if output or error:
                 if output:
-                    self._output += output
+                    self._output.append(output)
                 if error:
-                    self._error += error
+                    self._error.append(error)
                 return
             time.sleep(0.01)
             now = time.time()
@@ -392,7 +465,7 @@ class ServerProcess(object):
                 self._wait_for_data_and_update_buffers_using_win32_apis(now)
             else:
                 self._wait_for_data_and_update_buffers_using_select(now, stopping=True)
-        out, err = self._output, self._error
+        out, err = self._output.pop_all(), self._error.pop_all()
         self._reset()
         return (out, err)
 
@@ -167,3 +167,46 @@ class TestQuoteData(unittest.TestCase):
         qd = server_process.quote_data
         self.assertEqual(qd("\x00\x01ab"),
                          ["\\x00\\x01ab"])
+
+
+class TestReceiveBuffer(unittest.TestCase):
+    def test_pop_line(self):
+        buf = server_process.ReceiveBuffer()
+        self.assertIsNone(buf.pop_line())
+        buf.append('foo')
+        self.assertIsNone(buf.pop_line())
+        buf.append('bar\nba')
+        buf.append('z\n\nqux')
+        self.assertEqual(len(buf), 15)
+        self.assertEqual(buf.pop_line(), 'foobar\n')
+        self.assertEqual(buf.pop_line(), 'baz\n')
+        self.assertEqual(buf.pop_line(), '\n')
+        self.assertIsNone(buf.pop_line())
+        buf.append('\n')
+        self.assertEqual(buf.pop_line(), 'qux\n')
+        self.assertEqual(len(buf), 0)
+
+    def test_pop(self):
+        buf = server_process.ReceiveBuffer()
+        buf.append('Content-Length: 10\n0123')
+        buf.append('45')
+        buf.append('6789#EOF\n')
+        self.assertEqual(buf.pop_line(), 'Content-Length: 10\n')
+        self.assertEqual(buf.pop(10), '0123456789')
+        self.assertEqual(buf.pop_line(), '#EOF\n')
+        self.assertEqual(buf.pop(1), '')
+
+        # A chunk popped entirely isn't copied.
+        chunk = 'x' * 1000
+        buf.append(chunk)
+        self.assertIs(buf.pop(1000), chunk)
+
+    def test_pop_after_scan(self):
+        buf = server_process.ReceiveBuffer()
+        buf.append('abc')
+        buf.append('def')
+        self.assertIsNone(buf.pop_line())
+        self.assertEqual(buf.pop(4), 'abcd')
+        buf.append('g\nh')
+        self.assertEqual(buf.pop_line(), 'efg\n')
+        self.assertEqual(buf.pop_all(), 'h')
@@ -134,6 +134,11 @@ def parse_args(args):
         optparse.make_option("--no-new-test-results", action="store_false",
             dest="new_test_results", default=True,
             help="Don't create new baselines when no expected results exist"),
+        optparse.make_option("--baseline-index", action="store_true", default=True,
+            help="Look the baselines up in an index of the baseline directories "
+                 "(saved in the build directory) rather than on disk (the default)"),
+        optparse.make_option("--no-baseline-index", action="store_false", dest="baseline_index",
+            help="Look every baseline up on disk"),
 
         #FIXME: we should support a comma separated list with --pixel-test-directory as well.
         optparse.make_option("--pixel-test-directory", action="append", default=[], dest="pixel_test_directories",
@@ -253,6 +258,11 @@ def parse_args(args):
 
         optparse.make_option("--max-locked-shards", type="int", default=0,
             help="Set the maximum number of locked shards"),
+        optparse.make_option("--shard-by-time", action="store_true", default=True,
+            help="Start the tests that took the longest in the previous run "
+                 "(see times_ms.json) first (the default)"),
+        optparse.make_option("--no-shard-by-time", action="store_false", dest="shard_by_time",
+            help="Don't use the times of the previous run to order the tests"),
         optparse.make_option("--additional-env-var", type="string", action="append", default=[],
             help="Passes that environment variable to the tests (--additional-env-var=NAME=VALUE)"),
         optparse.make_option("--profile", action="store_true",
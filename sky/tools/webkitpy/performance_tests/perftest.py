@@ -45,9 +45,36 @@ from webkitpy.layout_tests.port.driver import DriverOutput
 
 DEFAULT_TEST_RUNNER_COUNT = 4
 
+# The defaults of the adaptive mode (see PerfTest._run_adaptively()).
+DEFAULT_ADAPTIVE_TOLERANCE = 0.02
+DEFAULT_ADAPTIVE_TIME_BUDGET_MS = 5 * 60 * 1000
+DEFAULT_MAX_TEST_RUNNER_COUNT = 20
+MIN_ADAPTIVE_TEST_RUNNER_COUNT = 2
+
 _log = logging.getLogger(__name__)
 
 
+def median(values):
+    sorted_values = sorted(values)
+    middle = int(len(sorted_values) / 2)
+    return sorted_values[middle] if len(sorted_values) % 2 else (sorted_values[middle - 1] + sorted_values[middle]) / 2.0
+
+
+def median_confidence_interval(values, z=1.96):
+    """Returns the bounds of the (distribution-free, 95% by default) confidence
+    interval of the median of |values|, or None if there are too few values
+    for one."""
+    sorted_values = sorted(values)
+    n = len(sorted_values)
+    # The ranks (from 1) of the bounds, using the normal approximation of the
+    # binomial distribution of the number of values below the median.
+    lower = int(math.floor((n - z * math.sqrt(n)) / 2))
+    upper = int(math.ceil(1 + (n + z * math.sqrt(n)) / 2))
+    if lower < 1 or upper > n:
+        return None
+    return (sorted_values[lower - 1], sorted_values[upper - 1])
+
+
 class PerfTestMetric(object):
     def __init__(self, metric, unit=None, iterations=None):
         # FIXME: Fix runner.js to report correct metric names
@@ -71,6 +98,22 @@ class PerfTestMetric(object):
     def flattened_iteration_values(self):
         return [value for group_values in self._iterations for value in group_values]
 
+    def warm_up_group_count(self):
+        """Returns the number of leading groups (that is, of runs of the test)
+        that look like warm-ups: those whose median is outside the confidence
+        interval of the median of the values of the groups after them. At most
+        half of the groups are considered warm-ups."""
+        count = 0
+        while count < len(self._iterations) / 2:
+            interval = median_confidence_interval([value for group_values in self._iterations[count + 1:] for value in group_values])
+            if not interval or interval[0] <= median(self._iterations[count]) <= interval[1]:
+                break
+            count += 1
+        return count
+
+    def steady_grouped_iteration_values(self):
+        return self._iterations[self.warm_up_group_count():]
+
     def unit(self):
         return self._unit
 
@@ -94,6 +137,7 @@ class PerfTest(object):
         self._metrics = {}
         self._ordered_metrics_name = []
         self._test_runner_count = test_runner_count
+        self._run_count = 0
 
     def test_name(self):
         return self._test_name
@@ -107,20 +151,36 @@ class PerfTest(object):
     def description(self):
         return self._description
 
+    def run_count(self):
+        """Returns the number of times the test runner was invoked by the last run()."""
+        return self._run_count
+
+    def metric_unit(self, metric_name):
+        """Returns the unit of the metric named |metric_name| (see PerfTestMetric.name()), if the test has it."""
+        for metric in self._metrics.values():
+            if metric.name() == metric_name:
+                return metric.unit()
+        return None
+
     def prepare(self, time_out_ms):
         return True
 
     def _create_driver(self):
         return self._port.create_driver(worker_number=0, no_timeout=True)
 
+    def _adaptive_iterations(self):
+        return self._port.get_option('adaptive_iterations')
+
     def run(self, time_out_ms):
-        for _ in xrange(self._test_runner_count):
-            driver = self._create_driver()
-            try:
-                if not self._run_with_driver(driver, time_out_ms):
+        self._run_count = 0
+        adaptive = self._adaptive_iterations()
+        if adaptive:
+            if not self._run_adaptively(time_out_ms):
+                return None
+        else:
+            for _ in xrange(self._test_runner_count):
+                if not self._run_once(time_out_ms):
                     return None
-            finally:
-                driver.stop()
 
         should_log = not self._port.get_option('profile')
         if should_log and self._description:
@@ -129,14 +189,65 @@ class PerfTest(object):
         results = {}
         for metric_name in self._ordered_metrics_name:
             metric = self._metrics[metric_name]
-            results[metric.name()] = metric.grouped_iteration_values()
+            if adaptive:
+                warm_up_group_count = metric.warm_up_group_count()
+                if warm_up_group_count:
+                    _log.info('Discarded %d warm-up run(s) of %s' % (warm_up_group_count, metric.name()))
+                results[metric.name()] = metric.steady_grouped_iteration_values()
+            else:
+                results[metric.name()] = metric.grouped_iteration_values()
             if should_log:
                 legacy_chromium_bot_compatible_name = self.test_name_without_file_extension().replace('/', ': ')
                 self.log_statistics(legacy_chromium_bot_compatible_name + ': ' + metric.name(),
-                    metric.flattened_iteration_values(), metric.unit())
+                    [value for group_values in results[metric.name()] for value in group_values], metric.unit())
 
         return results
 
+    def _run_once(self, time_out_ms):
+        driver = self._create_driver()
+        self._run_count += 1
+        try:
+            return self._run_with_driver(driver, time_out_ms)
+        finally:
+            driver.stop()
+
+    def _run_adaptively(self, time_out_ms):
+        """Invokes the test runner until the confidence intervals of the medians
+        of all the metrics (without their warm-up runs, and over at least
+        MIN_ADAPTIVE_TEST_RUNNER_COUNT other runs) are within the tolerance
+        (relative to the medians), the test runner was invoked the maximum
+        number of times, or the time budget of the test ran out."""
+        tolerance = self._port.get_option('adaptive_tolerance', DEFAULT_ADAPTIVE_TOLERANCE)
+        time_budget_ms = self._port.get_option('adaptive_time_budget_ms', DEFAULT_ADAPTIVE_TIME_BUDGET_MS)
+        max_run_count = max(self._port.get_option('max_test_runner_count', DEFAULT_MAX_TEST_RUNNER_COUNT), MIN_ADAPTIVE_TEST_RUNNER_COUNT)
+
+        start_time = time.time()
+        while True:
+            if not self._run_once(time_out_ms):
+                return False
+            if self._run_count < MIN_ADAPTIVE_TEST_RUNNER_COUNT:
+                continue
+            if self._is_precise_enough(tolerance):
+                _log.debug('%s is stable after %d runs' % (self.test_name(), self._run_count))
+                return True
+            if self._run_count >= max_run_count:
+                _log.info('%s is not stable after %d runs' % (self.test_name(), self._run_count))
+                return True
+            if (time.time() - start_time) * 1000 >= time_budget_ms:
+                _log.info('%s ran out of time after %d runs' % (self.test_name(), self._run_count))
+                return True
+
+    def _is_precise_enough(self, tolerance):
+        for metric in self._metrics.values():
+            groups = metric.steady_grouped_iteration_values()
+            if len(groups) < MIN_ADAPTIVE_TEST_RUNNER_COUNT:
+                return False
+            values = [value for group_values in groups for value in group_values]
+            interval = median_confidence_interval(values)
+            if not interval or interval[1] - interval[0] > 2 * tolerance * abs(median(values)):
+                return False
+        return True
+
     @staticmethod
     def log_statistics(test_name, values, unit):
         sorted_values = sorted(values)
@@ -268,6 +379,9 @@ class SingleProcessPerfTest(PerfTest):
     def __init__(self, port, test_name, test_path, test_runner_count=1):
         super(SingleProcessPerfTest, self).__init__(port, test_name, test_path, test_runner_count)
 
+    def _adaptive_iterations(self):
+        return False
+
 
 class ChromiumStylePerfTest(PerfTest):
     _chromium_style_result_regex = re.compile(r'^RESULT\s+(?P<name>[^=]+)\s*=\s+(?P<value>\d+(\.\d+)?)\s*(?P<unit>\w+)$')
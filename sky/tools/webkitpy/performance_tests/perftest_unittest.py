@@ -29,6 +29,7 @@
 import StringIO
 import json
 import math
+import optparse
 import unittest
 
 from webkitpy.common.host_mock import MockHost
@@ -41,6 +42,8 @@ from webkitpy.performance_tests.perftest import PerfTest
 from webkitpy.performance_tests.perftest import PerfTestMetric
 from webkitpy.performance_tests.perftest import PerfTestFactory
 from webkitpy.performance_tests.perftest import SingleProcessPerfTest
+from webkitpy.performance_tests.perftest import median
+from webkitpy.performance_tests.perftest import median_confidence_interval
 
 
 class MockPort(TestPort):
@@ -48,6 +51,17 @@ class MockPort(TestPort):
         super(MockPort, self).__init__(host=MockHost(), custom_run_test=custom_run_test)
 
 
+class TestStatistics(unittest.TestCase):
+    def test_median(self):
+        self.assertEqual(median([3, 1, 2]), 2)
+        self.assertEqual(median([4, 1, 2, 3]), 2.5)
+
+    def test_median_confidence_interval(self):
+        self.assertIsNone(median_confidence_interval([1, 2, 3, 4, 5]))
+        self.assertEqual(median_confidence_interval(range(1, 11)), (1, 10))
+        self.assertEqual(median_confidence_interval(range(1, 101)), (40, 61))
+
+
 class TestPerfTestMetric(unittest.TestCase):
     def test_init_set_missing_unit(self):
         self.assertEqual(PerfTestMetric('Time', iterations=[1, 2, 3, 4, 5]).unit(), 'ms')
@@ -88,6 +102,20 @@ class TestPerfTestMetric(unittest.TestCase):
         self.assertEqual(metric.grouped_iteration_values(), [[1], [2], [4, 5]])
         self.assertEqual(metric.flattened_iteration_values(), [1, 2, 4, 5])
 
+    def test_warm_up_groups(self):
+        steady = [100, 101, 99, 100, 102, 98, 100, 101, 99, 100]
+        metric = PerfTestMetric('Time', iterations=[[150] * 10, steady, steady])
+        self.assertEqual(metric.warm_up_group_count(), 1)
+        self.assertEqual(metric.steady_grouped_iteration_values(), [steady, steady])
+
+        # A run is only a warm-up if it is slower (or faster) than the others.
+        metric = PerfTestMetric('Time', iterations=[steady, [150] * 10, steady])
+        self.assertEqual(metric.warm_up_group_count(), 0)
+
+        # At most half of the runs are warm-ups.
+        metric = PerfTestMetric('Time', iterations=[[200] * 10, [150] * 10, steady])
+        self.assertEqual(metric.warm_up_group_count(), 1)
+
 
 class TestPerfTest(unittest.TestCase):
     def _assert_results_are_correct(self, test, output):
@@ -207,6 +235,40 @@ max 1120 ms
         self.assertEqual(actual_logs, '')
 
 
+class TestAdaptivePerfTest(unittest.TestCase):
+    def _run(self, values_by_run, **options):
+        options = optparse.Values(dict({'adaptive_iterations': True}, **options))
+        port = TestPort(host=MockHost(), options=options)
+        test = PerfTest(port, 'some-test', '/path/some-dir/some-test')
+        runs = iter(values_by_run)
+        test.run_single = lambda driver, path, time_out_ms: DriverOutput('Time:\nvalues %s ms\n' % ', '.join(str(value) for value in next(runs)),
+            image=None, image_hash=None, audio=None)
+        output = OutputCapture()
+        output.capture_output()
+        try:
+            results = test.run(0)
+        finally:
+            output.restore_output()
+        return test, results
+
+    def test_stops_when_stable(self):
+        steady = [100, 101, 99, 100, 100, 99, 101, 100, 100, 100]
+        test, results = self._run([[150] * 10] + [steady] * 10)
+        self.assertEqual(test.run_count(), 3)
+        self.assertEqual(results, {'Time': [steady, steady]})
+
+    def test_stops_after_max_runs(self):
+        noisy = [50, 150, 80, 120, 100, 60, 140, 70, 130, 100]
+        test, results = self._run([noisy] * 10, max_test_runner_count=5)
+        self.assertEqual(test.run_count(), 5)
+        self.assertEqual(results, {'Time': [noisy] * 5})
+
+    def test_stops_when_out_of_time(self):
+        noisy = [50, 150, 80, 120, 100, 60, 140, 70, 130, 100]
+        test, results = self._run([noisy] * 10, adaptive_time_budget_ms=0)
+        self.assertEqual(test.run_count(), 2)
+
+
 class TestSingleProcessPerfTest(unittest.TestCase):
     def test_use_only_one_process(self):
         called = [0]
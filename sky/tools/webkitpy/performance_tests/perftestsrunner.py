@@ -42,6 +42,9 @@ from webkitpy.common.host import Host
 from webkitpy.common.net.file_uploader import FileUploader
 from webkitpy.performance_tests.perftest import PerfTestFactory
 from webkitpy.performance_tests.perftest import DEFAULT_TEST_RUNNER_COUNT
+from webkitpy.performance_tests.perftest import DEFAULT_ADAPTIVE_TOLERANCE
+from webkitpy.performance_tests.perftest import DEFAULT_ADAPTIVE_TIME_BUDGET_MS
+from webkitpy.performance_tests.perftest import DEFAULT_MAX_TEST_RUNNER_COUNT
 
 
 _log = logging.getLogger(__name__)
@@ -131,6 +134,21 @@ class PerfTestsRunner(object):
                 help="Specify number of times to run test set (default: 1)."),
             optparse.make_option("--test-runner-count", default=DEFAULT_TEST_RUNNER_COUNT, type="int",
                 help="Specify number of times to invoke test runner for each performance test."),
+            optparse.make_option("--adaptive-iterations", action="store_true", default=False,
+                help="Invoke the test runner for each performance test until the medians of its metrics are known "
+                     "within --adaptive-tolerance, discarding the warm-up runs (instead of --test-runner-count times)."),
+            optparse.make_option("--adaptive-tolerance", default=DEFAULT_ADAPTIVE_TOLERANCE, type="float",
+                help="The half-width of the 95%% confidence interval of the median of each metric, relative to the "
+                     "median, to reach with --adaptive-iterations (default: %default)."),
+            optparse.make_option("--adaptive-time-budget-ms", default=DEFAULT_ADAPTIVE_TIME_BUDGET_MS, type="int",
+                help="Stop invoking the test runner for a performance test after this long with --adaptive-iterations "
+                     "(default: %default)."),
+            optparse.make_option("--max-test-runner-count", default=DEFAULT_MAX_TEST_RUNNER_COUNT, type="int",
+                help="The maximum number of times to invoke test runner for each performance test with "
+                     "--adaptive-iterations (default: %default)."),
+            optparse.make_option("--results-store", action='callback', callback=_expand_path, type="str",
+                help="Also add the results to this local store of results, which mojo/tools/perf_results.py "
+                     "compares the results of two revisions in."),
             ]
         return optparse.OptionParser(option_list=(perf_option_list)).parse_args(args)
 
@@ -237,6 +255,8 @@ class PerfTestsRunner(object):
         options = self._options
         output_json_path = self._output_json_path()
         output = self._generate_results_dict(self._timestamp, options.description, options.platform, options.builder_name, options.build_number)
+        if options.results_store:
+            self._add_to_results_store(options.results_store, output.get('revisions', {}))
 
         if options.slave_config_json_path:
             output = self._merge_slave_config_json(options.slave_config_json_path, output)
@@ -293,6 +313,8 @@ class PerfTestsRunner(object):
                     tests.setdefault(path[i], {'url': url})
                     current_test = tests[path[i]]
                     if is_last_token:
+                        if self._options.adaptive_iterations:
+                            current_test['testRunnerCount'] = test.run_count()
                         current_test.setdefault('metrics', {})
                         assert metric_name not in current_test['metrics']
                         current_test['metrics'][metric_name] = {'current': iteration_values}
@@ -302,6 +324,31 @@ class PerfTestsRunner(object):
 
         return contents
 
+    def _add_to_results_store(self, results_store_path, revisions):
+        """Appends the results to a local store of results, in the format of
+        mojo/tools/mopy/perf_results_store.py (a JSON object per line)."""
+        if len(revisions) == 1:
+            revision = revisions.values()[0]['revision']
+        else:
+            revision = ','.join('%s@%s' % (name, revisions[name]['revision']) for name in sorted(revisions))
+
+        lines = []
+        for test, metrics in self._results:
+            for metric_name, iteration_values in metrics.iteritems():
+                if not isinstance(iteration_values, list):
+                    continue
+                lines.append(json.dumps({
+                    'test': test.test_name_without_file_extension(),
+                    'metric': metric_name,
+                    'revision': revision,
+                    'units': test.metric_unit(metric_name),
+                    'values': [value for group_values in iteration_values for value in group_values],
+                    'time': self._timestamp}, sort_keys=True) + '\n')
+
+        # The store is append-only, so that concurrent writers don't need to
+        # lock it.
+        self._host.filesystem.append_text_file(results_store_path, ''.join(lines))
+
     @staticmethod
     def _datetime_in_ES5_compatible_iso_format(datetime):
         return datetime.strftime('%Y-%m-%dT%H:%M:%S.%f')
@@ -372,7 +419,10 @@ class PerfTestsRunner(object):
                 failures += 1
                 _log.error('FAILED')
 
-            _log.info('Finished: %f s' % (time.time() - start_time))
+            if self._options.adaptive_iterations and metrics:
+                _log.info('Finished: %f s (%d runs)' % (time.time() - start_time, test.run_count()))
+            else:
+                _log.info('Finished: %f s' % (time.time() - start_time))
             _log.info('')
 
         return failures
@@ -125,6 +125,7 @@ class MainTest(unittest.TestCase):
         self.assertTrue(options.use_skipped_list)
         self.assertEqual(options.repeat, 1)
         self.assertEqual(options.test_runner_count, DEFAULT_TEST_RUNNER_COUNT)
+        self.assertFalse(options.adaptive_iterations)
 
     def test_parse_args(self):
         runner, port = self.create_runner()
@@ -143,6 +144,10 @@ class MainTest(unittest.TestCase):
                 '--additional-drt-flag=--awesomesauce',
                 '--repeat=5',
                 '--test-runner-count=5',
+                '--adaptive-iterations',
+                '--adaptive-tolerance=0.05',
+                '--adaptive-time-budget-ms=1000',
+                '--max-test-runner-count=10',
                 '--debug'])
         self.assertTrue(options.build)
         self.assertEqual(options.build_directory, 'folder42')
@@ -159,6 +164,10 @@ class MainTest(unittest.TestCase):
         self.assertEqual(options.additional_drt_flag, ['--enable-threaded-parser', '--awesomesauce'])
         self.assertEqual(options.repeat, 5)
         self.assertEqual(options.test_runner_count, 5)
+        self.assertTrue(options.adaptive_iterations)
+        self.assertEqual(options.adaptive_tolerance, 0.05)
+        self.assertEqual(options.adaptive_time_budget_ms, 1000)
+        self.assertEqual(options.max_test_runner_count, 10)
 
     def test_upload_json(self):
         runner, port = self.create_runner()
@@ -522,6 +531,10 @@ class IntegrationTest(unittest.TestCase):
 
         return logs
 
+    def _stub_out_http_servers(self, runner):
+        runner._start_http_servers = lambda: None
+        runner._stop_http_servers = lambda: None
+
     _event_target_wrapper_and_inspector_results = {
         "Bindings":
             {"url": "http://trac.webkit.org/browser/trunk/PerformanceTests/Bindings",
@@ -761,3 +774,34 @@ class IntegrationTest(unittest.TestCase):
         expectedMetrics = EventTargetWrapperTestData.results['metrics']['Time']['current'][0]
         for metrics in output:
             self.assertEqual(metrics, expectedMetrics)
+
+    def test_run_with_adaptive_iterations(self):
+        runner, port = self.create_runner_and_setup_results_template(args=['--output-json-path=/mock-checkout/output.json',
+            '--adaptive-iterations'])
+        self._stub_out_http_servers(runner)
+        logs = self._test_run_with_json_output(runner, port.host.filesystem, compare_logs=False)
+        self.assertIn('(2 runs)', logs)
+        generated_json = json.loads(port.host.filesystem.files['/mock-checkout/output.json'])
+        test_json = generated_json[0]['tests']['Bindings']['tests']['event-target-wrapper']
+
+        # The results of the test are the same in every run, so two of them are enough.
+        self.assertEqual(test_json['testRunnerCount'], 2)
+        self.assertEqual(test_json['metrics']['Time']['current'], EventTargetWrapperTestData.results['metrics']['Time']['current'][:2])
+
+    def test_run_with_results_store(self):
+        runner, port = self.create_runner_and_setup_results_template(args=['--output-json-path=/mock-checkout/output.json',
+            '--results-store=/mock-checkout/perf_results.jsonl'])
+        self._stub_out_http_servers(runner)
+        filesystem = port.host.filesystem
+        filesystem.write_text_file('/mock-checkout/perf_results.jsonl', '{"test": "earlier"}\n')
+        self._test_run_with_json_output(runner, filesystem, compare_logs=False)
+
+        records = [json.loads(line) for line in filesystem.read_text_file('/mock-checkout/perf_results.jsonl').splitlines()]
+        self.assertEqual(records[0], {'test': 'earlier'})
+        self.assertEqual(records[1:], [{
+            'test': 'Bindings/event-target-wrapper',
+            'metric': 'Time',
+            'revision': '5678',
+            'units': 'ms',
+            'values': [1486.0, 1471.0, 1510.0, 1505.0, 1478.0, 1490.0] * 4,
+            'time': 123456789}])